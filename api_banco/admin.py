@@ -30,6 +30,7 @@ class MovimentacaoInline(admin.TabularInline):
         'tipo_operacao',
         'valor',
         'data_movimentacao',
+        'saldo_apos',
     )
     verbose_name = 'Movimentação'
     verbose_name_plural = 'Movimentações'
@@ -0,0 +1,125 @@
+"""
+massa de dados sintetica compartilhada pelos comandos de benchmark
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils import timezone
+
+from api_banco.models import ContaCorrente, Movimentacao, Pessoa
+from investimentos.models import ClienteInvestidor, Investimento
+
+LOTE = 10_000
+TICKERS = ['PETR4', 'VALE3', 'ITUB4', 'BBDC4', 'WEGE3']
+
+
+def analisar():
+    if connection.vendor in ('sqlite', 'postgresql'):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+
+@contextmanager
+def _datas_sinteticas(*campos):
+    """auto_now_add ignoraria as datas sinteticas durante a carga"""
+    for campo in campos:
+        campo.auto_now_add = False  # type: ignore
+    try:
+        yield
+    finally:
+        for campo in campos:
+            campo.auto_now_add = True  # type: ignore
+
+
+def _investimento(clientes, tickers, fracao_ativos, agora):
+    # aplicado entre 30 dias e 2 anos atras, para o historico de analytics
+    # ter pregoes com posicao; os inativos saem depois de aplicados
+    aplicacao = agora - timedelta(days=random.randint(30, 2 * 365))
+    ativo = random.random() < fracao_ativos
+
+    return Investimento(
+        cliente_id=random.choice(clientes),
+        tipo_investimento='ACOES',
+        ticker=random.choice(tickers),
+        quantidade=Decimal(random.randint(1, 1000)),
+        preco_medio=Decimal('10.00'),
+        valor_investido=Decimal('10.00'),
+        ativo=ativo,
+        data_aplicacao=aplicacao,
+        data_resgate=None if ativo
+        else aplicacao + (agora - aplicacao) * random.random(),
+    )
+
+
+def popular(contas, movimentacoes, investimentos, tickers=None,
+            fracao_ativos=0.2, saldo=Decimal('0.00')):
+    """
+    cria `contas` usuarios, cada um com pessoa, conta corrente e perfil
+    investidor, mais movimentacoes e investimentos distribuidos ao acaso.
+    retorna (usuarios, contas, clientes) com os ids criados.
+    """
+    User = get_user_model()
+    tickers = tickers or TICKERS
+
+    User.objects.bulk_create(
+        [User(email=f'bench{i}@bench.local') for i in range(contas)],
+        batch_size=LOTE
+    )
+    usuarios = list(User.objects.filter(
+        email__endswith='@bench.local').values_list('id', flat=True))
+
+    Pessoa.objects.bulk_create(
+        [Pessoa(user_id=u, tipo_pessoa='F', cpf_cnpj=f'{i:011d}',
+                nome=f'Bench {i}') for i, u in enumerate(usuarios)],
+        batch_size=LOTE
+    )
+    pessoas = list(Pessoa.objects.values_list('id', flat=True))
+
+    ContaCorrente.objects.bulk_create(
+        [ContaCorrente(pessoa_id=p, agencia='0001', numero=f'B{p}',
+                       saldo=saldo)
+         for p in pessoas],
+        batch_size=LOTE
+    )
+    ids_contas = list(ContaCorrente.objects.values_list('id', flat=True))
+
+    ClienteInvestidor.objects.bulk_create(
+        [ClienteInvestidor(pessoa_id=p) for p in pessoas],
+        batch_size=LOTE
+    )
+    clientes = list(ClienteInvestidor.objects.values_list('id', flat=True))
+
+    agora = timezone.now()
+    restante = movimentacoes
+    with _datas_sinteticas(
+            Movimentacao._meta.get_field('data_movimentacao')):
+        while restante > 0:
+            lote = min(LOTE, restante)
+            Movimentacao.objects.bulk_create([
+                Movimentacao(
+                    conta_id=random.choice(ids_contas),
+                    tipo_operacao=random.choice('CD'),
+                    valor=Decimal(random.randint(1, 100_000)) / 100,
+                    data_movimentacao=agora - timedelta(
+                        minutes=random.randint(0, 5 * 365 * 24 * 60)),
+                )
+                for _ in range(lote)
+            ])
+            restante -= lote
+
+    restante = investimentos
+    with _datas_sinteticas(Investimento._meta.get_field('data_aplicacao')):
+        while restante > 0:
+            lote = min(LOTE, restante)
+            Investimento.objects.bulk_create([
+                _investimento(clientes, tickers, fracao_ativos, agora)
+                for _ in range(lote)
+            ])
+            restante -= lote
+
+    analisar()
+    return usuarios, ids_contas, clientes
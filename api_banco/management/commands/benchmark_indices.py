@@ -0,0 +1,94 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api_banco.management.commands._massa import analisar, popular
+from api_banco.models import Movimentacao
+from investimentos.models import Investimento
+
+
+class Command(BaseCommand):
+    help = ("Compara plano de execucao e latencia das consultas principais "
+            "com e sem os indices compostos, num banco temporario populado "
+            "com dados sinteticos.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movimentacoes', type=int, default=1_000_000)
+        parser.add_argument('--contas', type=int, default=100)
+        parser.add_argument('--investimentos', type=int, default=200_000)
+        parser.add_argument('--repeticoes', type=int, default=20)
+
+    def handle(self, *args, **options):
+        nome_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+        try:
+            self.stdout.write("Populando banco temporario...")
+            _, contas, clientes = popular(options['contas'],
+                                          options['movimentacoes'],
+                                          options['investimentos'])
+
+            conta = random.choice(contas)
+            cliente = random.choice(clientes)
+
+            casos = [
+                (
+                    'extrato por conta e data',
+                    Movimentacao,
+                    'movimentacao_conta_data_idx',
+                    lambda: Movimentacao.objects.filter(conta_id=conta)
+                    .order_by('-data_movimentacao')[:50],
+                ),
+                (
+                    'investimentos ativos do cliente',
+                    Investimento,
+                    'investimento_ativos_idx',
+                    lambda: Investimento.objects.filter(cliente_id=cliente,
+                                                        ativo=True),
+                ),
+            ]
+
+            for titulo, model, nome_indice, consulta in casos:
+                self._comparar(titulo, model, nome_indice, consulta,
+                               options['repeticoes'])
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+
+    def _comparar(self, titulo, model, nome_indice, consulta, repeticoes):
+        indice = next(i for i in model._meta.indexes
+                      if i.name == nome_indice)
+
+        com_indice = self._medir(consulta, repeticoes)
+
+        with connection.schema_editor() as editor:
+            editor.remove_index(model, indice)
+        analisar()
+        try:
+            sem_indice = self._medir(consulta, repeticoes)
+        finally:
+            with connection.schema_editor() as editor:
+                editor.add_index(model, indice)
+            analisar()
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n{titulo}"))
+        resultados = (('sem indice', sem_indice), ('com indice', com_indice))
+        for rotulo, (plano, mediana, p99) in resultados:
+            self.stdout.write(
+                f"  {rotulo}: mediana {mediana:.3f} ms | p99 {p99:.3f} ms")
+            self.stdout.write(f"    plano: {plano}")
+
+    def _medir(self, consulta, repeticoes):
+        plano = consulta().explain()
+        tempos = []
+
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            list(consulta())
+            tempos.append((time.perf_counter() - inicio) * 1000)
+
+        tempos.sort()
+        p99 = tempos[min(len(tempos) - 1, int(len(tempos) * 0.99))]
+        return plano, statistics.median(tempos), p99
@@ -0,0 +1,255 @@
+import json
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (CaptureQueriesContext, override_settings,
+                               setup_test_environment,
+                               teardown_test_environment)
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api_banco.management.commands._massa import popular
+from investimentos.analytics import PortfolioAnalytics
+from investimentos.models import ClienteInvestidor, Investimento
+from investimentos.quote_cache import cotacoes
+from investimentos.services import MarketDataService
+
+
+class Command(BaseCommand):
+    help = ("Mede p50/p99, queries por requisicao e pico de memoria dos "
+            "caminhos criticos (analytics, compra, deposito e saque) num "
+            "banco temporario com dados sinteticos e precos offline, "
+            "opcionalmente comparando com um baseline salvo.")
+
+    TICKERS = ['PETR4.SA', 'VALE3.SA', 'ITUB4.SA', 'BBDC4.SA', 'WEGE3.SA',
+               'BTC-USD']
+    TICKERS_AUXILIARES = ['^BVSP', 'USDBRL=X']
+    CASOS = ('analytics', 'analytics_view', 'compra', 'deposito', 'saque')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=100_000)
+        parser.add_argument('--movimentacoes', type=int, default=5_000_000)
+        parser.add_argument('--investimentos', type=int, default=300_000)
+        parser.add_argument('--repeticoes', type=int, default=200)
+        parser.add_argument('--repeticoes-memoria', type=int, default=5)
+        parser.add_argument('--casos', nargs='+', choices=self.CASOS,
+                            default=list(self.CASOS))
+        parser.add_argument('--fixture',
+                            help='diretorio com precos gravados '
+                                 '(exportar_replay); padrao: sinteticos')
+        parser.add_argument('--salvar-baseline', metavar='ARQUIVO')
+        parser.add_argument('--baseline', metavar='ARQUIVO',
+                            help='falha se algum caso regredir em relacao '
+                                 'a este arquivo')
+        parser.add_argument('--tolerancia', type=float, default=0.2,
+                            help='piora relativa aceita em p50/p99 e pico '
+                                 'de memoria (padrao 0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        random.seed(42)
+
+        with tempfile.TemporaryDirectory() as pasta:
+            fixture = options['fixture']
+            if not fixture:
+                fixture = pasta
+                self._gerar_fixture(Path(pasta))
+
+            with override_settings(
+                MARKET_DATA_PROVIDER='investimentos.providers.ReplayProvider',
+                MARKET_DATA_REPLAY_DIR=Path(fixture),
+                MARKET_DATA_REPLAY_DATA=None,
+                CACHES={
+                    'default': {'BACKEND': 'django.core.cache.backends'
+                                           '.locmem.LocMemCache'},
+                    'cotacoes': {'BACKEND': 'django.core.cache.backends'
+                                            '.locmem.LocMemCache'},
+                },
+            ):
+                resultados = self._executar(options)
+
+        self._imprimir(resultados)
+
+        if options['salvar_baseline']:
+            Path(options['salvar_baseline']).write_text(
+                json.dumps(resultados, indent=2))
+            self.stdout.write(
+                f"Baseline salvo em {options['salvar_baseline']}")
+
+        if options['baseline']:
+            self._comparar(resultados, options['baseline'],
+                           options['tolerancia'])
+
+    def _executar(self, options):
+        nome_original = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        cotacoes.clear()
+
+        try:
+            self.stdout.write("Populando banco temporario...")
+            usuarios, _, clientes = popular(
+                options['clientes'], options['movimentacoes'],
+                options['investimentos'], tickers=self.TICKERS,
+                fracao_ativos=0.8, saldo=Decimal('1000000.00'))
+
+            # usuarios pre-carregados: autenticar nao entra na medicao
+            self.usuarios = list(get_user_model().objects.filter(
+                id__in=usuarios[:1000]))
+            self.clientes = list(
+                ClienteInvestidor.objects.filter(
+                    id__in=Investimento.objects.filter(ativo=True)
+                    .values('cliente_id')
+                ).values_list('id', flat=True)[:1000]
+            ) or clientes
+            self.api = APIClient()
+
+            # aquece historico local e cotacoes, como em producao
+            MarketDataService.get_historico_carteira(self.TICKERS)
+            MarketDataService.get_historico_benchmark()
+            MarketDataService.get_bulk_ticker_info(self.TICKERS)
+
+            resultados = {}
+            for caso in options['casos']:
+                self.stdout.write(f"Medindo {caso}...")
+                executar = getattr(self, f'_caso_{caso}')
+                resultados[caso] = self._medir(
+                    executar, options['repeticoes'],
+                    options['repeticoes_memoria'])
+            return resultados
+
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+            teardown_test_environment()
+
+    def _medir(self, executar, repeticoes, repeticoes_memoria):
+        tempos = []
+        queries = []
+
+        for _ in range(repeticoes):
+            with CaptureQueriesContext(connection) as contexto:
+                inicio = time.perf_counter()
+                executar()
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            queries.append(len(contexto.captured_queries))
+
+        tracemalloc.start()
+        try:
+            for _ in range(repeticoes_memoria):
+                executar()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        tempos.sort()
+        return {
+            'p50_ms': round(statistics.median(tempos), 3),
+            'p99_ms': round(
+                tempos[min(len(tempos) - 1, int(len(tempos) * 0.99))], 3),
+            'queries': round(statistics.mean(queries), 1),
+            'pico_memoria_kb': round(pico / 1024, 1),
+        }
+
+    def _autenticar(self):
+        self.api.force_authenticate(user=random.choice(self.usuarios))
+
+    def _caso_analytics(self):
+        PortfolioAnalytics(Investimento.objects.filter(
+            cliente_id=random.choice(self.clientes), ativo=True)
+        ).calcular_performance()
+
+    def _caso_analytics_view(self):
+        self._autenticar()
+        self._verificar(self.api.get(reverse(
+            'portfolio_analytics', args=[random.choice(self.clientes)])))
+
+    def _caso_compra(self):
+        self._autenticar()
+        self._verificar(self.api.post(reverse('investimento-list'), {
+            'tipo_investimento': 'ACOES',
+            'ticker': random.choice(self.TICKERS),
+            'quantidade': 1,
+        }))
+
+    def _caso_deposito(self):
+        self._autenticar()
+        self._verificar(self.api.post(reverse('api_deposito'),
+                                      {'valor': '10.00'}))
+
+    def _caso_saque(self):
+        self._autenticar()
+        self._verificar(self.api.post(reverse('api_saque'),
+                                      {'valor': '10.00'}))
+
+    def _verificar(self, response):
+        if response.status_code >= 400:
+            raise CommandError(
+                f"Requisicao falhou ({response.status_code}): "
+                f"{getattr(response, 'data', response.content)}")
+
+    def _gerar_fixture(self, diretorio):
+        """passeio aleatorio deterministico de 2 anos por ticker"""
+        gerador = np.random.default_rng(42)
+        datas = pd.bdate_range(end=timezone.localdate(), periods=504)
+
+        for ticker in self.TICKERS + self.TICKERS_AUXILIARES:
+            base = 5.0 if ticker == 'USDBRL=X' else 50.0
+            retornos = gerador.normal(0.0003, 0.015, len(datas))
+            fechamentos = base * np.exp(np.cumsum(retornos))
+
+            pd.DataFrame({
+                'Date': datas,
+                'Open': fechamentos,
+                'High': fechamentos,
+                'Low': fechamentos,
+                'Close': fechamentos,
+                'Adj Close': fechamentos,
+                'Volume': 1000,
+            }).to_csv(diretorio / f'{ticker}.csv', index=False)
+
+    def _imprimir(self, resultados):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n{'caso':<16}{'p50 ms':>10}{'p99 ms':>10}"
+            f"{'queries':>10}{'pico KB':>12}"))
+        for caso, r in resultados.items():
+            self.stdout.write(
+                f"{caso:<16}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}"
+                f"{r['queries']:>10.1f}{r['pico_memoria_kb']:>12.1f}")
+
+    def _comparar(self, resultados, arquivo, tolerancia):
+        baseline = json.loads(Path(arquivo).read_text())
+        regressoes = []
+
+        for caso, atual in resultados.items():
+            anterior = baseline.get(caso)
+            if anterior is None:
+                continue
+
+            for metrica in ('p50_ms', 'p99_ms', 'pico_memoria_kb'):
+                if atual[metrica] > anterior[metrica] * (1 + tolerancia):
+                    regressoes.append(
+                        f"{caso}.{metrica}: {anterior[metrica]} -> "
+                        f"{atual[metrica]}")
+
+            if atual['queries'] > anterior['queries']:
+                regressoes.append(
+                    f"{caso}.queries: {anterior['queries']} -> "
+                    f"{atual['queries']}")
+
+        if regressoes:
+            raise CommandError(
+                "Regressoes em relacao ao baseline:\n  "
+                + "\n  ".join(regressoes))
+
+        self.stdout.write(self.style.SUCCESS(
+            "Sem regressoes em relacao ao baseline."))
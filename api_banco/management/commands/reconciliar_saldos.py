@@ -0,0 +1,185 @@
+from decimal import Decimal
+from itertools import chain
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, F, Q, Sum, When
+from django.utils import timezone
+
+from api_banco.models import ContaCorrente, Movimentacao, SaldoDiario
+
+
+class Command(BaseCommand):
+    help = ("Confere o saldo apos cada movimentacao e os rollups diarios "
+            "contra as movimentacoes brutas, lendo em blocos de tamanho "
+            "fixo. Com --corrigir, regrava o que divergir.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corrigir', action='store_true')
+        parser.add_argument('--conta', type=int,
+                            help='reconcilia apenas esta conta')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        contas = ContaCorrente.objects.order_by('id')
+        if options['conta']:
+            contas = contas.filter(id=options['conta'])
+
+        total_divergencias = 0
+        for conta_id in contas.values_list('id', flat=True).iterator():
+            if options['corrigir']:
+                # a conta fica bloqueada durante toda a correcao
+                with transaction.atomic():
+                    conta, divergencias = self._reconciliar(
+                        conta_id, options['chunk_size'], corrigir=True)
+            else:
+                conta, divergencias = self._reconciliar(
+                    conta_id, options['chunk_size'], corrigir=False)
+
+            if divergencias:
+                total_divergencias += divergencias
+                self.stdout.write(self.style.WARNING(
+                    f"Conta {conta}: {divergencias} divergência(s)"
+                    + (" corrigida(s)." if options['corrigir'] else ".")
+                ))
+
+        estilo = self.style.WARNING if total_divergencias else \
+            self.style.SUCCESS
+        self.stdout.write(estilo(
+            f"Reconciliação concluída: {total_divergencias} divergência(s)."
+        ))
+
+    def _fotografia(self, conta_id):
+        """
+        saldo, ultima movimentacao e rollups de hoje lidos juntos sob o
+        lock da conta: quem movimenta a conta espera o lock, entao o que
+        entrar depois fica fora do corte e nao gera falsa divergencia
+        """
+        with transaction.atomic():
+            conta = ContaCorrente.objects.select_for_update().get(
+                id=conta_id)
+            corte = Movimentacao.objects.filter(conta=conta).order_by(
+                '-data_movimentacao', '-id'
+            ).values_list('data_movimentacao', 'id').first()
+            hoje = timezone.localdate()
+            recentes = list(SaldoDiario.objects.filter(
+                conta=conta, data__gte=hoje).order_by('data'))
+
+        return conta, corte, hoje, recentes
+
+    def _reconciliar(self, conta_id, chunk_size, corrigir):
+        conta, corte, hoje, recentes = self._fotografia(conta_id)
+        self._divergencias = 0
+
+        movimentacoes = Movimentacao.objects.filter(conta=conta)
+        if corte is None:
+            movimentacoes = movimentacoes.none()
+        else:
+            data_corte, id_corte = corte
+            movimentacoes = movimentacoes.filter(
+                Q(data_movimentacao__lt=data_corte)
+                | Q(data_movimentacao=data_corte, id__lte=id_corte))
+
+        soma = movimentacoes.aggregate(total=Sum(Case(
+            When(tipo_operacao='C', then=F('valor')),
+            default=-F('valor'),
+        )))['total'] or Decimal('0.00')
+
+        # saldo de abertura: o que a conta tinha antes da 1a movimentacao
+        saldo = conta.saldo - soma
+
+        linhas = movimentacoes.order_by('data_movimentacao', 'id')\
+            .values_list('id', 'data_movimentacao', 'tipo_operacao',
+                         'valor', 'saldo_apos')\
+            .iterator(chunk_size=chunk_size)
+
+        # dias anteriores a hoje nao mudam mais; os de hoje vem da
+        # fotografia
+        rollups = chain(
+            SaldoDiario.objects.filter(conta=conta, data__lt=hoje)
+            .order_by('data').iterator(chunk_size=chunk_size),
+            recentes
+        )
+
+        self._comparar_rollups(
+            conta, self._dias(linhas, saldo, chunk_size, corrigir), rollups,
+            corrigir)
+
+        return conta, self._divergencias
+
+    def _dias(self, linhas, saldo, chunk_size, corrigir):
+        """
+        confere o saldo_apos de cada movimentacao e gera, em ordem de
+        data, (dia, creditos, debitos, saldo_final) esperados
+        """
+        pendentes = []
+        dia_atual = None
+        creditos = debitos = Decimal('0.00')
+
+        for id_, data_mov, tipo, valor, saldo_apos in linhas:
+            dia = timezone.localdate(data_mov)
+            if dia != dia_atual:
+                if dia_atual is not None:
+                    yield dia_atual, creditos, debitos, saldo
+                dia_atual = dia
+                creditos = debitos = Decimal('0.00')
+
+            saldo += valor if tipo == 'C' else -valor
+            if tipo == 'C':
+                creditos += valor
+            else:
+                debitos += valor
+
+            if saldo_apos != saldo:
+                self._divergencias += 1
+                if corrigir:
+                    pendentes.append(Movimentacao(id=id_, saldo_apos=saldo))
+                    if len(pendentes) >= chunk_size:
+                        Movimentacao.objects.bulk_update(pendentes,
+                                                         ['saldo_apos'])
+                        pendentes = []
+
+        if pendentes:
+            Movimentacao.objects.bulk_update(pendentes, ['saldo_apos'])
+        if dia_atual is not None:
+            yield dia_atual, creditos, debitos, saldo
+
+    def _comparar_rollups(self, conta, esperados, rollups, corrigir):
+        """merge das duas sequencias ordenadas por dia"""
+        esperado = next(esperados, None)
+        rollup = next(rollups, None)
+
+        while esperado is not None or rollup is not None:
+            if rollup is None or (esperado is not None
+                                  and esperado[0] < rollup.data):
+                self._divergente(conta, esperado, None, corrigir)
+                esperado = next(esperados, None)
+            elif esperado is None or rollup.data < esperado[0]:
+                self._divergente(conta, None, rollup, corrigir)
+                rollup = next(rollups, None)
+            else:
+                if (rollup.total_creditos, rollup.total_debitos,
+                        rollup.saldo_final) != esperado[1:]:
+                    self._divergente(conta, esperado, rollup, corrigir)
+                esperado = next(esperados, None)
+                rollup = next(rollups, None)
+
+    def _divergente(self, conta, esperado, rollup, corrigir):
+        self._divergencias += 1
+        if not corrigir:
+            return
+
+        if esperado is None:
+            rollup.delete()  # type: ignore
+            return
+
+        dia, creditos, debitos, saldo_final = esperado
+        SaldoDiario.objects.update_or_create(
+            conta=conta,
+            data=dia,
+            defaults={
+                'total_creditos': creditos,
+                'total_debitos': debitos,
+                'saldo_final': saldo_final,
+            }
+        )
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_banco', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movimentacao',
+            index=models.Index(fields=['conta', '-data_movimentacao'], name='movimentacao_conta_data_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:51
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_banco', '0002_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimentacao',
+            name='saldo_apos',
+            field=models.DecimalField(decimal_places=2, help_text='Saldo da conta logo após esta movimentação.', max_digits=15, null=True),
+        ),
+        migrations.CreateModel(
+            name='SaldoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('saldo_final', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('total_creditos', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('total_debitos', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('conta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos_diarios', to='api_banco.contacorrente')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('conta', 'data'), name='saldo_diario_conta_data')],
+            },
+        ),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from decimal import Decimal
 
@@ -72,6 +74,85 @@ class ContaCorrente(models.Model):
     def __str__(self):
         return f'{self.agencia}/{self.numero}'
 
+    def creditar(self, valor):
+        """
+        soma `valor` ao saldo com um UPDATE atomico no banco e registra a
+        movimentacao na mesma transacao
+        """
+        return self.movimentar_lote([('C', valor)])[0]
+
+    def debitar(self, valor):
+        """
+        subtrai `valor` do saldo somente se houver saldo suficiente
+        (UPDATE ... WHERE saldo >= valor), sem ler o saldo antes
+        """
+        return self.movimentar_lote([('D', valor)])[0]
+
+    def movimentar_lote(self, operacoes):
+        """
+        aplica varias operacoes [(tipo_operacao, valor), ...] de uma vez:
+        um unico UPDATE condicional com o valor liquido e um bulk_create
+        das movimentacoes, ja com o saldo apos cada uma. creditos entram
+        antes dos debitos para o saldo corrente nunca ficar negativo.
+        """
+        operacoes = sorted(
+            ((tipo, self._centavos(valor)) for tipo, valor in operacoes),
+            key=lambda operacao: operacao[0] != 'C'
+        )
+        liquido = sum(
+            (valor if tipo == 'C' else -valor for tipo, valor in operacoes),
+            Decimal('0.00')
+        )
+
+        with transaction.atomic():
+            contas = ContaCorrente.objects.filter(pk=self.pk)
+            if liquido < 0:
+                contas = contas.filter(saldo__gte=-liquido)
+
+            if not contas.update(saldo=F('saldo') + liquido):
+                raise SaldoInsuficiente()
+
+            # a linha da conta fica bloqueada pelo UPDATE ate o commit
+            self.refresh_from_db(fields=['saldo'])
+
+            saldo = self.saldo - liquido
+            movimentacoes = []
+            for tipo, valor in operacoes:
+                saldo += valor if tipo == 'C' else -valor
+                movimentacoes.append(Movimentacao(
+                    conta=self, tipo_operacao=tipo, valor=valor,
+                    saldo_apos=saldo
+                ))
+            Movimentacao.objects.bulk_create(movimentacoes)
+
+            SaldoDiario.registrar(self, movimentacoes)
+
+        return movimentacoes
+
+    def saldo_em(self, data):
+        """saldo ao final do dia `data`, lido do rollup diario"""
+        anterior = self.saldos_diarios.filter(
+            data__lte=data
+        ).order_by('-data').first()
+        if anterior is not None:
+            return anterior.saldo_final
+
+        # antes do primeiro rollup vale o saldo de abertura da conta
+        primeiro = self.saldos_diarios.order_by('data').first()
+        if primeiro is None:
+            return self.saldo
+
+        return (primeiro.saldo_final - primeiro.total_creditos
+                + primeiro.total_debitos)
+
+    @staticmethod
+    def _centavos(valor):
+        return Decimal(valor).quantize(Decimal('0.01'))
+
+
+class SaldoInsuficiente(Exception):
+    pass
+
 
 class Movimentacao(models.Model):
     TIPO_OPERACAO_CHOICES = [
@@ -99,8 +180,85 @@ class Movimentacao(models.Model):
         auto_now_add=True
     )
 
+    saldo_apos = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        null=True,
+        help_text='Saldo da conta logo após esta movimentação.'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['conta', '-data_movimentacao'],
+                         name='movimentacao_conta_data_idx'),
+        ]
+
     def __str__(self):
         # flake8: noqa
         return f'{self.get_tipo_operacao_display()} - {self.valor}' # type: ignore 
 
 
+class SaldoDiario(models.Model):
+    """
+    rollup diario do saldo de cada conta, mantido a cada movimentacao
+    """
+    conta = models.ForeignKey(
+        ContaCorrente,
+        on_delete=models.CASCADE,
+        related_name='saldos_diarios'
+    )
+
+    data = models.DateField()
+
+    saldo_final = models.DecimalField(max_digits=15, decimal_places=2)
+    total_creditos = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00')
+    )
+    total_debitos = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00')
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['conta', 'data'],
+                                    name='saldo_diario_conta_data'),
+        ]
+
+    def __str__(self):
+        return f'{self.conta} {self.data} - {self.saldo_final}'
+
+    @classmethod
+    def registrar(cls, conta, movimentacoes):
+        """
+        acumula as movimentacoes recem-criadas no rollup do dia. deve ser
+        chamado na mesma transacao do UPDATE do saldo, que serializa as
+        escritas da conta
+        """
+        if not movimentacoes:
+            return
+
+        data = timezone.localdate(movimentacoes[-1].data_movimentacao)
+        creditos = sum((m.valor for m in movimentacoes
+                        if m.tipo_operacao == 'C'), Decimal('0.00'))
+        debitos = sum((m.valor for m in movimentacoes
+                       if m.tipo_operacao == 'D'), Decimal('0.00'))
+        saldo_final = movimentacoes[-1].saldo_apos
+
+        atualizados = cls.objects.filter(conta=conta, data=data).update(
+            saldo_final=saldo_final,
+            total_creditos=F('total_creditos') + creditos,
+            total_debitos=F('total_debitos') + debitos
+        )
+
+        if not atualizados:
+            cls.objects.create(
+                conta=conta,
+                data=data,
+                saldo_final=saldo_final,
+                total_creditos=creditos,
+                total_debitos=debitos
+            )
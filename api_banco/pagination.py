@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class MovimentacaoCursorPagination(CursorPagination):
+    """
+    extrato paginado por cursor em data_movimentacao, usando o indice
+    (conta, -data_movimentacao)
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-data_movimentacao', '-id')
@@ -1,6 +1,6 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
-from .models import Pessoa, ContaCorrente, Movimentacao
+from .models import Pessoa, ContaCorrente, Movimentacao, SaldoDiario
 from django.contrib.auth import authenticate
 from django.utils.translation import gettext_lazy as _
 from decimal import Decimal
@@ -93,8 +93,9 @@ class MovimentacaoSerializer(serializers.ModelSerializer):
             'tipo_operacao',
             'valor',
             'data_movimentacao',
+            'saldo_apos',
         )
-        read_only_fields = ('data_movimentacao',)
+        read_only_fields = ('data_movimentacao', 'saldo_apos')
 
     def validate_valor(self, value):
         if value <= 0:
@@ -104,6 +105,17 @@ class MovimentacaoSerializer(serializers.ModelSerializer):
         return value
 
 
+class SaldoDiarioSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SaldoDiario
+        fields = (
+            'data',
+            'saldo_final',
+            'total_creditos',
+            'total_debitos',
+        )
+
+
 class ContaCorrenteDeactivateSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True)
 
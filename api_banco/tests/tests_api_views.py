@@ -3,8 +3,15 @@ from rest_framework import status
 from django.urls import reverse
 from decimal import Decimal
 from django.core import mail
-from api_banco.models import Pessoa, ContaCorrente
+from datetime import datetime
+from django.utils import timezone
+from api_banco.models import Pessoa, ContaCorrente, Movimentacao
 from django.contrib.auth import get_user_model
+from django.test import AsyncClient
+from asgiref.sync import sync_to_async
+from api_banco.views.extrato_api_view import ExtratoExportAPIView
+from unittest.mock import patch
+import json
 
 User = get_user_model()
 
@@ -133,3 +140,105 @@ class BankAPITest(APITestCase):
         response = self.client.post(url, data)
 
         self.assertIn(response.status_code, [401, 403])
+
+    def _criar_movimentacoes(self, datas):
+        for i, data in enumerate(datas):
+            mov = Movimentacao.objects.create(
+                conta=self.conta, tipo_operacao='C',
+                valor=Decimal(i + 1)
+            )
+            Movimentacao.objects.filter(pk=mov.pk).update(
+                data_movimentacao=timezone.make_aware(
+                    datetime.fromisoformat(data)))
+
+    def test_extrato_paginado_e_filtrado(self):
+        self._criar_movimentacoes([
+            '2026-01-10T10:00', '2026-02-10T10:00', '2026-02-20T23:30',
+            '2026-03-10T10:00',
+        ])
+        url = reverse('api_extrato', args=[self.conta.id])  # type: ignore
+
+        response = self.client.get(url, {'page_size': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)  # type: ignore
+        self.assertIsNotNone(response.data['next'])  # type: ignore
+
+        response = self.client.get(url, {'data_inicio': '2026-02-01',
+                                         'data_fim': '2026-02-20'})
+        valores = [m['valor']
+                   for m in response.data['results']]  # type: ignore
+        self.assertEqual(valores, ['3.00', '2.00'])
+
+        response = self.client.get(url, {'data_inicio': '10/02/2026'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_extrato_de_outra_conta(self):
+        outro = User.objects.create_user(  # type: ignore
+            email='outro@javer.com', password='123')
+        pessoa = Pessoa.objects.create(user=outro, nome='Outro',
+                                       cpf_cnpj='99988877766',
+                                       tipo_pessoa='F')
+        conta = ContaCorrente.objects.create(pessoa=pessoa, agencia='0001',
+                                             numero='54321')
+
+        url = reverse('api_extrato', args=[conta.id])  # type: ignore
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_exportar_extrato_streaming(self):
+        self._criar_movimentacoes(['2026-01-10T10:00', '2026-02-10T10:00'])
+        url = reverse('api_extrato_exportar',
+                      args=[self.conta.id])  # type: ignore
+
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        linhas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(linhas[0], 'id,data_movimentacao,tipo_operacao,valor,'
+                                    'saldo_apos')
+        self.assertEqual(len(linhas), 3)
+
+        response = self.client.get(url, {'formato': 'ndjson',
+                                         'data_inicio': '2026-02-01'})
+        linhas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(linhas), 1)
+        self.assertIn('"valor": "2.00"', linhas[0])
+
+    async def test_exportar_extrato_streaming_asgi(self):
+        await sync_to_async(self._criar_movimentacoes)(
+            ['2026-01-10T10:00', '2026-02-10T10:00', '2026-02-10T10:00',
+             '2026-03-10T10:00'])
+        url = reverse('api_extrato_exportar',
+                      args=[self.conta.id])  # type: ignore
+
+        cliente = AsyncClient()
+        await cliente.aforce_login(self.user)
+        with patch.object(ExtratoExportAPIView, 'CHUNK_SIZE', 2):
+            response = await cliente.get(url, {'formato': 'ndjson'})
+
+            self.assertTrue(response.is_async)
+            partes = [parte async for parte in response.streaming_content]
+
+        ids = [json.loads(linha)['id']
+               for linha in b''.join(partes).decode().splitlines()]
+        self.assertEqual(len(ids), 4)
+        self.assertEqual(len(set(ids)), 4)
+
+    def test_saldos_diarios(self):
+        self.conta.creditar(Decimal('50.00'))
+        self.conta.debitar(Decimal('20.00'))
+        url = reverse('api_saldos', args=[self.conta.id])  # type: ignore
+        hoje = timezone.localdate().isoformat()
+
+        response = self.client.get(url, {'data_inicio': hoje})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{  # type: ignore
+            'data': hoje, 'saldo_final': '130.00',
+            'total_creditos': '50.00', 'total_debitos': '20.00',
+        }])
+
+        response = self.client.get(url, {'data': '2000-01-01'})
+        self.assertEqual(response.data['saldo'],  # type: ignore
+                         Decimal('100.00'))
+
+        response = self.client.get(url, {'data': 'ontem'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
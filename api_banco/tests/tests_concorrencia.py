@@ -0,0 +1,93 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, close_old_connections, connection
+from django.test import TransactionTestCase
+
+from api_banco.models import (ContaCorrente, Movimentacao, Pessoa,
+                              SaldoInsuficiente)
+
+User = get_user_model()
+
+
+class SaqueConcorrenteTest(TransactionTestCase):
+    """dispara saques em paralelo contra a mesma conta"""
+
+    THREADS = 16
+    SALDO_INICIAL = Decimal('100.00')
+    VALOR_SAQUE = Decimal('30.00')
+
+    def setUp(self):
+        user = User.objects.create_user(  # type: ignore
+            email='concorrencia@teste.com', password='123')
+        pessoa = Pessoa.objects.create(
+            user=user, nome='Concorrencia', cpf_cnpj='12345678900',
+            tipo_pessoa='F'
+        )
+        self.conta = ContaCorrente.objects.create(
+            pessoa=pessoa, agencia='0001', numero='77777',
+            saldo=self.SALDO_INICIAL
+        )
+
+    def _disparar(self, operacao):
+        barreira = threading.Barrier(self.THREADS)
+        resultados = []
+
+        def worker():
+            try:
+                # cada thread le a conta antes das outras gravarem
+                conta = ContaCorrente.objects.get(pk=self.conta.pk)
+                barreira.wait()
+                resultados.append(self._com_retentativa(operacao, conta))
+            finally:
+                close_old_connections()
+                connection.close()
+
+        threads = [threading.Thread(target=worker)
+                   for _ in range(self.THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        return resultados
+
+    def _com_retentativa(self, operacao, conta):
+        """o SQLite serializa escritas com 'table is locked'; tenta de novo"""
+        for _ in range(200):
+            try:
+                return operacao(conta)
+            except OperationalError:
+                time.sleep(0.01)
+        raise AssertionError('banco permaneceu bloqueado')
+
+    def test_saques_paralelos_nao_deixam_saldo_negativo(self):
+        def sacar(conta):
+            try:
+                conta.debitar(self.VALOR_SAQUE)
+                return True
+            except SaldoInsuficiente:
+                return False
+
+        resultados = self._disparar(sacar)
+
+        sucessos = resultados.count(True)
+        self.assertEqual(len(resultados), self.THREADS)
+        self.assertEqual(sucessos, 3)
+
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo,
+                         self.SALDO_INICIAL - sucessos * self.VALOR_SAQUE)
+        self.assertEqual(Movimentacao.objects.filter(
+            conta=self.conta, tipo_operacao='D').count(), sucessos)
+
+    def test_depositos_paralelos_nao_perdem_atualizacao(self):
+        resultados = self._disparar(
+            lambda conta: conta.creditar(Decimal('1.00')))
+
+        self.assertEqual(len(resultados), self.THREADS)
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo,
+                         self.SALDO_INICIAL + self.THREADS * Decimal('1.00'))
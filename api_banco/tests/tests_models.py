@@ -1,7 +1,15 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
 from django.test import TestCase
+from django.core.management import call_command
 from django.db.utils import IntegrityError
+from django.utils import timezone
 from decimal import Decimal
-from api_banco.models import Pessoa, ContaCorrente, Movimentacao
+from api_banco.management.commands.reconciliar_saldos import Command
+from api_banco.models import (Pessoa, ContaCorrente, Movimentacao,
+                              SaldoDiario)
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -73,3 +81,75 @@ class ModelsTest(TestCase):
             valor=Decimal('150.50')
         )
         self.assertEqual(mov.valor, Decimal('150.50'))
+
+    def test_saldo_apos_e_rollup_diario(self):
+        conta = ContaCorrente.objects.create(pessoa=self.pessoa,
+                                             agencia='0001', numero='66666',
+                                             saldo=Decimal('100.00'))
+        conta.creditar(Decimal('50.00'))
+        debito = conta.debitar(Decimal('30.00'))
+        lote = conta.movimentar_lote([('D', Decimal('200.00')),
+                                      ('C', Decimal('100.00'))])
+
+        self.assertEqual(debito.saldo_apos, Decimal('120.00'))
+        self.assertEqual([m.saldo_apos for m in lote],
+                         [Decimal('220.00'), Decimal('20.00')])
+
+        rollup = SaldoDiario.objects.get(conta=conta)
+        self.assertEqual(rollup.data, timezone.localdate())
+        self.assertEqual(rollup.saldo_final, Decimal('20.00'))
+        self.assertEqual(rollup.total_creditos, Decimal('150.00'))
+        self.assertEqual(rollup.total_debitos, Decimal('230.00'))
+
+        hoje = timezone.localdate()
+        self.assertEqual(conta.saldo_em(hoje), Decimal('20.00'))
+        self.assertEqual(conta.saldo_em(hoje - timedelta(days=1)),
+                         Decimal('100.00'))
+
+    def test_reconciliar_saldos(self):
+        conta = ContaCorrente.objects.create(pessoa=self.pessoa,
+                                             agencia='0001', numero='77777')
+        for valor in ('10.00', '20.00', '30.00'):
+            conta.creditar(Decimal(valor))
+
+        saida = StringIO()
+        call_command('reconciliar_saldos', '--chunk-size', '2', stdout=saida)
+        self.assertIn('0 divergência(s)', saida.getvalue())
+
+        Movimentacao.objects.filter(conta=conta).update(saldo_apos=None)
+        SaldoDiario.objects.filter(conta=conta).update(
+            saldo_final=Decimal('0.00'))
+
+        saida = StringIO()
+        call_command('reconciliar_saldos', stdout=saida)
+        self.assertIn('4 divergência(s)', saida.getvalue())
+
+        call_command('reconciliar_saldos', '--corrigir', '--chunk-size', '2',
+                     stdout=StringIO())
+
+        self.assertEqual(
+            list(Movimentacao.objects.filter(conta=conta)
+                 .order_by('id').values_list('saldo_apos', flat=True)),
+            [Decimal('10.00'), Decimal('30.00'), Decimal('60.00')]
+        )
+        self.assertEqual(conta.saldos_diarios.get().saldo_final,
+                         Decimal('60.00'))
+
+    def test_reconciliar_ignora_movimentacao_apos_o_corte(self):
+        conta = ContaCorrente.objects.create(pessoa=self.pessoa,
+                                             agencia='0001', numero='88888')
+        conta.creditar(Decimal('10.00'))
+        original = Command._fotografia
+
+        def fotografia_e_deposito(comando, conta_id):
+            # outro processo movimenta a conta logo depois da leitura
+            resultado = original(comando, conta_id)
+            conta.creditar(Decimal('5.00'))
+            return resultado
+
+        saida = StringIO()
+        with patch.object(Command, '_fotografia', fotografia_e_deposito):
+            call_command('reconciliar_saldos', '--conta', str(conta.id),
+                         stdout=saida)
+
+        self.assertIn('0 divergência(s)', saida.getvalue())
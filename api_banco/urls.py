@@ -11,7 +11,10 @@ from .views import (
     ScoreCreditoAPIView,
     ClienteSignupAPIView,
     CustomLoginAPIView,
-    UserDeactivateAPIView
+    UserDeactivateAPIView,
+    ExtratoAPIView,
+    ExtratoExportAPIView,
+    SaldoHistoricoAPIView
 )
 
 
@@ -26,6 +29,21 @@ urlpatterns = [
         MovimentacaoCreateAPIView.as_view(),
         name='api_movimentacao_create'
     ),
+    path(
+        'contas/<int:conta_id>/extrato/',
+        ExtratoAPIView.as_view(),
+        name='api_extrato'
+    ),
+    path(
+        'contas/<int:conta_id>/extrato/exportar/',
+        ExtratoExportAPIView.as_view(),
+        name='api_extrato_exportar'
+    ),
+    path(
+        'contas/<int:conta_id>/saldos/',
+        SaldoHistoricoAPIView.as_view(),
+        name='api_saldos'
+    ),
     path(
         'contas/<int:conta_id>/desativar/',
         ContaCorrenteDeactivateAPIView.as_view(),
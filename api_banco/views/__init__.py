@@ -4,3 +4,5 @@ from .movimentacao_api_view import *
 from .score_api_view import *
 from .user_api_view import *
 from .cliente_signup_api_view import *
+from .extrato_api_view import *
+from .saldo_api_view import *
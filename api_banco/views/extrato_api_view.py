@@ -0,0 +1,162 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import ListAPIView
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+
+from api_banco.models import ContaCorrente, Movimentacao
+from api_banco.pagination import MovimentacaoCursorPagination
+from api_banco.serializers import MovimentacaoSerializer
+
+
+def filtrar_periodo(queryset, params):
+    """
+    aplica ?data_inicio=AAAA-MM-DD&data_fim=AAAA-MM-DD (inclusivos) como
+    intervalo de datetime, para o banco poder usar o indice
+    """
+    for param, lookup, deslocamento in (
+        ('data_inicio', 'data_movimentacao__gte', 0),
+        ('data_fim', 'data_movimentacao__lt', 1),
+    ):
+        valor = params.get(param)
+        if not valor:
+            continue
+
+        data = parse_date(valor)
+        if data is None:
+            raise ValidationError({param: 'Use o formato AAAA-MM-DD.'})
+
+        limite = timezone.make_aware(
+            datetime.combine(data + timedelta(days=deslocamento), time.min))
+        queryset = queryset.filter(**{lookup: limite})
+
+    return queryset
+
+
+class Echo:
+    """buffer que apenas devolve o que recebe, para o csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+class ExtratoAPIView(ListAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = MovimentacaoSerializer
+    pagination_class = MovimentacaoCursorPagination
+
+    def get_queryset(self):
+        conta = get_object_or_404(
+            ContaCorrente,
+            id=self.kwargs['conta_id'],
+            pessoa=self.request.user.pessoa  # type: ignore
+        )
+
+        return filtrar_periodo(
+            Movimentacao.objects.filter(conta=conta),
+            self.request.query_params  # type: ignore
+        )
+
+
+class ExtratoExportAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+    CHUNK_SIZE = 2000
+    CAMPOS = ('id', 'data_movimentacao', 'tipo_operacao', 'valor',
+              'saldo_apos')
+
+    def get(self, request, conta_id):
+        conta = get_object_or_404(
+            ContaCorrente,
+            id=conta_id,
+            pessoa=request.user.pessoa
+        )
+
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in ('csv', 'ndjson'):
+            raise ValidationError({'formato': 'Use csv ou ndjson.'})
+
+        linhas = filtrar_periodo(
+            Movimentacao.objects.filter(conta=conta),
+            request.query_params
+        ).order_by('data_movimentacao', 'id').values_list(*self.CAMPOS)
+
+        if formato == 'csv':
+            cabecalho, formatar = self._csv()
+            content_type = 'text/csv'
+        else:
+            cabecalho, formatar = None, self._ndjson
+            content_type = 'application/x-ndjson'
+
+        # sob ASGI o Django consome iteradores sincronos com
+        # sync_to_async(list), ou seja, o extrato inteiro em memoria; la
+        # o conteudo e assincrono e busca um lote por vez
+        if isinstance(request._request, ASGIRequest):
+            conteudo = self._gerar_async(linhas, cabecalho, formatar)
+        else:
+            conteudo = self._gerar(linhas, cabecalho, formatar)
+
+        response = StreamingHttpResponse(conteudo, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="extrato_{conta.numero}.{formato}"')
+        return response
+
+    def _gerar(self, linhas, cabecalho, formatar):
+        if cabecalho is not None:
+            yield cabecalho
+        for linha in linhas.iterator(chunk_size=self.CHUNK_SIZE):
+            yield formatar(linha)
+
+    async def _gerar_async(self, linhas, cabecalho, formatar):
+        if cabecalho is not None:
+            yield cabecalho
+
+        ultima = None
+        while True:
+            lote = await sync_to_async(self._lote)(linhas, ultima)
+            for linha in lote:
+                yield formatar(linha)
+            if len(lote) < self.CHUNK_SIZE:
+                return
+            ultima = lote[-1]
+
+    def _lote(self, linhas, ultima):
+        """
+        proximo lote apos `ultima` por (data_movimentacao, id): cada lote e
+        uma consulta curta no indice, sem cursor aberto entre os awaits
+        """
+        if ultima is not None:
+            id_, data = ultima[0], ultima[1]
+            linhas = linhas.filter(
+                Q(data_movimentacao__gt=data)
+                | Q(data_movimentacao=data, id__gt=id_))
+        return list(linhas[:self.CHUNK_SIZE])
+
+    def _csv(self):
+        writer = csv.writer(Echo())
+
+        def formatar(linha):
+            id_, data, tipo, valor, saldo_apos = linha
+            return writer.writerow([id_, data.isoformat(), tipo, valor,
+                                    saldo_apos])
+
+        return writer.writerow(self.CAMPOS), formatar
+
+    def _ndjson(self, linha):
+        id_, data, tipo, valor, saldo_apos = linha
+        return json.dumps({
+            'id': id_,
+            'data_movimentacao': data.isoformat(),
+            'tipo_operacao': tipo,
+            'valor': str(valor),
+            'saldo_apos': None if saldo_apos is None else str(saldo_apos),
+        }) + '\n'
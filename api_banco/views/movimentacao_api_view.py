@@ -1,7 +1,7 @@
 from django.contrib.auth import get_user_model
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from api_banco.models import ContaCorrente, Movimentacao
+from api_banco.models import ContaCorrente, SaldoInsuficiente
 from decimal import Decimal
 from rest_framework.permissions import IsAuthenticated
 
@@ -27,19 +27,20 @@ class MovimentacaoCreateAPIView(APIView):
                 pessoa=request.user.pessoa
             )
 
-            movimentacao = Movimentacao.objects.create(
-                conta=conta,
-                tipo_operacao=serializer
-                .validated_data['tipo_operacao'],  # type: ignore
-                valor=serializer.validated_data['valor']  # type: ignore
-            )
-
-            if movimentacao.tipo_operacao == 'D':
-                conta.saldo -= movimentacao.valor
-            else:
-                conta.saldo += movimentacao.valor
-
-            conta.save()
+            tipo_operacao = serializer\
+                .validated_data['tipo_operacao']  # type: ignore
+            valor = serializer.validated_data['valor']  # type: ignore
+
+            try:
+                if tipo_operacao == 'D':
+                    movimentacao = conta.debitar(valor)
+                else:
+                    movimentacao = conta.creditar(valor)
+            except SaldoInsuficiente:
+                return Response(
+                    {"detail": "Saldo insuficiente."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
             return Response(
                 MovimentacaoSerializer(movimentacao).data,
@@ -71,14 +72,7 @@ class DepositoAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        conta.saldo += valor
-        conta.save()
-
-        Movimentacao.objects.create(
-            conta=conta,
-            tipo_operacao='C',
-            valor=valor
-        )
+        conta.creditar(valor)
 
         return Response(
             {"detail": "Depósito realizado com sucesso."},
@@ -108,21 +102,14 @@ class SaqueAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if conta.saldo < valor:
+        try:
+            conta.debitar(valor)
+        except SaldoInsuficiente:
             return Response(
                 {"detail": "Saldo insuficiente."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        conta.saldo -= valor
-        conta.save()
-
-        Movimentacao.objects.create(
-            conta=conta,
-            tipo_operacao='D',
-            valor=valor
-        )
-
         return Response(
             {"detail": "Saque realizado com sucesso."},
             status=status.HTTP_200_OK
@@ -0,0 +1,46 @@
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api_banco.models import ContaCorrente
+from api_banco.serializers import SaldoDiarioSerializer
+
+
+class SaldoHistoricoAPIView(APIView):
+    """
+    ?data=AAAA-MM-DD devolve o saldo ao final daquele dia; sem ela, a serie
+    diaria entre data_inicio e data_fim (inclusivos), lida de SaldoDiario
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, conta_id):
+        conta = get_object_or_404(
+            ContaCorrente,
+            id=conta_id,
+            pessoa=request.user.pessoa
+        )
+
+        if 'data' in request.query_params:
+            data = self._data(request.query_params, 'data')
+            return Response({
+                'data': data,
+                'saldo': conta.saldo_em(data),
+            })
+
+        saldos = conta.saldos_diarios.order_by('data')
+        for param, lookup in (('data_inicio', 'data__gte'),
+                              ('data_fim', 'data__lte')):
+            if request.query_params.get(param):
+                saldos = saldos.filter(
+                    **{lookup: self._data(request.query_params, param)})
+
+        return Response(SaldoDiarioSerializer(saldos, many=True).data)
+
+    def _data(self, params, param):
+        data = parse_date(params.get(param, ''))
+        if data is None:
+            raise ValidationError({param: 'Use o formato AAAA-MM-DD.'})
+        return data
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ClienteInvestidor, Investimento
+from .models import Ativo, ClienteInvestidor, Investimento
 
 
 class InvestimentoInline(admin.TabularInline):
@@ -63,4 +63,11 @@ class InvestimentoAdmin(admin.ModelAdmin):
 
     @admin.display(description='Valor Investido')
     def get_valor_formatado(self, obj):
-        return f"R$ {obj.valor_investido:,.2f}"
\ No newline at end of file
+        return f"R$ {obj.valor_investido:,.2f}"
+
+
+@admin.register(Ativo)
+class AtivoAdmin(admin.ModelAdmin):
+    list_display = ('ticker', 'nome', 'tipo', 'relevancia', 'ativo')
+    search_fields = ('ticker', 'nome')
+    list_filter = ('tipo', 'ativo')
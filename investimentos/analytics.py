@@ -1,68 +1,255 @@
+from datetime import timedelta
+
 import pandas as pd
 import numpy as np
+from investimentos.models import PortfolioSnapshot
+from investimentos import risco
+from investimentos.posicoes import (DIAS_ANO, LinhaDoTempoPosicoes,
+                                    retorno_ponderado_pelo_dinheiro,
+                                    retornos_ponderados_no_tempo)
+from investimentos.price_store import inicio_do_periodo
+from investimentos.providers import get_provider
 from investimentos.services import MarketDataService
+from investimentos.telemetry import logger
+from project.instrumentation import medir
 
 
 class PortfolioAnalytics:
+    TOLERANCIA_SNAPSHOT_DIAS = 5
+
     def __init__(self, investimentos_queryset):
         """
         recebe um queryset de investimentos do model.
         """
         self.investimentos = investimentos_queryset
-        self.posicao_atual = {
-            inv.ticker.upper(): float(inv.quantidade)
-            for inv in investimentos_queryset 
-            if inv.ticker and inv.quantidade > 0
-        }
+        self.posicao_atual = {}
+        for inv in investimentos_queryset:
+            if inv.ativo and inv.ticker and inv.quantidade > 0:
+                ticker = inv.ticker.upper()
+                self.posicao_atual[ticker] = \
+                    self.posicao_atual.get(ticker, 0.0) + float(inv.quantidade)
         self.tickers = list(self.posicao_atual.keys())
 
+        # aplicacoes e resgates datados: a curva usa a carteira que o
+        # cliente tinha em cada dia, nao a de hoje aplicada ao passado
+        self.linha_do_tempo = LinhaDoTempoPosicoes.from_investimentos(
+            investimentos_queryset)
+
     def calcular_performance(self, periodo="1y", benchmark_ticker="^BVSP"):
         """
         gera todas as metricas necessarias para o dashboard
         """
-        if not self.tickers:
+        if not self.linha_do_tempo.tickers:
             return None
 
-        df_precos = MarketDataService.get_historico_carteira(self.tickers, 
-                                                             periodo)
+        df_precos = MarketDataService.get_historico_carteira(
+            self.linha_do_tempo.tickers, periodo)
         
         if df_precos.empty:
             return None
 
-        df_saldo = df_precos.copy()
-        
-        colunas_map = {}
-        for col in df_precos.columns:
-            ticker_sem_sa = col.replace('.SA', '')
-            colunas_map[ticker_sem_sa] = col
-
-        for ticker_db, qtd in self.posicao_atual.items():
-            col_nome = colunas_map.get(ticker_db, ticker_db)
-            
-            if col_nome in df_saldo.columns:
-                df_saldo[col_nome] = df_saldo[col_nome] * qtd
-            else:
-                pass
+        with medir('analytics'):
+            valores, fluxos = self.linha_do_tempo.avaliar(df_precos)
+            series_retorno_diario = self._retornos_da_posicao(
+                df_precos.index, valores, fluxos)
+
+        if series_retorno_diario.empty:
+            return None
 
-        df_saldo['Portfolio_Total'] = df_saldo.sum(axis=1)  # type: ignore
+        resultado = self._montar_resultado(series_retorno_diario, periodo,
+                                           benchmark_ticker)
 
-        series_retorno_diario = df_saldo['Portfolio_Total'].pct_change()\
-            .dropna()
-        
-        series_retorno_acumulado = (1 + series_retorno_diario).cumprod() - 1
+        self._incluir_mwr(resultado, df_precos.index, valores, fluxos)
+        return resultado
+
+    @staticmethod
+    def _incluir_mwr(resultado, datas, valores, fluxos):
+        if resultado['metricas']:
+            resultado['metricas']['retorno_ponderado_dinheiro_anual_pct'] = \
+                _pct(retorno_ponderado_pelo_dinheiro(datas, valores, fluxos))
+
+    def _retornos_da_posicao(self, datas, valores, fluxos):
+        """
+        retorno diario ponderado no tempo da carteira que o cliente tinha
+        em cada data, a partir do primeiro dia com posicao
+        """
+        retornos = pd.Series(retornos_ponderados_no_tempo(valores, fluxos),
+                             index=datas[1:])
+
+        com_posicao = np.flatnonzero(valores[:-1] > 0)
+        if not len(com_posicao):
+            return pd.Series(dtype='float64')
+        return retornos.iloc[com_posicao[0]:]
+
+    def calcular_metricas_moveis(self, periodo="1y", janelas=(21, 63, 252),
+                                 benchmark_ticker="^BVSP"):
+        """
+        retorno, volatilidade, Sharpe e correlacao com o benchmark em
+        janelas moveis de cada tamanho, uma serie por data do periodo. o
+        historico e lido com folga antes do inicio para que a maior janela
+        ja esteja completa no primeiro dia exibido.
+        """
+        if not self.linha_do_tempo.tickers:
+            return None
+
+        inicio = inicio_do_periodo(periodo)
+        folga = timedelta(days=int(max(janelas) * 7 / 5) + 10)
+
+        df_precos = MarketDataService.get_historico_carteira(
+            self.linha_do_tempo.tickers, inicio=inicio - folga)
+        if df_precos.empty:
+            return None
 
+        serie_bench = MarketDataService.get_historico_benchmark(
+            benchmark_ticker, inicio=inicio - folga)
+
+        with medir('analytics'):
+            retornos = self._retornos_da_posicao(
+                df_precos.index, *self.linha_do_tempo.avaliar(df_precos))
+            if retornos.empty:
+                return None
+
+            retornos_bench = None
+            if not serie_bench.empty:
+                retornos_bench = serie_bench.reindex(retornos.index).ffill()\
+                    .pct_change().to_numpy(dtype='float64')
+
+            livre_de_risco = risco.taxa_livre_de_risco(retornos.index)
+            exibir = retornos.index >= pd.Timestamp(inicio)
+
+            series = {}
+            for janela in janelas:
+                moveis = risco.metricas_moveis(
+                    retornos.to_numpy(dtype='float64'), livre_de_risco,
+                    janela, retornos_bench)
+                series[str(janela)] = {
+                    "retorno_pct": _lista(moveis['retorno'][exibir] * 100),
+                    "volatilidade_pct": _lista(
+                        moveis['volatilidade'][exibir] * 100),
+                    "sharpe": _lista(moveis['sharpe'][exibir]),
+                    "correlacao_benchmark": _lista(
+                        moveis['correlacao'][exibir]),
+                }
+
+        return {
+            "datas": [d.strftime('%Y-%m-%d')
+                      for d in retornos.index[exibir]],
+            "janelas": series
+        }
+
+    def calcular_performance_snapshots(self, cliente_id, periodo="1y",
+                                       benchmark_ticker="^BVSP",
+                                       cotacoes=None):
+        """
+        mesma saida de calcular_performance, lida de PortfolioSnapshot.
+        so o ponto de hoje e calculado na hora, com `cotacoes` quando ja
+        vierem prontas. retorna None quando os snapshots nao cobrem o
+        periodo pedido.
+        """
+        hoje = get_provider().agora().date()
+        inicio = inicio_do_periodo(periodo, hoje)
+        tolerancia = timedelta(days=self.TOLERANCIA_SNAPSHOT_DIAS)
+
+        linhas = list(
+            PortfolioSnapshot.objects.filter(
+                cliente_id=cliente_id,
+                data__gte=inicio
+            ).order_by('data').values_list('data', 'valor_total', 'fluxo',
+                                           'retorno_diario')
+        )
+
+        if len(linhas) < 2 or linhas[0][0] > inicio + tolerancia or \
+                linhas[-1][0] < hoje - tolerancia:
+            return None
+
+        datas, valores, fluxos, retornos = (list(c) for c in zip(*linhas))
+
+        ultima_data = datas[-1]
+        if ultima_data < hoje:
+            de_hoje = self._retorno_de_hoje(ultima_data, cotacoes)
+            if de_hoje is not None:
+                retorno_hoje, valor_hoje = de_hoje
+                datas.append(hoje)
+                retornos.append(retorno_hoje)
+                # o aporte de hoje e o que o retorno do dia nao explica
+                fluxos.append(valor_hoje - valores[-1] * (1 + retorno_hoje))
+                valores.append(valor_hoje)
+
+        valores = np.array(valores)
+        com_posicao = np.flatnonzero(valores[:-1] > 0)
+        if not len(com_posicao):
+            return None
+
+        primeiro = com_posicao[0] + 1
+        series_retorno_diario = pd.Series(
+            retornos[primeiro:], index=pd.to_datetime(datas[primeiro:]))
+
+        resultado = self._montar_resultado(series_retorno_diario, periodo,
+                                           benchmark_ticker)
+        self._incluir_mwr(resultado, datas, valores, fluxos)
+        return resultado
+
+    def tickers_normalizados(self):
+        return MarketDataService._normalizar_tickers(self.tickers)
+
+    def _retorno_de_hoje(self, ultima_data, cotacoes=None):
+        """
+        (retorno, valor): variacao da posicao atual entre o ultimo
+        fechamento gravado e a cotacao corrente, e o valor dela agora
+        """
+        posicao = {}
+        for ticker, qtd in self.posicao_atual.items():
+            ticker = MarketDataService._normalizar_ticker(ticker)
+            posicao[ticker] = posicao.get(ticker, 0.0) + qtd
+
+        df_precos = MarketDataService.get_historico_carteira(
+            list(posicao), inicio=ultima_data - timedelta(days=7))
+        df_precos = df_precos.loc[:pd.Timestamp(ultima_data)]
+        if df_precos.empty:
+            return None
+
+        fechamento = df_precos.iloc[-1]
+        if cotacoes is None:
+            cotacoes = MarketDataService.get_bulk_ticker_info(list(posicao))
+
+        valor_anterior = 0.0
+        valor_hoje = 0.0
+        for ticker, qtd in posicao.items():
+            preco_anterior = float(fechamento.get(ticker, 0.0))
+            info = cotacoes.get(ticker)
+
+            valor_anterior += qtd * preco_anterior
+            valor_hoje += qtd * (info['price'] if info else preco_anterior)
+
+        if valor_anterior <= 0:
+            return None
+
+        return valor_hoje / valor_anterior - 1, valor_hoje
+
+    def _montar_resultado(self, series_retorno_diario, periodo,
+                          benchmark_ticker):
         serie_bench = MarketDataService.get_historico_benchmark(
             benchmark_ticker, periodo)
+
+        with medir('analytics'):
+            return self._consolidar(series_retorno_diario, serie_bench)
+
+    def _consolidar(self, series_retorno_diario, serie_bench):
+        series_retorno_acumulado = (1 + series_retorno_diario).cumprod() - 1
+
+        bench_alinhado = None
         if not serie_bench.empty:
             serie_bench = serie_bench.reindex(series_retorno_diario.index)\
                 .ffill()
-            bench_retorno_diario = serie_bench.pct_change().dropna()
+            bench_alinhado = serie_bench.pct_change()
+            bench_retorno_diario = bench_alinhado.dropna()
             bench_acumulado = (1 + bench_retorno_diario).cumprod() - 1
         else:
             bench_acumulado = pd.Series()
 
         metricas = self._calcular_kpis(series_retorno_diario, 
-                                       series_retorno_acumulado)
+                                       series_retorno_acumulado,
+                                       bench_alinhado)
 
         return {
             "historico": {
@@ -76,7 +263,12 @@ class PortfolioAnalytics:
             "metricas": metricas
         }
 
-    def _calcular_kpis(self, retornos_diarios, retorno_acumulado):
+    def _calcular_kpis(self, retornos_diarios, retorno_acumulado,
+                       retornos_bench=None):
+        """
+        retornos_bench: retornos do benchmark nas mesmas datas (NaN onde
+        nao houver cotacao), para beta, alfa e tracking error
+        """
         try:
             if retorno_acumulado.empty:
                 return {}
@@ -92,17 +284,230 @@ class PortfolioAnalytics:
 
             volatilidade = retornos_diarios.std() * np.sqrt(252)
 
+            risco_carteira = risco.metricas_de_risco(
+                retornos_diarios.to_numpy(dtype='float64'),
+                risco.taxa_livre_de_risco(retornos_diarios.index),
+                None if retornos_bench is None
+                else retornos_bench.to_numpy(dtype='float64')
+            )
+
             return {
                 "retorno_total_pct": float(round(retorno_total * 100, 2)),
                 "retorno_anualizado_pct": float(round(retorno_anualizado * 100, 
                                                       2)),
                 "volatilidade_pct": float(round(volatilidade * 100, 2)),
-                "sharpe_ratio": 0.0
+                **risco.formatar(risco_carteira)
             }
-        except Exception as e:
-            print(f"Erro calculando KPIs: {e}")
+        except Exception:
+            logger.exception('erro calculando KPIs',
+                             extra={'evento': 'erro'})
             return {
                 "retorno_total_pct": 0.0,
                 "retorno_anualizado_pct": 0.0,
                 "volatilidade_pct": 0.0
-            }
\ No newline at end of file
+            }
+
+
+def _pct(taxa):
+    """taxa -> percentual com 2 casas, None quando indefinida"""
+    if taxa is None or not np.isfinite(taxa):
+        return None
+    return float(round(taxa * 100, 2))
+
+
+def _lista(valores, casas=2):
+    """array -> lista JSON, com None no lugar de NaN"""
+    arredondados = np.round(valores, casas)
+    return np.where(np.isfinite(arredondados), arredondados, None).tolist()
+
+
+class BatchPortfolioAnalytics:
+    def __init__(self, linha_do_tempo):
+        """
+        recebe a linha do tempo de todos os clientes, com colunas
+        (cliente_id, ticker), e avalia as carteiras de uma vez: quantidades
+        (datas x colunas) vezes o preco do ticker de cada coluna, somadas
+        por cliente.
+        """
+        self.linha_do_tempo = linha_do_tempo
+        colunas = linha_do_tempo.tickers
+
+        self.tickers = sorted({ticker for _, ticker in colunas})
+        indice_ticker = {t: i for i, t in enumerate(self.tickers)}
+        self._ticker_da_coluna = np.array(
+            [indice_ticker[ticker] for _, ticker in colunas], dtype='int64')
+
+        # as colunas vem ordenadas por cliente, entao as de cada um sao
+        # contiguas e a soma por cliente e um unico np.add.reduceat
+        clientes, self._primeira_coluna = np.unique(
+            [cliente_id for cliente_id, _ in colunas], return_index=True)
+        self.clientes = clientes.tolist()
+
+    @classmethod
+    def from_queryset(cls, investimentos_queryset):
+        """
+        aplicacoes e resgates de todos os clientes em uma unica query
+        """
+        investimentos = investimentos_queryset.filter(
+            ticker__isnull=False,
+            quantidade__gt=0
+        ).exclude(ticker='').only('cliente', 'ticker', 'quantidade', 'ativo',
+                                  'data_aplicacao', 'data_resgate')
+
+        return cls(LinhaDoTempoPosicoes.from_investimentos(
+            investimentos.iterator(), por_cliente=True))
+
+    def avaliar(self, periodo="1y", inicio=None):
+        """
+        (valores, fluxos), DataFrames datas x clientes: valor diario de
+        cada carteira e o aporte liquido do dia, com um unico historico de
+        precos para todos os clientes
+        """
+        if not self.clientes:
+            return pd.DataFrame(), pd.DataFrame()
+
+        df_precos = MarketDataService.get_historico_carteira(
+            self.tickers, periodo, inicio=inicio)
+        if df_precos.empty:
+            return pd.DataFrame(), pd.DataFrame()
+
+        with medir('analytics'):
+            precos = df_precos.reindex(columns=self.tickers, fill_value=0.0)\
+                .to_numpy(dtype='float64')[:, self._ticker_da_coluna]
+            quantidades, variacoes = self.linha_do_tempo.quantidades(
+                df_precos.index)
+
+            valores = np.add.reduceat(quantidades * precos,
+                                      self._primeira_coluna, axis=1)
+            fluxos = np.add.reduceat(variacoes * precos,
+                                     self._primeira_coluna, axis=1)
+
+        return (pd.DataFrame(valores, index=df_precos.index,
+                             columns=self.clientes),
+                pd.DataFrame(fluxos, index=df_precos.index,
+                             columns=self.clientes))
+
+    def calcular_performance(self, periodo="1y"):
+        """
+        KPIs de cada cliente: { cliente_id: metricas }, as mesmas de
+        PortfolioAnalytics.calcular_performance sem benchmark
+        """
+        resultado = {cliente_id: {} for cliente_id in self.clientes}
+        df_valores, df_fluxos = self.avaliar(periodo)
+        if len(df_valores) < 2:
+            return resultado
+
+        datas = df_valores.index
+        valores = df_valores.to_numpy()
+        fluxos = df_fluxos.to_numpy()
+
+        with medir('analytics'):
+            retornos = retornos_ponderados_no_tempo(valores, fluxos)
+            mwr = self._retornos_ponderados_pelo_dinheiro(datas, valores,
+                                                          fluxos)
+
+            # cada cliente entra a partir do primeiro dia com posicao; os
+            # que comecam no mesmo dia sao calculados juntos
+            com_posicao = valores[:-1] > 0
+            primeiro_dia = np.where(com_posicao.any(axis=0),
+                                    com_posicao.argmax(axis=0), -1)
+
+            for inicio in np.unique(primeiro_dia[primeiro_dia >= 0]):
+                colunas = np.flatnonzero(primeiro_dia == inicio)
+                kpis = self._calcular_kpis(retornos[inicio:, colunas],
+                                           datas[inicio + 1:])
+
+                for metricas, j in zip(kpis, colunas):
+                    if metricas:
+                        metricas["retorno_ponderado_dinheiro_anual_pct"] = \
+                            _pct(mwr[j])
+                    resultado[self.clientes[j]] = metricas
+
+        return resultado
+
+    @staticmethod
+    def _calcular_kpis(retornos, datas):
+        """
+        retornos: (dias, carteiras), todas com a mesma janela. uma lista
+        de metricas por carteira, vazia onde o retorno nao e finito
+        """
+        retorno_total = np.cumprod(1 + retornos, axis=0)[-1] - 1
+
+        anos = len(retornos) / 252
+        with np.errstate(invalid='ignore'):
+            retorno_anualizado = (1 + retorno_total) ** (1 / anos) - 1
+        volatilidade = np.std(retornos, axis=0, ddof=1) * np.sqrt(252)
+        risco_carteiras = risco.metricas_de_risco(
+            retornos, risco.taxa_livre_de_risco(datas))
+
+        return [
+            {
+                "retorno_total_pct": float(round(retorno_total[k] * 100, 2)),
+                "retorno_anualizado_pct": float(
+                    round(retorno_anualizado[k] * 100, 2)),
+                "volatilidade_pct": float(round(volatilidade[k] * 100, 2)),
+                **risco.formatar(risco_carteiras, k),
+            } if np.isfinite(retorno_total[k]) else {}
+            for k in range(retornos.shape[1])
+        ]
+
+    @staticmethod
+    def _retornos_ponderados_pelo_dinheiro(datas, valores, fluxos,
+                                           iteracoes=100, tolerancia=1e-10):
+        """
+        TIR anual de cada cliente (NaN quando indefinida). sem aportes nem
+        resgates depois do primeiro dia ela e o retorno composto por ano
+        corrido; os demais passam por um newton na matriz inteira, e so as
+        colunas que nao convergem caem no calculo escalar (bissecao)
+        """
+        anos = (datas[-1] - datas[0]).days / DIAS_ANO
+        sem_fluxo = ~fluxos[1:].any(axis=0) & (valores[0] > 0) & \
+            (valores[-1] > 0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mwr = np.where(sem_fluxo,
+                           (valores[-1] / valores[0]) ** (1 / anos) - 1,
+                           np.nan)
+
+        # mesmo fluxo de caixa de retorno_ponderado_pelo_dinheiro, por coluna
+        caixa = -fluxos[:, ~sem_fluxo]
+        caixa[0] = -valores[0, ~sem_fluxo]
+        caixa[-1] += valores[-1, ~sem_fluxo]
+        definida = (caixa > 0).any(axis=0) & (caixa < 0).any(axis=0)
+        colunas = np.flatnonzero(~sem_fluxo)[definida]
+        caixa = caixa[:, definida]
+        prazos = ((datas - datas[0]).days.to_numpy(dtype='float64')
+                  / DIAS_ANO)[:, None]
+
+        taxa = np.full(len(colunas), 0.1)
+        ativas = np.ones(len(colunas), dtype=bool)
+        convergiu = np.zeros(len(colunas), dtype=bool)
+        with np.errstate(all='ignore'):
+            for _ in range(iteracoes):
+                if not ativas.any():
+                    break
+                t = taxa[ativas]
+                fatores = (1 + t) ** -prazos
+                derivada = (-prazos * caixa[:, ativas] * fatores
+                            / (1 + t)).sum(axis=0)
+                passo = (caixa[:, ativas] * fatores).sum(axis=0) / derivada
+                t = t - passo
+
+                # derivada nula ou taxa fora do dominio: desiste do newton
+                falhou = (derivada == 0) | ~np.isfinite(derivada) | \
+                    (t <= -1) | ~np.isfinite(t)
+                pronta = ~falhou & (np.abs(passo) < tolerancia)
+
+                indices = np.flatnonzero(ativas)
+                taxa[indices] = t
+                convergiu[indices[pronta]] = True
+                ativas[indices[falhou | pronta]] = False
+
+        mwr[colunas[convergiu]] = taxa[convergiu]
+        for j in colunas[~convergiu]:
+            tir = retorno_ponderado_pelo_dinheiro(datas, valores[:, j],
+                                                  fluxos[:, j])
+            if tir is not None:
+                mwr[j] = tir
+
+        return mwr
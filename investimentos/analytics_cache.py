@@ -0,0 +1,95 @@
+"""
+cache dos resultados de PortfolioAnalyticsView no cache do Django,
+compartilhado entre os processos.
+
+a chave junta a impressao digital da carteira ativa, o periodo, o
+benchmark, o dia e a ultima data de mercado sincronizada, mais uma versao
+por cliente que o InvestimentoViewSet troca a cada aplicacao ou
+resgate. o hash da chave e tambem o ETag da resposta, entao um dashboard
+que repete If-None-Match recebe 304 sem recalculo nem serializacao.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Max
+from django.utils import timezone
+
+from investimentos.models import SincronizacaoPreco
+from investimentos.services import MarketDataService
+
+
+def impressao_digital(investimentos):
+    """hash estavel do conjunto (ticker, quantidade, aplicacao) ativo"""
+    posicoes = sorted(
+        ((inv.ticker or '').upper(), str(inv.quantidade),
+         inv.data_aplicacao.isoformat())
+        for inv in investimentos if inv.ativo
+    )
+    return hashlib.sha1(repr(posicoes).encode()).hexdigest()
+
+
+class CacheAnalytics:
+    PREFIXO = 'analytics'
+
+    def __init__(self, alias=None):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias or getattr(
+            settings, 'ANALYTICS_CACHE_ALIAS', 'default')]
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'ANALYTICS_CACHE_TTL', 60)
+
+    def _versao(self, cliente_id):
+        return f'{self.PREFIXO}:versao:{cliente_id}'
+
+    def chave(self, cliente_id, investimentos, periodo, benchmark):
+        """
+        hash de tudo de que o resultado depende; serve de chave e de ETag
+        """
+        tickers = MarketDataService._normalizar_tickers(
+            inv.ticker for inv in investimentos if inv.ticker)
+        ultima_data = SincronizacaoPreco.objects.filter(
+            ticker__in=tickers + [benchmark]
+        ).aggregate(ultima=Max('ultima_data'))['ultima']
+
+        try:
+            versao = self.cache.get(self._versao(cliente_id), 0)
+        except Exception:
+            versao = 0
+
+        partes = (cliente_id, versao, impressao_digital(investimentos),
+                  periodo, benchmark, timezone.localdate(), ultima_data)
+        return hashlib.sha1(repr(partes).encode()).hexdigest()
+
+    def get(self, chave):
+        try:
+            return self.cache.get(f'{self.PREFIXO}:{chave}')
+        except Exception:
+            return None
+
+    def set(self, chave, dados):
+        try:
+            self.cache.set(f'{self.PREFIXO}:{chave}', dados, timeout=self.ttl)
+        except Exception:
+            pass
+
+    def invalidar(self, cliente_id):
+        """
+        troca a versao do cliente, o que descarta todas as suas chaves.
+        um valor novo (e nao incr) nunca repete uma versao antiga, mesmo
+        se a entrada da versao for despejada do cache.
+        """
+        try:
+            self.cache.set(self._versao(cliente_id), time.time_ns(),
+                           timeout=None)
+        except Exception:
+            pass
+
+
+cache_analytics = CacheAnalytics()
@@ -0,0 +1,98 @@
+import asyncio
+
+from investimentos.providers import get_provider
+from investimentos.quote_cache import compartilhadas, cotacoes
+from investimentos.services import MarketDataService, registrar_consultas
+from investimentos.telemetry import telemetria
+
+
+class AsyncMarketDataService:
+    """
+    versao assincrona das consultas de cotacao do MarketDataService, para
+    as views servidas pelo ASGI. usa o mesmo cache de cotacoes.
+    """
+
+    @staticmethod
+    async def get_ticker_info(ticker):
+        """
+        retorna dicionario completo: { 'price': 100.0, 'currency': 'BRL' }
+        """
+        info = cotacoes.get(('info', ticker))
+        if info is None:
+            publicadas = await compartilhadas.aget_many([('info', ticker)])
+            info = publicadas.get(('info', ticker))
+            if info is not None:
+                cotacoes.set(('info', ticker), ticker, info)
+
+        if info is not None:
+            telemetria.registrar(ticker, 'cache_hit')
+            return info
+
+        telemetria.registrar(ticker, 'cache_miss')
+        return await AsyncMarketDataService._buscar_ticker_info(ticker)
+
+    @staticmethod
+    async def _buscar_ticker_info(ticker):
+        preco = await get_provider().acotacao(ticker)
+        if preco is None:
+            return None
+
+        info = {
+            'price': preco,
+            'currency': MarketDataService._inferir_moeda(ticker)
+        }
+        cotacoes.set(('info', ticker), ticker, info)
+        return info
+
+    @staticmethod
+    async def get_bulk_ticker_info(tickers):
+        """
+        cotacao de varios tickers em paralelo, respeitando o limite de
+        concorrencia do provedor.
+        retorna { ticker: {'price': ..., 'currency': ...} ou None }
+        """
+        resultado = {}
+        faltantes = []
+
+        for ticker in dict.fromkeys(tickers):
+            info = cotacoes.get(('info', ticker))
+            if info is not None:
+                resultado[ticker] = info
+            else:
+                faltantes.append(ticker)
+
+        if faltantes:
+            publicadas = await compartilhadas.aget_many(
+                [('info', ticker) for ticker in faltantes])
+            for (_, ticker), info in publicadas.items():
+                cotacoes.set(('info', ticker), ticker, info)
+                resultado[ticker] = info
+
+        faltantes = [t for t in faltantes if t not in resultado]
+        registrar_consultas(resultado, faltantes)
+        infos = await asyncio.gather(*(
+            AsyncMarketDataService._buscar_ticker_info(ticker)
+            for ticker in faltantes
+        ))
+        resultado.update(zip(faltantes, infos))
+
+        return {ticker: resultado[ticker] for ticker in dict.fromkeys(tickers)}
+
+    @staticmethod
+    async def get_dolar_rate():
+        """retorna a cotacao atual do dolar em reais (USDBRL=X)"""
+        rate = cotacoes.get(('dolar', 'USDBRL=X'))
+        if rate is None:
+            publicadas = await compartilhadas.aget_many(
+                [('dolar', 'USDBRL=X')])
+            rate = publicadas.get(('dolar', 'USDBRL=X'))
+            if rate is not None:
+                cotacoes.set(('dolar', 'USDBRL=X'), 'USDBRL=X', rate)
+        telemetria.registrar(
+            'USDBRL=X', 'cache_miss' if rate is None else 'cache_hit')
+        if rate is None:
+            rate = await get_provider().acotacao('USDBRL=X')
+            if rate is not None:
+                cotacoes.set(('dolar', 'USDBRL=X'), 'USDBRL=X', rate)
+
+        return rate or 1.0
@@ -0,0 +1,288 @@
+"""
+indice em memoria do catalogo de ativos para o autocomplete.
+
+a busca e feita em camadas, cada uma ja ordenada por relevancia: ticker
+exato, prefixo do ticker, prefixo das palavras do nome e, se ainda faltar
+resultado, similaridade por trigramas (tolera erros de digitacao). as
+listas de prefixo sao montadas na carga, entao uma consulta custa alguns
+acessos a dicionario, independente do tamanho do catalogo.
+"""
+import math
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from investimentos.models import Ativo
+
+PALAVRA = re.compile(r'[A-Z0-9]+')
+SIMILARIDADE_MINIMA = 0.5
+
+
+def normalizar(texto):
+    """maiusculas e sem acentos"""
+    texto = unicodedata.normalize('NFKD', texto.strip().upper())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def trigramas(texto):
+    """trigramas de cada palavra, com as bordas marcadas como no pg_trgm"""
+    resultado = set()
+    for palavra in PALAVRA.findall(texto):
+        palavra = f'  {palavra} '
+        resultado.update(palavra[i:i + 3] for i in range(len(palavra) - 2))
+    return resultado
+
+
+def _prefixos(palavra):
+    return (palavra[:i] for i in range(1, len(palavra) + 1))
+
+
+class IndiceAtivos:
+    """
+    indice de prefixos e trigramas sobre (ticker, nome, tipo, relevancia).
+    aceita inclusao e remocao de ativos sem reconstruir o resto.
+    """
+
+    def __init__(self, ativos=()):
+        self._itens = {}
+        self._ordem = {}
+        self._por_base = {}
+        self._prefixos_ticker = {}
+        self._prefixos_palavra = {}
+        self._palavras = {}
+        self._trigramas = {}
+        self._trigramas_item = {}
+        self._lock = threading.Lock()
+
+        # carga inicial: acumula e ordena cada lista uma vez so
+        for ativo in ativos:
+            self._incluir(*ativo, ordenar=False)
+        for indice in (self._por_base, self._prefixos_ticker,
+                       self._prefixos_palavra):
+            for lista in indice.values():
+                lista.sort(key=self._ordem.get)
+
+    def __len__(self):
+        return len(self._itens)
+
+    def adicionar(self, ticker, nome, tipo, relevancia=0):
+        with self._lock:
+            self._excluir(ticker)
+            self._incluir(ticker, nome, tipo, relevancia)
+
+    def remover(self, ticker):
+        with self._lock:
+            self._excluir(ticker)
+
+    def _incluir(self, ticker, nome, tipo, relevancia, ordenar=True):
+        ticker = ticker.upper()
+        self._itens[ticker] = (nome, tipo)
+        self._ordem[ticker] = (-relevancia, len(ticker), ticker)
+
+        inserir = self._inserir if ordenar else self._anexar
+
+        base = _base(ticker)
+        inserir(self._por_base, base, ticker)
+
+        for prefixo in _prefixos(ticker):
+            inserir(self._prefixos_ticker, prefixo, ticker)
+
+        palavras = frozenset(PALAVRA.findall(normalizar(nome)))
+        self._palavras[ticker] = palavras
+        for prefixo in {p for palavra in palavras
+                        for p in _prefixos(palavra)}:
+            inserir(self._prefixos_palavra, prefixo, ticker)
+
+        grams = trigramas(f'{base} {normalizar(nome)}')
+        self._trigramas_item[ticker] = grams
+        for gram in grams:
+            self._trigramas.setdefault(gram, set()).add(ticker)
+
+    def _excluir(self, ticker):
+        ticker = ticker.upper()
+        if ticker not in self._itens:
+            return
+
+        self._retirar(self._por_base, _base(ticker), ticker)
+        for prefixo in _prefixos(ticker):
+            self._retirar(self._prefixos_ticker, prefixo, ticker)
+        for prefixo in {p for palavra in self._palavras.pop(ticker)
+                        for p in _prefixos(palavra)}:
+            self._retirar(self._prefixos_palavra, prefixo, ticker)
+
+        for gram in self._trigramas_item.pop(ticker):
+            postagem = self._trigramas[gram]
+            postagem.discard(ticker)
+            if not postagem:
+                del self._trigramas[gram]
+
+        del self._itens[ticker]
+        del self._ordem[ticker]
+
+    def _anexar(self, indice, chave, ticker):
+        indice.setdefault(chave, []).append(ticker)
+
+    def _inserir(self, indice, chave, ticker):
+        insort(indice.setdefault(chave, []), ticker, key=self._ordem.get)
+
+    def _retirar(self, indice, chave, ticker):
+        lista = indice[chave]
+        posicao = bisect_left(lista, self._ordem[ticker], key=self._ordem.get)
+        del lista[posicao]
+        if not lista:
+            del indice[chave]
+
+    def buscar(self, consulta, limite=10, tipo=None):
+        """
+        [{'ticker', 'nome', 'tipo'}] mais relevantes para a consulta
+        """
+        consulta = normalizar(consulta)
+        termos = PALAVRA.findall(consulta)
+        if not termos or limite <= 0:
+            return []
+
+        with self._lock:
+            encontrados = {}
+
+            def coletar(tickers):
+                for ticker in tickers:
+                    if len(encontrados) >= limite:
+                        return
+                    if ticker not in encontrados and (
+                            tipo is None or self._itens[ticker][1] == tipo):
+                        encontrados[ticker] = None
+
+            compacta = consulta.replace(' ', '')
+            coletar(self._por_base.get(compacta, ()))
+            coletar(self._prefixos_ticker.get(compacta, ()))
+            coletar(self._por_nome(termos))
+
+            if len(encontrados) < limite and len(compacta) >= 3:
+                coletar(self._similares(consulta))
+
+            return [
+                {'ticker': ticker, 'nome': self._itens[ticker][0],
+                 'tipo': self._itens[ticker][1]}
+                for ticker in encontrados
+            ]
+
+    def _por_nome(self, termos):
+        """ativos em que cada termo e prefixo de alguma palavra do nome"""
+        listas = [self._prefixos_palavra.get(termo, ()) for termo in termos]
+        menor = min(listas, key=len)
+        if len(termos) == 1:
+            return menor
+
+        return (
+            ticker for ticker in menor
+            if all(any(palavra.startswith(termo)
+                       for palavra in self._palavras[ticker])
+                   for termo in termos)
+        )
+
+    def _similares(self, consulta):
+        """
+        ativos com ao menos SIMILARIDADE_MINIMA dos trigramas da consulta:
+        o nome inteiro nao precisa parecer com a consulta, so conte-la
+        """
+        grams = trigramas(consulta)
+        necessarios = math.ceil(SIMILARIDADE_MINIMA * len(grams))
+
+        # quem tem `necessarios` trigramas em comum tem ao menos um dos
+        # len - necessarios + 1 mais raros: so esses geram candidatos
+        postagens = sorted((self._trigramas.get(gram, ()) for gram in grams),
+                           key=len)
+        candidatos = set().union(
+            *postagens[:len(grams) - necessarios + 1])
+
+        encontrados = []
+        for ticker in candidatos:
+            comum = len(grams & self._trigramas_item[ticker])
+            if comum >= necessarios:
+                encontrados.append((-comum, self._ordem[ticker]))
+
+        encontrados.sort()
+        return (ordem[2] for _, ordem in encontrados)
+
+
+def _base(ticker):
+    """PETR4.SA -> PETR4; BTC-USD -> BTC"""
+    return re.split(r'[.\-=]', ticker, maxsplit=1)[0]
+
+
+class CatalogoAtivos:
+    """
+    indice do processo, montado do banco no primeiro uso. a cada
+    ATIVOS_INDICE_VERIFICACAO segundos confere se o catalogo mudou (ex.:
+    carregar_ativos rodou em outro processo) e remonta; gravacoes feitas
+    neste processo entram na hora, pelos sinais do modelo.
+    """
+
+    def __init__(self):
+        self._indice = None
+        self._versao = None
+        self._verificado_em = 0.0
+        self._lock = threading.Lock()
+
+    def indice(self):
+        intervalo = getattr(settings, 'ATIVOS_INDICE_VERIFICACAO', 300)
+        if (self._indice is not None
+                and time.monotonic() - self._verificado_em < intervalo):
+            return self._indice
+
+        with self._lock:
+            versao = Ativo.objects.filter(ativo=True).aggregate(
+                total=Count('id'), atualizado=Max('atualizado_em'))
+
+            if self._indice is None or versao != self._versao:
+                self._indice = IndiceAtivos(
+                    Ativo.objects.filter(ativo=True).values_list(
+                        'ticker', 'nome', 'tipo', 'relevancia'
+                    ).iterator(chunk_size=5000)
+                )
+                self._versao = versao
+
+            self._verificado_em = time.monotonic()
+            return self._indice
+
+    def buscar(self, consulta, limite=10, tipo=None):
+        return self.indice().buscar(consulta, limite=limite, tipo=tipo)
+
+    def atualizar(self, ativo):
+        if self._indice is None:
+            return
+
+        if ativo.ativo:
+            self._indice.adicionar(ativo.ticker, ativo.nome, ativo.tipo,
+                                   ativo.relevancia)
+        else:
+            self._indice.remover(ativo.ticker)
+
+    def remover(self, ticker):
+        if self._indice is not None:
+            self._indice.remover(ticker)
+
+    def limpar(self):
+        with self._lock:
+            self._indice = None
+            self._versao = None
+
+
+catalogo = CatalogoAtivos()
+
+
+@receiver(post_save, sender=Ativo)
+def _ativo_salvo(sender, instance, **kwargs):
+    catalogo.atualizar(instance)
+
+
+@receiver(post_delete, sender=Ativo)
+def _ativo_removido(sender, instance, **kwargs):
+    catalogo.remover(instance.ticker)
@@ -0,0 +1,39 @@
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.exceptions import ValidationError
+
+
+class InvestimentoFilter(BaseFilterBackend):
+    """
+    filtros de query string aplicados no SQL:
+    ?ativo=true|false&tipo_investimento=ACOES&ticker=PETR4
+    nas listagens, sem ?ativo, so entram os investimentos ativos: os
+    resgatados ficam no banco (soft delete) e saem com ?ativo=false
+    """
+    VALORES_BOOLEANOS = {
+        'true': True, '1': True,
+        'false': False, '0': False,
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        ativo = params.get('ativo')
+        if ativo is not None:
+            if ativo.lower() not in self.VALORES_BOOLEANOS:
+                raise ValidationError(
+                    {'ativo': 'Use true ou false.'})
+            queryset = queryset.filter(
+                ativo=self.VALORES_BOOLEANOS[ativo.lower()])
+        elif not getattr(view, 'detail', False):
+            # detalhe e DELETE continuam achando o investimento resgatado
+            queryset = queryset.filter(ativo=True)
+
+        tipo = params.get('tipo_investimento')
+        if tipo:
+            queryset = queryset.filter(tipo_investimento=tipo.upper())
+
+        ticker = params.get('ticker')
+        if ticker:
+            queryset = queryset.filter(ticker__iexact=ticker.strip())
+
+        return queryset
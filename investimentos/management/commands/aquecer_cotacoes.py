@@ -0,0 +1,134 @@
+import time
+from datetime import time as horario
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from investimentos.models import Investimento
+from investimentos.quote_cache import (TTL_PADRAO, classe_do_ticker,
+                                       compartilhadas)
+from investimentos.services import MarketDataService
+
+
+class Command(BaseCommand):
+    help = ("Worker que mantem aquecidas no cache compartilhado as cotacoes "
+            "dos tickers em carteira, dos ativos populares e do dolar, com "
+            "cadencia por classe de ativo.")
+
+    DOLAR = 'USDBRL=X'
+    PREGAO_B3 = (horario(10, 0), horario(18, 0))
+    # quanto tempo a lista de tickers acompanhados vale antes de reler
+    INTERVALO_UNIVERSO = 300
+    # cotacao publicada vale por algumas rodadas, para sobreviver a falhas
+    # pontuais do provedor
+    RODADAS_TTL = 3
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uma-vez', action='store_true',
+                            help='atualiza todas as classes e sai')
+        parser.add_argument('--lote', type=int, default=100,
+                            help='tickers por chamada ao provedor')
+
+    def handle(self, *args, **options):
+        proxima = {}
+        universo = {}
+        universo_em = None
+
+        try:
+            while True:
+                agora = time.monotonic()
+                if universo_em is None or \
+                        agora - universo_em >= self.INTERVALO_UNIVERSO:
+                    universo = self._universo()
+                    universo_em = agora
+
+                momento = timezone.localtime()
+                for classe, tickers in universo.items():
+                    if proxima.get(classe, agora) > agora:
+                        continue
+
+                    intervalo = self._intervalo(classe, momento)
+                    publicadas = self._atualizar(tickers, intervalo,
+                                                 options['lote'])
+                    proxima[classe] = time.monotonic() + intervalo
+
+                    if options['verbosity'] > 1 or options['uma_vez']:
+                        self.stdout.write(
+                            f"{classe}: {publicadas}/{len(tickers)} "
+                            f"cotacoes publicadas (proxima em {intervalo}s)")
+
+                if options['uma_vez']:
+                    return
+
+                espera = min(proxima.values(), default=agora + 1) - \
+                    time.monotonic()
+                time.sleep(max(1.0, espera))
+
+        except KeyboardInterrupt:
+            self.stdout.write("Worker de cotacoes encerrado.")
+
+    def _universo(self):
+        """tickers acompanhados, agrupados por classe de ativo"""
+        # os tickers das carteiras sao digitados pelo cliente ('petr4'); a
+        # mesma normalizacao das views garante que o cache aquecido seja o
+        # que elas leem ('PETR4.SA')
+        tickers = set(MarketDataService._normalizar_tickers(
+            Investimento.objects.filter(
+                ativo=True,
+                ticker__isnull=False
+            ).exclude(ticker='').values_list('ticker', flat=True).distinct()
+        ))
+        tickers.update(a['ticker'] for a in MarketDataService.POPULAR_ASSETS)
+        tickers.add(self.DOLAR)
+
+        universo = {}
+        for ticker in sorted(tickers):
+            universo.setdefault(classe_do_ticker(ticker), []).append(ticker)
+        return universo
+
+    def _intervalo(self, classe, momento):
+        """
+        segundos ate a proxima atualizacao da classe: cripto negocia 24/7,
+        cambio de segunda a sexta e acoes so durante o pregao da B3
+        """
+        intervalos = getattr(settings, 'MARKET_DATA_REFRESH_INTERVAL',
+                             TTL_PADRAO)
+        intervalo = intervalos.get(classe, TTL_PADRAO['ACOES'])
+        fora_pregao = getattr(settings, 'MARKET_DATA_REFRESH_FORA_PREGAO',
+                              1800)
+
+        if classe == 'CRIPTO':
+            return intervalo
+
+        dia_util = momento.weekday() < 5
+        if classe == 'MOEDA':
+            return intervalo if dia_util else fora_pregao
+
+        abertura, fechamento = self.PREGAO_B3
+        if dia_util and abertura <= momento.time() < fechamento:
+            return intervalo
+        return fora_pregao
+
+    def _atualizar(self, tickers, intervalo, lote):
+        publicadas = 0
+
+        for i in range(0, len(tickers), lote):
+            infos = MarketDataService._baixar_cotacoes(tickers[i:i + lote])
+
+            valores = {('info', ticker): info
+                       for ticker, info in infos.items() if info}
+            if ('info', self.DOLAR) in valores:
+                valores[('dolar', self.DOLAR)] = \
+                    valores[('info', self.DOLAR)]['price']
+
+            try:
+                compartilhadas.set_many(valores,
+                                        ttl=intervalo * self.RODADAS_TTL)
+            except Exception as e:
+                self.stderr.write(f"Erro ao publicar cotacoes: {e}")
+                continue
+
+            publicadas += sum(1 for info in infos.values() if info)
+
+        return publicadas
@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+from django.utils import timezone
+
+from investimentos.analytics import BatchPortfolioAnalytics
+from investimentos.models import Investimento, PortfolioSnapshot
+from investimentos.posicoes import retornos_ponderados_no_tempo
+from investimentos.price_store import inicio_do_periodo
+
+
+class Command(BaseCommand):
+    help = ("Grava o fechamento diario das carteiras em PortfolioSnapshot, "
+            "acrescentando apenas os dias que ainda nao existem.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--periodo', default='1y',
+            help='historico gravado para clientes ainda sem snapshots'
+        )
+
+    def handle(self, *args, **options):
+        hoje = timezone.localdate()
+        analytics = BatchPortfolioAnalytics.from_queryset(
+            Investimento.objects.all())
+
+        if not analytics.clientes:
+            self.stdout.write("Nenhuma carteira com posicoes.")
+            return
+
+        ultimos = dict(
+            PortfolioSnapshot.objects.filter(
+                cliente_id__in=analytics.clientes
+            ).values('cliente_id').annotate(
+                ultima=Max('data')
+            ).values_list('cliente_id', 'ultima')
+        )
+
+        inicio_backfill = inicio_do_periodo(options['periodo'], hoje)
+        if len(ultimos) == len(analytics.clientes):
+            inicio = min(ultimos.values())
+        else:
+            inicio = inicio_backfill
+
+        # alguns dias antes para ter o fechamento anterior ao primeiro novo
+        df_valores, df_fluxos = analytics.avaliar(
+            inicio=inicio - timedelta(days=7))
+        if not df_valores.empty:
+            fechados = df_valores.index.date < hoje
+            df_valores, df_fluxos = df_valores[fechados], df_fluxos[fechados]
+
+        if len(df_valores) < 2:
+            self.stdout.write("Sem dados de mercado para novos dias.")
+            return
+
+        datas = df_valores.index.date
+        valores = df_valores.to_numpy()
+        fluxos = df_fluxos.to_numpy()
+
+        # ponderado no tempo: aportes e resgates nao contam como retorno
+        retornos = np.zeros_like(valores)
+        retornos[1:] = retornos_ponderados_no_tempo(valores, fluxos)
+
+        acumulados = dict(self._acumulados_finais(ultimos))
+
+        novos = []
+        for j, cliente_id in enumerate(analytics.clientes):
+            ultima = ultimos.get(cliente_id)
+
+            if ultima is None:
+                mascara = datas >= inicio_backfill
+                fator = 1.0
+                primeiro = True
+            else:
+                mascara = datas > ultima
+                fator = 1.0 + acumulados.get(cliente_id, 0.0)
+                primeiro = False
+
+            for data, valor, fluxo, retorno in zip(datas[mascara],
+                                                   valores[mascara, j],
+                                                   fluxos[mascara, j],
+                                                   retornos[mascara, j]):
+                if not np.isfinite(retorno) or primeiro:
+                    retorno = 0.0
+                primeiro = False
+
+                fator *= 1.0 + retorno
+                novos.append(PortfolioSnapshot(
+                    cliente_id=cliente_id,
+                    data=data,
+                    valor_total=float(valor),
+                    fluxo=float(fluxo),
+                    retorno_diario=float(retorno),
+                    retorno_acumulado=fator - 1.0
+                ))
+
+        PortfolioSnapshot.objects.bulk_create(novos, batch_size=1000,
+                                              ignore_conflicts=True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(novos)} snapshots gravados para "
+            f"{len(analytics.clientes)} carteiras."
+        ))
+
+    def _acumulados_finais(self, ultimos):
+        """retorno acumulado do ultimo snapshot de cada cliente"""
+        linhas = PortfolioSnapshot.objects.filter(
+            cliente_id__in=list(ultimos),
+            data__in=set(ultimos.values())
+        ).values_list('cliente_id', 'data', 'retorno_acumulado')
+
+        return [
+            (cliente_id, acumulado)
+            for cliente_id, data, acumulado in linhas
+            if ultimos[cliente_id] == data
+        ]
@@ -0,0 +1,78 @@
+import csv
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from investimentos.models import Ativo
+
+TIPOS_B3 = {'ACOES', 'FUNDOS', 'ETF', 'BDR'}
+
+
+class Command(BaseCommand):
+    help = ("Carrega o catalogo de ativos da busca a partir de uma listagem "
+            "CSV (ticker, nome, tipo e, opcionalmente, relevancia; separada "
+            "por virgula ou ponto e virgula).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', nargs='?',
+                            help='padrao: ATIVOS_CATALOGO_ARQUIVO')
+        parser.add_argument('--desativar-ausentes', action='store_true',
+                            help='tira da busca os ativos que nao estao no '
+                                 'arquivo')
+        parser.add_argument('--lote', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        caminho = Path(options['arquivo'] or settings.ATIVOS_CATALOGO_ARQUIVO)
+        if not caminho.exists():
+            raise CommandError(f"Arquivo {caminho} nao encontrado.")
+
+        ativos = {}
+        tipos = dict(Ativo.TIPO_CHOICES)
+
+        with caminho.open(encoding='utf-8-sig', newline='') as arquivo:
+            dialeto = csv.Sniffer().sniff(arquivo.read(4096), ',;')
+            arquivo.seek(0)
+
+            for numero, linha in enumerate(
+                    csv.DictReader(arquivo, dialect=dialeto), start=2):
+                ticker = (linha.get('ticker') or '').strip().upper()
+                tipo = (linha.get('tipo') or '').strip().upper()
+
+                if not ticker or tipo not in tipos:
+                    self.stderr.write(
+                        f"Linha {numero} ignorada: ticker ou tipo invalido.")
+                    continue
+
+                # a listagem da B3 traz o codigo sem o sufixo do Yahoo
+                if tipo in TIPOS_B3 and '.' not in ticker:
+                    ticker += '.SA'
+
+                ativos[ticker] = Ativo(
+                    ticker=ticker,
+                    nome=(linha.get('nome') or ticker).strip()[:120],
+                    tipo=tipo,
+                    relevancia=int(linha.get('relevancia') or 0),
+                    ativo=True
+                )
+
+        with transaction.atomic():
+            Ativo.objects.bulk_create(
+                ativos.values(),
+                batch_size=options['lote'],
+                update_conflicts=True,
+                unique_fields=['ticker'],
+                update_fields=['nome', 'tipo', 'relevancia', 'ativo',
+                               'atualizado_em']
+            )
+
+            desativados = 0
+            if options['desativar_ausentes']:
+                desativados = Ativo.objects.filter(ativo=True)\
+                    .exclude(ticker__in=list(ativos))\
+                    .update(ativo=False)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(ativos)} ativos carregados de {caminho}"
+            + (f", {desativados} desativados." if desativados else ".")))
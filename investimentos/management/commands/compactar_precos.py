@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from investimentos.matriz_precos import MatrizPrecos
+from investimentos.models import Investimento, SincronizacaoPreco
+from investimentos.price_store import PriceHistoryStore, inicio_do_periodo
+from investimentos.providers import get_provider
+from investimentos.services import MarketDataService
+
+
+class Command(BaseCommand):
+    help = ("Sincroniza o historico dos tickers acompanhados e grava a "
+            "matriz float32 de fechamentos mapeada em memoria pelos "
+            "workers. Rodar uma vez por dia, apos o fechamento.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periodo', default='5y',
+                            help='historico coberto pela matriz')
+        parser.add_argument('--destino',
+                            help='pasta da matriz (padrao: '
+                                 'MARKET_DATA_MATRIZ_DIR)')
+
+    def handle(self, *args, **options):
+        destino = options['destino'] or getattr(
+            settings, 'MARKET_DATA_MATRIZ_DIR', None)
+        if not destino:
+            raise CommandError("Defina MARKET_DATA_MATRIZ_DIR ou --destino.")
+
+        tickers = self._universo()
+        if not tickers:
+            self.stdout.write("Nenhum ticker acompanhado.")
+            return
+
+        hoje = get_provider().agora().date()
+        inicio = inicio_do_periodo(options['periodo'], hoje)
+        df = PriceHistoryStore.fechamentos(tickers, inicio)
+        if df.empty:
+            raise CommandError("Historico local vazio.")
+
+        matriz = MatrizPrecos.montar(df, inicio, gerada_em=hoje)
+        matriz.gravar(destino)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Matriz gravada: {len(matriz.datas)} datas x "
+            f"{len(matriz.tickers)} tickers "
+            f"({matriz.nbytes / 2 ** 20:.1f} MiB)."
+        ))
+
+    def _universo(self):
+        """tickers ja sincronizados e os de todas as carteiras"""
+        tickers = set(SincronizacaoPreco.objects.values_list('ticker',
+                                                             flat=True))
+        tickers.update(MarketDataService._normalizar_tickers(
+            Investimento.objects.filter(ticker__isnull=False)
+            .exclude(ticker='').values_list('ticker', flat=True).distinct()
+        ))
+        return sorted(tickers)
@@ -0,0 +1,50 @@
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from investimentos.models import PrecoHistorico
+from investimentos.price_store import CAMPOS_OHLC
+
+
+class Command(BaseCommand):
+    help = ("Grava o historico de precos do banco em arquivos por ticker, no "
+            "formato lido pelo ReplayProvider.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('tickers', nargs='*',
+                            help='padrao: todos os tickers com historico')
+        parser.add_argument('--diretorio',
+                            help='padrao: MARKET_DATA_REPLAY_DIR')
+        parser.add_argument('--formato', choices=['csv', 'parquet'],
+                            default='csv')
+
+    def handle(self, *args, **options):
+        diretorio = Path(options['diretorio'] or getattr(
+            settings, 'MARKET_DATA_REPLAY_DIR', 'replay'))
+        diretorio.mkdir(parents=True, exist_ok=True)
+
+        tickers = options['tickers'] or list(
+            PrecoHistorico.objects.order_by('ticker')
+            .values_list('ticker', flat=True).distinct()
+        )
+
+        for ticker in tickers:
+            linhas = PrecoHistorico.objects.filter(ticker=ticker)\
+                .order_by('data')\
+                .values_list('data', *CAMPOS_OHLC.values())
+
+            df = pd.DataFrame.from_records(
+                list(linhas), columns=['Date', *CAMPOS_OHLC])
+            if df.empty:
+                self.stdout.write(f"{ticker}: sem historico, ignorado.")
+                continue
+
+            caminho = diretorio / f"{ticker}.{options['formato']}"
+            if options['formato'] == 'parquet':
+                df.to_parquet(caminho, index=False)
+            else:
+                df.to_csv(caminho, index=False)
+
+            self.stdout.write(f"{ticker}: {len(df)} barras em {caminho}")
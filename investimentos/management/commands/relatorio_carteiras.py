@@ -0,0 +1,45 @@
+import csv
+
+from django.core.management.base import BaseCommand
+
+from investimentos.analytics import BatchPortfolioAnalytics
+from investimentos.models import Investimento
+
+
+class Command(BaseCommand):
+    help = ("Gera os KPIs de todas as carteiras em lote (um download por "
+            "ticker, independente do numero de clientes).")
+
+    CAMPOS = ['retorno_total_pct', 'retorno_anualizado_pct',
+              'volatilidade_pct', 'sharpe_ratio', 'sortino_ratio',
+              'drawdown_maximo_pct', 'duracao_drawdown_dias',
+              'var_historico_pct', 'cvar_historico_pct',
+              'retorno_ponderado_dinheiro_anual_pct']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--periodo', default='1y')
+        parser.add_argument('--saida', help='arquivo CSV (padrao: stdout)')
+
+    def handle(self, *args, **options):
+        analytics = BatchPortfolioAnalytics.from_queryset(
+            Investimento.objects.all())
+        resultado = analytics.calcular_performance(options['periodo'])
+
+        if options['saida']:
+            with open(options['saida'], 'w', newline='') as arquivo:
+                self._escrever(arquivo, resultado)
+        else:
+            self._escrever(self.stdout, resultado)
+
+        self.stderr.write(
+            f"{len(resultado)} carteiras, "
+            f"{len(analytics.tickers)} tickers distintos."
+        )
+
+    def _escrever(self, arquivo, resultado):
+        writer = csv.writer(arquivo)
+        writer.writerow(['cliente_id'] + self.CAMPOS)
+
+        for cliente_id, metricas in resultado.items():
+            writer.writerow([cliente_id] +
+                            [metricas.get(campo, '') for campo in self.CAMPOS])
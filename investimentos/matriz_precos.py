@@ -0,0 +1,207 @@
+"""
+matriz compacta de fechamentos (datas x tickers) em float32, gravada em
+disco e aberta com np.load(mmap_mode='r'): os workers do gunicorn mapeiam
+o mesmo arquivo e dividem as paginas do page cache, em vez de cada um
+montar e guardar os seus DataFrames float64 a partir do banco.
+
+a matriz fica em ordem de coluna (Fortran), entao a serie de um ticker e
+um trecho contiguo do arquivo e o recorte (tickers, a partir de inicio)
+de uma requisicao sao views, sem copia.
+"""
+import json
+import os
+import threading
+import time
+from datetime import date, time as horario, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+
+from investimentos.providers import get_provider
+
+PONTEIRO = 'atual.json'
+FECHAMENTO_B3 = horario(18, 0)
+
+
+def ultimo_pregao(momento=None):
+    """
+    data do ultimo pregao encerrado da B3: hoje, depois do fechamento de
+    um dia util; senao o dia util anterior. feriados nao sao considerados,
+    entao neles a matriz parece atrasada e o chamador usa o banco. sem
+    `momento`, usa o "agora" do provedor de mercado.
+    """
+    if momento is None:
+        momento = get_provider().agora()
+    momento = timezone.localtime(momento)
+    dia = momento.date()
+    if dia.weekday() < 5 and momento.time() >= FECHAMENTO_B3:
+        return dia
+
+    dia -= timedelta(days=1)
+    while dia.weekday() >= 5:
+        dia -= timedelta(days=1)
+    return dia
+
+
+class MatrizPrecos:
+    def __init__(self, datas, tickers, valores, inicio, gerada_em):
+        self.datas = np.asarray(datas, dtype='datetime64[D]')
+        self.tickers = list(tickers)
+        self.colunas = {ticker: j for j, ticker in enumerate(self.tickers)}
+        self.valores = valores
+        self.inicio = inicio
+        self.gerada_em = gerada_em
+
+        # o eixo de datas e montado uma vez; os recortes sao fatias dele
+        self.indice = pd.DatetimeIndex(self.datas)
+
+    @classmethod
+    def montar(cls, df, inicio, gerada_em=None):
+        """
+        a partir de um DataFrame (datas x tickers) com NaN nos dias sem
+        cotacao de cada ticker
+        """
+        df = df.sort_index()
+        valores = np.asfortranarray(df.to_numpy(dtype='float32'))
+        return cls(df.index.to_numpy(dtype='datetime64[D]'), df.columns,
+                   valores, inicio, gerada_em or timezone.localdate())
+
+    @property
+    def nbytes(self):
+        return self.valores.nbytes
+
+    @property
+    def ultima_data(self):
+        """ultimo dia com fechamento na matriz"""
+        if not len(self.datas):
+            return None
+        return self.datas[-1].item()
+
+    def cobre(self, tickers, inicio):
+        return self.inicio <= inicio and all(
+            ticker in self.colunas for ticker in tickers)
+
+    def fechamentos(self, tickers, inicio):
+        """
+        DataFrame (datas x tickers) a partir de `inicio` com as colunas
+        como views da matriz. dias e colunas sem cotacao sao tratados como
+        no historico do banco (ffill, bfill, 0); so entao ha copia, e
+        apenas do recorte.
+        """
+        linha = np.searchsorted(self.datas, np.datetime64(inicio, 'D'))
+        df = pd.DataFrame(
+            {ticker: self.valores[linha:, self.colunas[ticker]]
+             for ticker in tickers},
+            index=self.indice[linha:], copy=False
+        )
+
+        if df.empty or not df.isna().to_numpy().any():
+            return df
+
+        df = df.dropna(how='all').dropna(axis=1, how='all')
+        return df.ffill().bfill().fillna(0)
+
+    def gravar(self, pasta):
+        """
+        grava uma nova versao e troca o ponteiro atomicamente; quem ja
+        tem a versao anterior mapeada continua lendo ela
+        """
+        pasta = Path(pasta)
+        pasta.mkdir(parents=True, exist_ok=True)
+        versao = f'{time.time_ns():x}'
+
+        np.save(pasta / f'precos-{versao}.npy', self.valores)
+        np.save(pasta / f'datas-{versao}.npy', self.datas)
+
+        ponteiro = {
+            'versao': versao,
+            'tickers': self.tickers,
+            'inicio': self.inicio.isoformat(),
+            'gerada_em': self.gerada_em.isoformat(),
+        }
+        temporario = pasta / f'{PONTEIRO}.{versao}'
+        temporario.write_text(json.dumps(ponteiro), encoding='utf-8')
+        os.replace(temporario, pasta / PONTEIRO)
+
+        # no Linux um arquivo apagado segue valido para quem o mapeou
+        for arquivo in pasta.glob('*.npy'):
+            if not arquivo.stem.endswith(versao):
+                arquivo.unlink(missing_ok=True)
+
+    @classmethod
+    def abrir(cls, pasta):
+        pasta = Path(pasta)
+        ponteiro = json.loads((pasta / PONTEIRO).read_text(encoding='utf-8'))
+        versao = ponteiro['versao']
+
+        return cls(
+            np.load(pasta / f'datas-{versao}.npy'),
+            ponteiro['tickers'],
+            np.load(pasta / f'precos-{versao}.npy', mmap_mode='r'),
+            date.fromisoformat(ponteiro['inicio']),
+            date.fromisoformat(ponteiro['gerada_em']),
+        )
+
+
+class MatrizCompartilhada:
+    """
+    matriz do processo, aberta de MARKET_DATA_MATRIZ_DIR no primeiro uso.
+    a cada MARKET_DATA_MATRIZ_VERIFICACAO segundos confere se
+    compactar_precos gravou uma versao nova e remapeia.
+    """
+
+    def __init__(self):
+        self._matriz = None
+        self._assinatura = None
+        self._verificado_em = None
+        self._lock = threading.Lock()
+
+    def matriz(self):
+        pasta = getattr(settings, 'MARKET_DATA_MATRIZ_DIR', None)
+        if not pasta:
+            return None
+
+        intervalo = getattr(settings, 'MARKET_DATA_MATRIZ_VERIFICACAO', 60)
+        if (self._verificado_em is not None
+                and time.monotonic() - self._verificado_em < intervalo):
+            return self._matriz
+
+        with self._lock:
+            try:
+                estado = os.stat(Path(pasta) / PONTEIRO)
+                assinatura = (estado.st_ino, estado.st_mtime_ns)
+                if assinatura != self._assinatura:
+                    self._matriz = MatrizPrecos.abrir(pasta)
+                    self._assinatura = assinatura
+            except (OSError, ValueError, KeyError):
+                self._matriz = None
+                self._assinatura = None
+
+            self._verificado_em = time.monotonic()
+            return self._matriz
+
+    def fechamentos(self, tickers, inicio):
+        """
+        recorte da matriz ou None se ela nao existe, nao chega ao ultimo
+        pregao encerrado ou nao cobre os tickers e o periodo (o chamador
+        cai no banco). a matriz de sexta continua valendo no fim de semana
+        e na segunda antes do fechamento.
+        """
+        matriz = self.matriz()
+        if (matriz is None or matriz.ultima_data is None
+                or matriz.ultima_data < ultimo_pregao()
+                or not matriz.cobre(tickers, inicio)):
+            return None
+        return matriz.fechamentos(tickers, inicio)
+
+    def limpar(self):
+        with self._lock:
+            self._matriz = None
+            self._assinatura = None
+            self._verificado_em = None
+
+
+matriz_precos = MatrizCompartilhada()
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investimentos', '0002_remove_investimento_rentabilidade_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SincronizacaoPreco',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=20, unique=True)),
+                ('inicio', models.DateField()),
+                ('ultima_data', models.DateField(null=True)),
+                ('sincronizado_em', models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PrecoHistorico',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=20)),
+                ('data', models.DateField()),
+                ('abertura', models.FloatField(null=True)),
+                ('maxima', models.FloatField(null=True)),
+                ('minima', models.FloatField(null=True)),
+                ('fechamento', models.FloatField(null=True)),
+                ('fechamento_ajustado', models.FloatField(null=True)),
+                ('volume', models.BigIntegerField(null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('ticker', 'data'), name='preco_historico_ticker_data')],
+            },
+        ),
+    ]
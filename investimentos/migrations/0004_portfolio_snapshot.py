@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investimentos', '0003_preco_historico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('valor_total', models.FloatField()),
+                ('retorno_diario', models.FloatField(default=0.0)),
+                ('retorno_acumulado', models.FloatField(default=0.0)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='investimentos.clienteinvestidor')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('cliente', 'data'), name='portfolio_snapshot_cliente_data')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investimentos', '0004_portfolio_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='investimento',
+            index=models.Index(fields=['cliente', '-data_aplicacao', '-id'], name='investimento_cliente_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='investimento',
+            index=models.Index(fields=['-data_aplicacao', '-id'], name='investimento_data_idx'),
+        ),
+    ]
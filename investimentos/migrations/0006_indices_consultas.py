@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investimentos', '0005_investimento_data_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='investimento',
+            index=models.Index(condition=models.Q(('ativo', True)), fields=['cliente', 'ticker'], name='investimento_ativos_idx'),
+        ),
+    ]
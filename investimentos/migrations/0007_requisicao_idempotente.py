@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:48
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investimentos', '0006_indices_consultas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequisicaoIdempotente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(max_length=255)),
+                ('status_code', models.PositiveSmallIntegerField(null=True)),
+                ('resposta', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='requisicoes_idempotentes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'chave'), name='requisicao_idempotente_chave')],
+            },
+        ),
+    ]
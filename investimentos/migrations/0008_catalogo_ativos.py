@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investimentos', '0007_requisicao_idempotente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ativo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=20, unique=True)),
+                ('nome', models.CharField(max_length=120)),
+                ('tipo', models.CharField(choices=[('ACOES', 'Ações'), ('FUNDOS', 'Fundos Imobiliários (FIIs)'), ('ETF', 'ETF'), ('BDR', 'BDR'), ('CRIPTO', 'Criptomoedas'), ('MOEDA', 'Moedas')], max_length=10)),
+                ('relevancia', models.PositiveIntegerField(default=0, help_text='Desempata a busca: maior aparece primeiro')),
+                ('ativo', models.BooleanField(default=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investimentos', '0008_catalogo_ativos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='investimento',
+            name='data_resgate',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='investimento',
+            name='valor_resgate',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True),
+        ),
+    ]
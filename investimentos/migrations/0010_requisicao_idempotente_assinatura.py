@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investimentos', '0009_investimento_resgate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requisicaoidempotente',
+            name='assinatura',
+            field=models.CharField(default='', max_length=64),
+        ),
+    ]
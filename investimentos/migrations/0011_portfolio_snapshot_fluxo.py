@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:38
+
+from django.db import migrations, models
+
+
+def descartar_snapshots(apps, schema_editor):
+    # os snapshots antigos aplicavam a carteira de hoje ao passado e nao
+    # tem fluxos; atualizar_snapshots os refaz a partir da linha do tempo
+    apps.get_model('investimentos', 'PortfolioSnapshot').objects.all()\
+        .delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investimentos', '0010_requisicao_idempotente_assinatura'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfoliosnapshot',
+            name='fluxo',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.RunPython(descartar_snapshots,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investimentos', '0011_portfolio_snapshot_fluxo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requisicaoidempotente',
+            name='investimento_criado',
+            field=models.UUIDField(null=True),
+        ),
+    ]
@@ -1,5 +1,8 @@
 import uuid
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from api_banco.models import Pessoa
 from decimal import Decimal
 
@@ -68,10 +71,166 @@ class Investimento(models.Model):
     data_aplicacao = models.DateTimeField(auto_now_add=True)
     ativo = models.BooleanField(default=True)
 
+    # o resgate mantem o registro: a linha do tempo das posicoes precisa
+    # saber quando cada investimento saiu da carteira
+    data_resgate = models.DateTimeField(null=True, blank=True)
+    valor_resgate = models.DecimalField(max_digits=15, decimal_places=2,
+                                        null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['cliente', '-data_aplicacao', '-id'],
+                         name='investimento_cliente_data_idx'),
+            models.Index(fields=['-data_aplicacao', '-id'],
+                         name='investimento_data_idx'),
+            models.Index(fields=['cliente', 'ticker'],
+                         condition=models.Q(ativo=True),
+                         name='investimento_ativos_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if self.quantidade and self.preco_medio:
             self.valor_investido = self.quantidade * self.preco_medio
         super().save(*args, **kwargs)
 
+    def resgatar(self, valor):
+        """
+        marca o investimento como resgatado. retorna False se outro resgate
+        concorrente chegou antes.
+        """
+        agora = timezone.now()
+        marcados = Investimento.objects.filter(pk=self.pk, ativo=True)\
+            .update(ativo=False, data_resgate=agora, valor_resgate=valor)
+
+        if marcados:
+            self.ativo = False
+            self.data_resgate = agora
+            self.valor_resgate = valor
+        return bool(marcados)
+
+    def __str__(self):
+        return f"{self.ticker} - Qtd: {self.quantidade}"
+
+
+class PrecoHistorico(models.Model):
+    """
+    barra diaria (OHLC) de um ticker, usada como cache local do historico
+    """
+    ticker = models.CharField(max_length=20)
+    data = models.DateField()
+
+    abertura = models.FloatField(null=True)
+    maxima = models.FloatField(null=True)
+    minima = models.FloatField(null=True)
+    fechamento = models.FloatField(null=True)
+    fechamento_ajustado = models.FloatField(null=True)
+    volume = models.BigIntegerField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ticker', 'data'],
+                                    name='preco_historico_ticker_data'),
+        ]
+
+    def __str__(self):
+        return f"{self.ticker} {self.data} - {self.fechamento}"
+
+
+class SincronizacaoPreco(models.Model):
+    """
+    controle de ate onde o historico local de um ticker esta completo
+    """
+    ticker = models.CharField(max_length=20, unique=True)
+    inicio = models.DateField()
+    ultima_data = models.DateField(null=True)
+    sincronizado_em = models.DateField()
+
+    def __str__(self):
+        return f"{self.ticker} ({self.inicio} - {self.ultima_data})"
+
+
+class PortfolioSnapshot(models.Model):
+    """
+    valor de fechamento diario da carteira de um cliente
+    """
+    cliente = models.ForeignKey(
+        'ClienteInvestidor',
+        on_delete=models.CASCADE,
+        related_name='snapshots'
+    )
+
+    data = models.DateField()
+    valor_total = models.FloatField()
+    # aporte liquido do dia (compras - resgates) a preco de mercado
+    fluxo = models.FloatField(default=0.0)
+    retorno_diario = models.FloatField(default=0.0)
+    retorno_acumulado = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cliente', 'data'],
+                                    name='portfolio_snapshot_cliente_data'),
+        ]
+
+    def __str__(self):
+        return f"{self.cliente_id} {self.data} - {self.valor_total:.2f}"
+
+
+class RequisicaoIdempotente(models.Model):
+    """
+    resposta gravada para um Idempotency-Key, devolvida de novo quando o
+    cliente repete a mesma requisicao (ex.: retry apos timeout)
+    """
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='requisicoes_idempotentes'
+    )
+    chave = models.CharField(max_length=255)
+    # hash de metodo, caminho e corpo: a chave so vale para a mesma
+    # requisicao
+    assinatura = models.CharField(max_length=64, default='')
+
+    # investimento criado, gravado na transacao do debito: com ele a
+    # compra nunca e refeita, mesmo sem a resposta gravada
+    investimento_criado = models.UUIDField(null=True)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    resposta = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+
+    criada_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'chave'],
+                                    name='requisicao_idempotente_chave'),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario_id} - {self.chave}"
+
+
+class Ativo(models.Model):
+    """
+    instrumento do catalogo de busca (carregar_ativos)
+    """
+    TIPO_CHOICES = [
+        ("ACOES", "Ações"),
+        ("FUNDOS", "Fundos Imobiliários (FIIs)"),
+        ("ETF", "ETF"),
+        ("BDR", "BDR"),
+        ("CRIPTO", "Criptomoedas"),
+        ("MOEDA", "Moedas"),
+    ]
+
+    ticker = models.CharField(max_length=20, unique=True)
+    nome = models.CharField(max_length=120)
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    relevancia = models.PositiveIntegerField(
+        default=0,
+        help_text="Desempata a busca: maior aparece primeiro"
+    )
+    ativo = models.BooleanField(default=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
     def __str__(self):
-        return f"{self.ticker} - Qtd: {self.quantidade}"
\ No newline at end of file
+        return f"{self.ticker} - {self.nome}"
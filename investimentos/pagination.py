@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class InvestimentoCursorPagination(CursorPagination):
+    """
+    paginacao por cursor em data_aplicacao: paginas profundas custam o
+    mesmo que a primeira, pois usam WHERE no indice e nao OFFSET
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-data_aplicacao', '-id')
@@ -0,0 +1,169 @@
+"""
+linha do tempo das posicoes de um cliente a partir das aplicacoes
+(data_aplicacao) e resgates (data_resgate) de cada investimento.
+
+os eventos viram uma matriz de variacoes (datas x tickers) com um unico
+np.add.at e a quantidade em carteira em cada data e a soma acumulada
+dela, entao o custo e O(datas x tickers + eventos), nao importa quantas
+ordens o cliente tenha.
+"""
+import numpy as np
+import pandas as pd
+from django.utils import timezone
+
+from investimentos.services import MarketDataService
+
+DIAS_ANO = 365.0
+
+
+class LinhaDoTempoPosicoes:
+    def __init__(self, eventos):
+        """
+        eventos: iteravel de (data, ticker, variacao_da_quantidade). o
+        rotulo da coluna pode ser qualquer valor ordenavel; o calculo em
+        lote usa (cliente_id, ticker).
+        """
+        eventos = list(eventos)
+        self.tickers = sorted({ticker for _, ticker, _ in eventos})
+        indice = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+        self._datas = np.array([data for data, _, _ in eventos],
+                               dtype='datetime64[D]')
+        self._colunas = np.array([indice[ticker] for _, ticker, _ in eventos],
+                                 dtype='int64')
+        self._variacoes = np.array([qtd for _, _, qtd in eventos],
+                                   dtype='float64')
+
+    @classmethod
+    def from_investimentos(cls, investimentos, por_cliente=False):
+        """
+        cada investimento com ticker gera uma compra na data de aplicacao
+        e, se resgatado, uma venda na data de resgate. inativos sem
+        data_resgate (resgatados antes do registro da data) ficam de fora,
+        pois nao ha como saber quando sairam da carteira. com por_cliente,
+        as colunas sao (cliente_id, ticker).
+        """
+        eventos = []
+        for inv in investimentos:
+            if not inv.ticker or inv.quantidade <= 0:
+                continue
+            if not inv.ativo and inv.data_resgate is None:
+                continue
+
+            ticker = MarketDataService._normalizar_ticker(inv.ticker)
+            if por_cliente:
+                ticker = (inv.cliente_id, ticker)
+            quantidade = float(inv.quantidade)
+
+            eventos.append((_dia(inv.data_aplicacao), ticker, quantidade))
+            if not inv.ativo:
+                eventos.append((_dia(inv.data_resgate), ticker, -quantidade))
+
+        return cls(eventos)
+
+    def quantidades(self, datas):
+        """
+        (quantidades, variacoes), ambas (datas x self.tickers). eventos em
+        dia sem pregao entram no proximo pregao; os anteriores a primeira
+        data ja compoem a posicao inicial e nao contam como variacao.
+        """
+        datas = np.asarray(datas, dtype='datetime64[D]')
+        variacoes = np.zeros((len(datas), len(self.tickers)))
+        if not len(datas) or not len(self._variacoes):
+            return variacoes.copy(), variacoes
+
+        linhas = np.searchsorted(datas, self._datas, side='left')
+        na_janela = (self._datas >= datas[0]) & (linhas < len(datas))
+        np.add.at(variacoes, (linhas[na_janela], self._colunas[na_janela]),
+                  self._variacoes[na_janela])
+
+        iniciais = np.zeros(len(self.tickers))
+        np.add.at(iniciais, self._colunas[self._datas < datas[0]],
+                  self._variacoes[self._datas < datas[0]])
+
+        quantidades = np.cumsum(variacoes, axis=0)
+        quantidades += iniciais
+        return quantidades, variacoes
+
+    def avaliar(self, df_precos):
+        """
+        (valores, fluxos): valor da carteira em cada data e o aporte
+        liquido do dia (compras - resgates), ambos a preco de mercado
+        """
+        precos = df_precos.reindex(columns=self.tickers, fill_value=0.0)\
+            .to_numpy(dtype='float64')
+        quantidades, variacoes = self.quantidades(df_precos.index)
+
+        return ((quantidades * precos).sum(axis=1),
+                (variacoes * precos).sum(axis=1))
+
+
+def retornos_ponderados_no_tempo(valores, fluxos):
+    """
+    retorno diario livre do efeito dos aportes: (V_t - F_t) / V_t-1 - 1,
+    com o fluxo no fechamento do dia. dias sem posicao no dia anterior
+    rendem 0.
+    """
+    anteriores = valores[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        retornos = (valores[1:] - fluxos[1:]) / anteriores - 1
+    return np.where(anteriores > 0, retornos, 0.0)
+
+
+def retorno_ponderado_pelo_dinheiro(datas, valores, fluxos,
+                                    iteracoes=100, tolerancia=1e-10):
+    """
+    taxa interna de retorno anual dos fluxos do investidor: a posicao
+    inicial e cada aporte saem do bolso dele e o valor final volta. None
+    quando nao ha fluxo que a defina.
+    """
+    datas = np.asarray(datas, dtype='datetime64[D]')
+    if len(datas) < 2:
+        return None
+
+    caixa = -np.asarray(fluxos, dtype='float64').copy()
+    caixa[0] = -valores[0]
+    caixa[-1] += valores[-1]
+    anos = (datas - datas[0]).astype('float64') / DIAS_ANO
+
+    usados = caixa != 0
+    caixa, anos = caixa[usados], anos[usados]
+    if not (caixa > 0).any() or not (caixa < 0).any():
+        return None
+
+    def vpl(taxa):
+        return (caixa * (1 + taxa) ** -anos).sum()
+
+    # newton; se sair do dominio ou nao convergir, bissecao
+    taxa = 0.1
+    with np.errstate(all='ignore'):
+        for _ in range(iteracoes):
+            fatores = (1 + taxa) ** -anos
+            derivada = (-anos * caixa * fatores / (1 + taxa)).sum()
+            if derivada == 0 or not np.isfinite(derivada):
+                break
+            passo = (caixa * fatores).sum() / derivada
+            taxa -= passo
+            if taxa <= -1 or not np.isfinite(taxa):
+                break
+            if abs(passo) < tolerancia:
+                return float(taxa)
+
+        baixa, alta = -0.9999, 1e4
+        if np.sign(vpl(baixa)) == np.sign(vpl(alta)):
+            return None
+        for _ in range(200):
+            meio = (baixa + alta) / 2
+            if np.sign(vpl(meio)) == np.sign(vpl(baixa)):
+                baixa = meio
+            else:
+                alta = meio
+            if alta - baixa < tolerancia:
+                break
+        return float((baixa + alta) / 2)
+
+
+def _dia(momento):
+    if timezone.is_aware(momento):
+        momento = timezone.localtime(momento)
+    return pd.Timestamp(momento).date()
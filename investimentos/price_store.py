@@ -0,0 +1,161 @@
+from datetime import date
+
+import pandas as pd
+
+from investimentos.models import PrecoHistorico, SincronizacaoPreco
+from investimentos.providers import get_provider
+
+
+PERIODOS = {
+    '1d': pd.DateOffset(days=1),
+    '5d': pd.DateOffset(days=5),
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+
+CAMPOS_OHLC = {
+    'Open': 'abertura',
+    'High': 'maxima',
+    'Low': 'minima',
+    'Close': 'fechamento',
+    'Adj Close': 'fechamento_ajustado',
+    'Volume': 'volume',
+}
+
+
+def inicio_do_periodo(periodo, hoje=None):
+    """
+    converte um periodo no formato do yfinance ('1y', 'ytd'...) na data
+    inicial equivalente; sem `hoje`, conta a partir do dia do provedor
+    """
+    hoje = hoje or get_provider().agora().date()
+
+    if periodo == 'ytd':
+        return date(hoje.year, 1, 1)
+
+    deslocamento = PERIODOS.get(periodo, PERIODOS['1y'])
+    return (pd.Timestamp(hoje) - deslocamento).date()
+
+
+class PriceHistoryStore:
+    """
+    historico diario de precos persistido no banco. o provedor externo so
+    e consultado para os dias que ainda nao existem localmente, no maximo
+    uma vez por ticker por dia.
+    """
+
+    @staticmethod
+    def fechamentos(tickers, inicio):
+        """
+        retorna um DataFrame (datas x tickers) com o fechamento ajustado
+        de cada ticker a partir de `inicio`
+        """
+        PriceHistoryStore.sincronizar(tickers, inicio)
+
+        linhas = PrecoHistorico.objects.filter(
+            ticker__in=tickers,
+            data__gte=inicio
+        ).values_list('data', 'ticker', 'fechamento',
+                      'fechamento_ajustado')
+
+        df = pd.DataFrame.from_records(
+            list(linhas),
+            columns=['data', 'ticker', 'fechamento', 'fechamento_ajustado']
+        )
+
+        if df.empty:
+            return pd.DataFrame()
+
+        df['preco'] = df['fechamento_ajustado'].fillna(df['fechamento'])
+        tabela = df.pivot(index='data', columns='ticker', values='preco')
+        tabela.index = pd.to_datetime(tabela.index)
+        tabela.columns.name = None
+
+        return tabela.sort_index()
+
+    @staticmethod
+    def sincronizar(tickers, inicio):
+        """
+        baixa somente o trecho faltante do historico de cada ticker
+        """
+        provedor = get_provider()
+        hoje = provedor.agora().date()
+        controles = {
+            c.ticker: c for c in
+            SincronizacaoPreco.objects.filter(ticker__in=tickers)
+        }
+
+        pendentes = {}
+        for ticker in tickers:
+            controle = controles.get(ticker)
+
+            if controle is None or controle.inicio > inicio:
+                desde = inicio
+            elif controle.sincronizado_em < hoje:
+                desde = controle.ultima_data or controle.inicio
+            else:
+                continue
+
+            pendentes.setdefault(desde, []).append(ticker)
+
+        for desde, grupo in pendentes.items():
+            baixados = provedor.historico(grupo, desde, hoje)
+            if baixados is None:
+                continue
+
+            for ticker in grupo:
+                PriceHistoryStore._gravar(ticker, baixados.get(ticker),
+                                          controles.get(ticker), desde, hoje)
+
+    @staticmethod
+    def _gravar(ticker, df, controle, desde, hoje):
+        barras = []
+
+        if df is not None and not df.empty:
+            df = df.dropna(how='all')
+            colunas = [c for c in CAMPOS_OHLC if c in df.columns]
+
+            for indice, linha in zip(df.index,
+                                     df[colunas].itertuples(index=False)):
+                valores = {
+                    CAMPOS_OHLC[campo]: (None if pd.isna(valor) else valor)
+                    for campo, valor in zip(colunas, linha)
+                }
+                if valores.get('volume') is not None:
+                    valores['volume'] = int(valores['volume'])
+
+                barras.append(PrecoHistorico(
+                    ticker=ticker,
+                    data=pd.Timestamp(indice).date(),
+                    **valores
+                ))
+
+        if barras:
+            PrecoHistorico.objects.bulk_create(
+                barras,
+                update_conflicts=True,
+                unique_fields=['ticker', 'data'],
+                update_fields=list(CAMPOS_OHLC.values())
+            )
+
+        ultima_data = barras[-1].data if barras else None
+        if controle is not None:
+            inicio = min(controle.inicio, desde)
+            ultima_data = max(filter(None, [controle.ultima_data,
+                                            ultima_data]), default=None)
+        else:
+            inicio = desde
+
+        SincronizacaoPreco.objects.update_or_create(
+            ticker=ticker,
+            defaults={
+                'inicio': inicio,
+                'ultima_data': ultima_data,
+                'sincronizado_em': hoje,
+            }
+        )
@@ -0,0 +1,32 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from investimentos.providers.base import MarketDataProvider
+from investimentos.providers.replay import ReplayProvider
+from investimentos.providers.yahoo import YahooProvider
+
+__all__ = ['MarketDataProvider', 'ReplayProvider', 'YahooProvider',
+           'get_provider']
+
+PROVIDER_PADRAO = 'investimentos.providers.YahooProvider'
+
+
+def get_provider():
+    """instancia do provedor configurado em MARKET_DATA_PROVIDER"""
+    return _instanciar(getattr(settings, 'MARKET_DATA_PROVIDER',
+                               PROVIDER_PADRAO))
+
+
+@lru_cache(maxsize=None)
+def _instanciar(caminho):
+    return import_string(caminho)()
+
+
+@receiver(setting_changed)
+def _recarregar_provider(setting, **kwargs):
+    if setting.startswith('MARKET_DATA_'):
+        _instanciar.cache_clear()
@@ -0,0 +1,43 @@
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+
+class MarketDataProvider:
+    """
+    fonte de dados de mercado usada pelo MarketDataService e pelo
+    PriceHistoryStore. as falhas do provedor viram None, nunca excecao.
+    """
+    TICKER_DOLAR = 'USDBRL=X'
+
+    def cotacao(self, ticker):
+        """ultimo preco do ticker, ou None"""
+        raise NotImplementedError
+
+    def cotacoes(self, tickers):
+        """{ ticker: ultimo preco ou None } para varios tickers"""
+        return {ticker: self.cotacao(ticker) for ticker in tickers}
+
+    def historico(self, tickers, inicio, fim):
+        """
+        barras diarias entre `inicio` e `fim` (inclusivos):
+        { ticker: DataFrame indexado por data com as colunas do yfinance
+        (Open, High, Low, Close, Adj Close, Volume) }.
+        retorna None quando o provedor falha.
+        """
+        raise NotImplementedError
+
+    def agora(self):
+        """
+        momento "atual" do mercado: dele saem o inicio das janelas, o
+        ultimo pregao esperado na matriz e o fim da sincronizacao
+        """
+        return timezone.localtime()
+
+    def cambio(self):
+        """cotacao do dolar em reais, ou None"""
+        return self.cotacao(self.TICKER_DOLAR)
+
+    async def acotacao(self, ticker):
+        """versao assincrona de cotacao()"""
+        return await sync_to_async(self.cotacao, thread_sensitive=False)(
+            ticker)
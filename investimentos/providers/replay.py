@@ -0,0 +1,89 @@
+import threading
+from datetime import datetime, time
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+
+from investimentos.providers.base import MarketDataProvider
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    provedor deterministico que serve historicos gravados em disco, um
+    arquivo por ticker (<TICKER>.parquet ou <TICKER>.csv, coluna Date mais
+    as colunas OHLC do yfinance). cada arquivo e lido uma vez e depois
+    servido da memoria. a cotacao "atual" e o ultimo fechamento ate
+    MARKET_DATA_REPLAY_DATA, ou o ultimo do arquivo. com a data fixada,
+    ela tambem e o "hoje" das janelas, da matriz e da sincronizacao, entao
+    o replay da o mesmo resultado em qualquer dia em que rodar.
+    """
+    EXTENSOES = ('.parquet', '.csv')
+
+    def __init__(self, diretorio=None, data_referencia=None):
+        self.diretorio = Path(diretorio or getattr(
+            settings, 'MARKET_DATA_REPLAY_DIR', 'replay'))
+        data_referencia = data_referencia or getattr(
+            settings, 'MARKET_DATA_REPLAY_DATA', None)
+        self.data_referencia = (pd.Timestamp(data_referencia)
+                                if data_referencia else None)
+
+        self._barras = {}
+        self._lock = threading.Lock()
+
+    def barras(self, ticker):
+        """DataFrame OHLC gravado do ticker, ou None se nao houver arquivo"""
+        with self._lock:
+            if ticker not in self._barras:
+                self._barras[ticker] = self._ler(ticker)
+            return self._barras[ticker]
+
+    def _ler(self, ticker):
+        for extensao in self.EXTENSOES:
+            caminho = self.diretorio / f'{ticker}{extensao}'
+            if not caminho.exists():
+                continue
+
+            if extensao == '.parquet':
+                df = pd.read_parquet(caminho)
+            else:
+                df = pd.read_csv(caminho)
+
+            if 'Date' in df.columns:
+                df = df.set_index('Date')
+            df.index = pd.to_datetime(df.index)
+            df = df.sort_index()
+
+            if self.data_referencia is not None:
+                df = df.loc[:self.data_referencia]
+            return df
+
+        return None
+
+    def agora(self):
+        if self.data_referencia is None:
+            return super().agora()
+        # o dia de referencia ja teve o pregao encerrado
+        return timezone.make_aware(
+            datetime.combine(self.data_referencia.date(), time.max))
+
+    def cotacao(self, ticker):
+        df = self.barras(ticker)
+        if df is None or df.empty:
+            return None
+
+        fechamentos = df['Close'].dropna()
+        return float(fechamentos.iloc[-1]) if not fechamentos.empty else None
+
+    def historico(self, tickers, inicio, fim):
+        resultado = {}
+        for ticker in tickers:
+            df = self.barras(ticker)
+            if df is not None:
+                resultado[ticker] = df.loc[pd.Timestamp(inicio):
+                                           pd.Timestamp(fim)]
+        return resultado
+
+    async def acotacao(self, ticker):
+        return self.cotacao(ticker)
@@ -0,0 +1,249 @@
+import asyncio
+import weakref
+from datetime import timedelta
+from urllib.parse import quote
+
+import httpx
+import pandas as pd
+import yfinance as yf
+from django.conf import settings
+
+from investimentos.providers.base import MarketDataProvider
+from investimentos.telemetry import chamada_upstream, logger, telemetria
+
+
+def _registrar_erro(operacao, tickers, erro):
+    for ticker in tickers:
+        telemetria.registrar_erro(ticker, erro)
+
+    # em lote, uma unica mensagem sem ticker: o limite de taxa agrupa pela
+    # operacao em vez de por combinacao de tickers
+    logger.warning('falha ao buscar %s no provedor: %s', operacao, erro,
+                   extra={'ticker': tickers[0] if len(tickers) == 1
+                          else None, 'evento': 'erro'})
+
+
+async def _fechar_ao_encerrar_loop(cliente):
+    """
+    fica suspenso enquanto o loop vive. sob WSGI cada async_to_sync cria
+    um loop por requisicao; ao encerra-lo (asyncio.run, async_to_sync ou o
+    desligamento do servidor ASGI) o loop.shutdown_asyncgens() fecha este
+    gerador e, com ele, o pool de conexoes do cliente
+    """
+    try:
+        yield
+    finally:
+        await cliente.aclose()
+
+
+class AsyncMarketDataClient:
+    """
+    cliente HTTP assincrono para o endpoint de chart do Yahoo. mantem um
+    pool de conexoes e um semaforo por event loop, para limitar quantas
+    requisicoes ficam em voo ao mesmo tempo no provedor.
+    """
+    BASE_URL = 'https://query1.finance.yahoo.com'
+    HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+    def __init__(self, timeout=None, max_conexoes=None,
+                 max_concorrencia=None, transport=None):
+        self.timeout = timeout or getattr(
+            settings, 'MARKET_DATA_HTTP_TIMEOUT', 5.0)
+        self.max_conexoes = max_conexoes or getattr(
+            settings, 'MARKET_DATA_HTTP_MAX_CONNECTIONS', 100)
+        self.max_concorrencia = max_concorrencia or getattr(
+            settings, 'MARKET_DATA_MAX_CONCURRENCY', 50)
+        self.transport = transport
+
+        # httpx.AsyncClient e asyncio.Semaphore ficam presos ao loop em
+        # que foram criados
+        self._por_loop = weakref.WeakKeyDictionary()
+
+    def _estado(self):
+        loop = asyncio.get_running_loop()
+        estado = self._por_loop.get(loop)
+
+        if estado is None:
+            cliente = httpx.AsyncClient(
+                base_url=self.BASE_URL,
+                headers=self.HEADERS,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_conexoes,
+                    max_keepalive_connections=self.max_conexoes
+                ),
+                transport=self.transport
+            )
+            vigia = _fechar_ao_encerrar_loop(cliente)
+            asyncio.ensure_future(vigia.__anext__())
+
+            estado = self._por_loop[loop] = (
+                cliente, asyncio.Semaphore(self.max_concorrencia), {}, vigia)
+
+        return estado
+
+    async def ultimo_preco(self, ticker):
+        """
+        ultimo preco negociado do ticker, ou None se o provedor falhar ou
+        nao conhecer o ativo. chamadas simultaneas para o mesmo ticker
+        compartilham a mesma requisicao.
+        """
+        _, _, em_voo, _ = self._estado()
+
+        tarefa = em_voo.get(ticker)
+        if tarefa is None:
+            tarefa = em_voo[ticker] = asyncio.ensure_future(
+                self._buscar_preco(ticker))
+            tarefa.add_done_callback(lambda _: em_voo.pop(ticker, None))
+
+        return await asyncio.shield(tarefa)
+
+    async def _buscar_preco(self, ticker):
+        cliente, semaforo, _, _ = self._estado()
+
+        try:
+            async with semaforo:
+                with chamada_upstream(ticker):
+                    resposta = await cliente.get(
+                        f'/v8/finance/chart/{quote(ticker)}',
+                        params={'range': '5d', 'interval': '1d'}
+                    )
+            resposta.raise_for_status()
+
+            resultado = resposta.json()['chart']['result'][0]
+            preco = resultado['meta'].get('regularMarketPrice')
+
+            if not preco:
+                fechamentos = [
+                    c for c in
+                    resultado['indicators']['quote'][0].get('close') or []
+                    if c is not None
+                ]
+                preco = fechamentos[-1] if fechamentos else None
+
+            if not preco:
+                telemetria.registrar(ticker, 'vazio')
+                return None
+            return float(preco)
+        except (httpx.HTTPError, KeyError, IndexError, TypeError,
+                ValueError) as e:
+            _registrar_erro('cotacao assincrona', [ticker], e)
+            return None
+
+    async def aclose(self):
+        estado = self._por_loop.pop(asyncio.get_running_loop(), None)
+        if estado is not None:
+            await estado[0].aclose()
+
+
+class YahooProvider(MarketDataProvider):
+    """
+    provedor padrao: yfinance para as chamadas sincronas e o endpoint de
+    chart do Yahoo, via httpx, para as assincronas
+    """
+
+    def __init__(self):
+        self.cliente_async = AsyncMarketDataClient()
+
+    def cotacao(self, ticker):
+        try:
+            with chamada_upstream(ticker):
+                ticker_obj = yf.Ticker(ticker)
+                preco = ticker_obj.fast_info.last_price
+
+                if not preco:
+                    hist = ticker_obj.history(period="1d")
+                    if not hist.empty:
+                        preco = hist['Close'].iloc[-1]
+        except Exception as e:
+            _registrar_erro('cotacao', [ticker], e)
+            return None
+
+        if not preco:
+            telemetria.registrar(ticker, 'vazio')
+            return None
+        return float(preco)
+
+    def cotacoes(self, tickers):
+        """ultimo fechamento de cada ticker em um unico yf.download"""
+        try:
+            with chamada_upstream(tickers):
+                dados = yf.download(
+                    tickers,
+                    period="5d",
+                    auto_adjust=False,
+                    progress=False,
+                    threads=True
+                )
+        except Exception as e:
+            _registrar_erro('cotacoes em lote', tickers, e)
+            dados = None
+
+        fechamentos = pd.DataFrame()
+        if dados is not None and not dados.empty:
+            if isinstance(dados.columns, pd.MultiIndex):
+                if 'Close' in dados.columns.get_level_values(0):
+                    fechamentos = dados['Close']
+            elif 'Close' in dados.columns:
+                fechamentos = pd.DataFrame({tickers[0]: dados['Close']})
+
+        resultado = {}
+        for ticker in tickers:
+            preco = None
+
+            if ticker in fechamentos.columns:
+                serie = fechamentos[ticker].dropna()
+                if not serie.empty:
+                    preco = float(serie.iloc[-1])
+
+            if preco is None and dados is not None:
+                telemetria.registrar(ticker, 'vazio')
+            resultado[ticker] = preco
+
+        return resultado
+
+    def historico(self, tickers, inicio, fim):
+        try:
+            with chamada_upstream(tickers):
+                dados = yf.download(
+                    tickers,
+                    start=inicio.isoformat(),
+                    end=(fim + timedelta(days=1)).isoformat(),
+                    auto_adjust=False,
+                    progress=False,
+                    threads=True
+                )
+        except Exception as e:
+            _registrar_erro('historico', tickers, e)
+            return None
+
+        if dados is None:
+            return None
+
+        por_ticker = self._separar_por_ticker(dados, tickers)
+        for ticker in tickers:
+            if ticker not in por_ticker:
+                telemetria.registrar(ticker, 'vazio')
+        return por_ticker
+
+    @staticmethod
+    def _separar_por_ticker(dados, tickers):
+        """
+        quebra o retorno do yf.download em um DataFrame OHLC por ticker
+        """
+        if dados.empty:
+            return {}
+
+        if not isinstance(dados.columns, pd.MultiIndex):
+            return {tickers[0]: dados}
+
+        por_ticker = {}
+        nivel_tickers = dados.columns.get_level_values(1)
+        for ticker in tickers:
+            if ticker in nivel_tickers:
+                por_ticker[ticker] = dados.xs(ticker, axis=1, level=1)
+
+        return por_ticker
+
+    async def acotacao(self, ticker):
+        return await self.cliente_async.ultimo_preco(ticker)
@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+TTL_PADRAO = {
+    'CRIPTO': 15,
+    'MOEDA': 60,
+    'ACOES': 60,
+}
+
+
+def classe_do_ticker(ticker):
+    """
+    classifica o ticker para escolher o TTL da cotacao
+    """
+    ticker = ticker.upper()
+
+    if ticker.endswith('=X'):
+        return 'MOEDA'
+    if ticker.endswith('-USD') or ticker.endswith('-BRL'):
+        return 'CRIPTO'
+    return 'ACOES'
+
+
+class _Chamada:
+    """busca em andamento compartilhada pelos chamadores concorrentes"""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class QuoteCache:
+    """
+    cache LRU de cotacoes com TTL por classe de ativo. enquanto uma busca
+    de um ticker esta em andamento, as demais chamadas para a mesma chave
+    aguardam o resultado dela em vez de irem ao provedor (single-flight).
+    """
+
+    def __init__(self, max_itens=None, ttls=None, relogio=time.monotonic):
+        self.max_itens = max_itens or getattr(
+            settings, 'MARKET_DATA_QUOTE_CACHE_SIZE', 2048)
+        self.ttls = {**TTL_PADRAO,
+                     **(ttls or getattr(settings, 'MARKET_DATA_QUOTE_TTL',
+                                        {}))}
+        self.relogio = relogio
+
+        self._itens = OrderedDict()
+        self._em_voo = {}
+        self._lock = threading.Lock()
+
+    def ttl(self, ticker):
+        return self.ttls.get(classe_do_ticker(ticker), TTL_PADRAO['ACOES'])
+
+    def get(self, chave):
+        with self._lock:
+            return self._ler(chave)
+
+    def set(self, chave, ticker, valor):
+        with self._lock:
+            self._guardar(chave, ticker, valor)
+
+    def obter(self, chave, ticker, buscar):
+        """
+        retorna o valor em cache ou executa `buscar()` uma unica vez por
+        chave, mesmo com varias threads pedindo o mesmo ticker
+        """
+        with self._lock:
+            valor = self._ler(chave)
+            if valor is not None:
+                return valor
+
+            chamada = self._em_voo.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = self._em_voo[chave] = _Chamada()
+
+        if not lider:
+            chamada.evento.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.resultado
+
+        try:
+            chamada.resultado = buscar()
+        except Exception as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self._lock:
+                if chamada.resultado is not None:
+                    self._guardar(chave, ticker, chamada.resultado)
+                del self._em_voo[chave]
+            chamada.evento.set()
+
+        return chamada.resultado
+
+    def clear(self):
+        with self._lock:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+    def _ler(self, chave):
+        item = self._itens.get(chave)
+        if item is None:
+            return None
+
+        expira_em, valor = item
+        if expira_em <= self.relogio():
+            del self._itens[chave]
+            return None
+
+        self._itens.move_to_end(chave)
+        return valor
+
+    def _guardar(self, chave, ticker, valor):
+        self._itens[chave] = (self.relogio() + self.ttl(ticker), valor)
+        self._itens.move_to_end(chave)
+
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+
+
+class CotacoesCompartilhadas:
+    """
+    cotacoes publicadas pelo worker (aquecer_cotacoes) no cache do Django,
+    visiveis a todos os processos. as views leem daqui antes de ir ao
+    provedor.
+    """
+    PREFIXO = 'cotacao'
+
+    def __init__(self, alias=None):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias or getattr(
+            settings, 'MARKET_DATA_CACHE_ALIAS', 'default')]
+
+    def _chave(self, chave):
+        return ':'.join((self.PREFIXO,) + tuple(chave))
+
+    def get(self, chave):
+        try:
+            return self.cache.get(self._chave(chave))
+        except Exception:
+            return None
+
+    def get_many(self, chaves):
+        """{ chave: valor } apenas das chaves encontradas"""
+        nomes = {self._chave(chave): chave for chave in chaves}
+        try:
+            encontrados = self.cache.get_many(list(nomes))
+        except Exception:
+            return {}
+        return {nomes[nome]: valor for nome, valor in encontrados.items()}
+
+    async def aget_many(self, chaves):
+        nomes = {self._chave(chave): chave for chave in chaves}
+        try:
+            encontrados = await self.cache.aget_many(list(nomes))
+        except Exception:
+            return {}
+        return {nomes[nome]: valor for nome, valor in encontrados.items()}
+
+    def set_many(self, valores, ttl):
+        self.cache.set_many(
+            {self._chave(chave): valor for chave, valor in valores.items()},
+            timeout=ttl
+        )
+
+
+cotacoes = QuoteCache()
+compartilhadas = CotacoesCompartilhadas()
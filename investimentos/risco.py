@@ -0,0 +1,240 @@
+"""
+metricas de risco sobre retornos diarios, todas vetorizadas: recebem uma
+carteira (dias,) ou varias (dias, carteiras) e devolvem um valor por
+carteira sem lacos em Python, entao acrescentar metricas nao multiplica
+o custo por carteira.
+"""
+import math
+import warnings
+from statistics import NormalDist
+
+import numpy as np
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DIAS_UTEIS = 252
+NORMAL = NormalDist()
+
+
+def taxa_livre_de_risco(datas):
+    """
+    retorno diario do CDI em cada data. com ANALYTICS_CDI_SERIE (caminho de
+    uma funcao que recebe as datas e devolve uma Series de taxas diarias)
+    usa a serie; senao capitaliza ANALYTICS_CDI_ANUAL por dia util.
+    """
+    caminho = getattr(settings, 'ANALYTICS_CDI_SERIE', None)
+    if caminho:
+        serie = import_string(caminho)(datas)
+        return serie.reindex(datas).ffill().bfill().fillna(0.0)\
+            .to_numpy(dtype='float64')
+
+    anual = getattr(settings, 'ANALYTICS_CDI_ANUAL', 0.0)
+    return np.full(len(datas), (1 + anual) ** (1 / DIAS_UTEIS) - 1)
+
+
+def metricas_de_risco(retornos, livre_de_risco, retornos_bench=None,
+                      confianca=None):
+    """
+    retornos: (dias,) ou (dias, carteiras). livre_de_risco e
+    retornos_bench: (dias,), com NaN no benchmark para os dias sem cotacao
+    do indice. devolve { metrica: escalar ou array (carteiras,) }, com NaN
+    onde a metrica nao se aplica.
+    """
+    if confianca is None:
+        confianca = getattr(settings, 'ANALYTICS_CONFIANCA_VAR', 0.95)
+
+    r = np.asarray(retornos, dtype='float64')
+    rf = np.asarray(livre_de_risco, dtype='float64')
+    coluna = (slice(None), None) if r.ndim == 2 else slice(None)
+    raiz_ano = math.sqrt(DIAS_UTEIS)
+
+    # series curtas e divisoes por zero viram NaN, sem avisos
+    with warnings.catch_warnings(), np.errstate(all='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+
+        excesso = r - rf[coluna]
+        media_excesso = excesso.mean(axis=0)
+        queda = np.sqrt((np.minimum(excesso, 0.0) ** 2).mean(axis=0))
+
+        metricas = {
+            'sharpe': media_excesso / excesso.std(axis=0, ddof=1) * raiz_ano,
+            'sortino': media_excesso / queda * raiz_ano,
+        }
+        metricas.update(_drawdown(r))
+        metricas.update(_var(r, 1 - confianca))
+        metricas.update(_relativas(r, rf, retornos_bench, coluna))
+
+    return metricas
+
+
+def _drawdown(r):
+    """maior queda desde um pico e maior sequencia de dias abaixo dele"""
+    forma = (1,) + r.shape[1:]
+    riqueza = np.concatenate([np.ones(forma), np.cumprod(1 + r, axis=0)])
+    drawdown = riqueza / np.maximum.accumulate(riqueza, axis=0) - 1
+
+    dias = np.arange(len(riqueza)).reshape((-1,) + (1,) * (r.ndim - 1))
+    ultimo_pico = np.maximum.accumulate(
+        np.where(drawdown >= 0, dias, 0), axis=0)
+
+    return {
+        'drawdown_maximo': drawdown.min(axis=0),
+        'duracao_drawdown': (dias - ultimo_pico).max(axis=0),
+    }
+
+
+def _var(r, alfa):
+    """VaR e CVaR de um dia, historicos e normais, como perda positiva"""
+    corte = np.quantile(r, alfa, axis=0)
+    media = r.mean(axis=0)
+    desvio = r.std(axis=0, ddof=1)
+    z = NORMAL.inv_cdf(alfa)
+
+    return {
+        'var_historico': -corte,
+        'cvar_historico': -np.nanmean(np.where(r <= corte, r, np.nan),
+                                      axis=0),
+        'var_parametrico': -(media + z * desvio),
+        'cvar_parametrico': -(media - desvio * NORMAL.pdf(z) / alfa),
+    }
+
+
+def _relativas(r, rf, retornos_bench, coluna):
+    """beta, alfa de Jensen, tracking error e information ratio"""
+    nulo = np.full(r.shape[1:], np.nan)
+    relativas = {'beta': nulo, 'alfa': nulo, 'tracking_error': nulo,
+                 'information_ratio': nulo}
+    if retornos_bench is None:
+        return relativas
+
+    b = np.asarray(retornos_bench, dtype='float64')
+    validos = ~np.isnan(b)
+    if validos.sum() < 2:
+        return relativas
+
+    b, r, rf = b[validos], r[validos], rf[validos]
+    b_centrado = b - b.mean()
+    covariancia = ((r - r.mean(axis=0)) * b_centrado[coluna]).sum(axis=0) \
+        / (len(b) - 1)
+    beta = covariancia / b.var(ddof=1)
+
+    ativo = r - b[coluna]
+    tracking_error = ativo.std(axis=0, ddof=1) * math.sqrt(DIAS_UTEIS)
+
+    return {
+        'beta': beta,
+        'alfa': ((r - rf[coluna]).mean(axis=0)
+                 - beta * (b - rf).mean()) * DIAS_UTEIS,
+        'tracking_error': tracking_error,
+        'information_ratio': ativo.mean(axis=0) * DIAS_UTEIS / tracking_error,
+    }
+
+
+def formatar(metricas, indice=None):
+    """
+    metricas de uma carteira no formato da API (percentuais com 2 casas);
+    `indice` escolhe a carteira quando o calculo foi em lote
+    """
+    def valor(nome):
+        bruto = metricas[nome]
+        bruto = bruto[indice] if indice is not None else bruto
+        return float(bruto) if np.isfinite(bruto) else None
+
+    def pct(nome):
+        bruto = valor(nome)
+        return None if bruto is None else round(bruto * 100, 2)
+
+    def razao(nome):
+        bruto = valor(nome)
+        return None if bruto is None else round(bruto, 2)
+
+    duracao = valor('duracao_drawdown')
+
+    return {
+        "sharpe_ratio": razao('sharpe'),
+        "sortino_ratio": razao('sortino'),
+        "drawdown_maximo_pct": pct('drawdown_maximo'),
+        "duracao_drawdown_dias": None if duracao is None else int(duracao),
+        "beta": razao('beta'),
+        "alfa_anual_pct": pct('alfa'),
+        "tracking_error_pct": pct('tracking_error'),
+        "information_ratio": razao('information_ratio'),
+        "var_historico_pct": pct('var_historico'),
+        "cvar_historico_pct": pct('cvar_historico'),
+        "var_parametrico_pct": pct('var_parametrico'),
+        "cvar_parametrico_pct": pct('cvar_parametrico'),
+    }
+
+
+def _soma_movel(x, janela):
+    """soma de cada janela em O(n): diferenca de somas acumuladas"""
+    acumulada = np.concatenate([[0.0], np.cumsum(x)])
+    soma = np.full(len(x), np.nan)
+    soma[janela - 1:] = acumulada[janela:] - acumulada[:-janela]
+    return soma
+
+
+def metricas_moveis(retornos, livre_de_risco, janela, retornos_bench=None):
+    """
+    retorno, volatilidade, Sharpe e correlacao com o benchmark de cada
+    janela de `janela` dias terminando em cada data (NaN antes de fechar a
+    primeira janela). cada serie sai de somas acumuladas, entao o custo e
+    O(n) qualquer que seja o tamanho da janela.
+    """
+    r = np.asarray(retornos, dtype='float64')
+    nulo = np.full(len(r), np.nan)
+    if len(r) < max(janela, 2) or janela < 2:
+        return {'retorno': nulo, 'volatilidade': nulo, 'sharpe': nulo,
+                'correlacao': nulo}
+
+    raiz_ano = math.sqrt(DIAS_UTEIS)
+
+    with np.errstate(all='ignore'):
+        retorno = np.expm1(_soma_movel(np.log1p(r), janela))
+
+        # centrar antes de acumular evita perder precisao em S2 - S1^2/n
+        centrado = r - r.mean()
+        s1 = _soma_movel(centrado, janela)
+        variancia = (_soma_movel(centrado ** 2, janela) - s1 ** 2 / janela) \
+            / (janela - 1)
+        volatilidade = np.sqrt(np.maximum(variancia, 0.0)) * raiz_ano
+
+        excesso = r - np.asarray(livre_de_risco, dtype='float64')
+        excesso_centrado = excesso - excesso.mean()
+        e1 = _soma_movel(excesso_centrado, janela)
+        variancia_excesso = (_soma_movel(excesso_centrado ** 2, janela)
+                             - e1 ** 2 / janela) / (janela - 1)
+        sharpe = (e1 / janela + excesso.mean()) \
+            / np.sqrt(np.maximum(variancia_excesso, 0.0)) * raiz_ano
+
+        correlacao = nulo
+        if retornos_bench is not None:
+            correlacao = _correlacao_movel(
+                r, np.asarray(retornos_bench, dtype='float64'), janela)
+
+    finitos = np.isfinite
+    return {
+        'retorno': retorno,
+        'volatilidade': volatilidade,
+        'sharpe': np.where(finitos(sharpe), sharpe, np.nan),
+        'correlacao': np.where(finitos(correlacao), correlacao, np.nan),
+    }
+
+
+def _correlacao_movel(r, b, janela):
+    """correlacao de Pearson por janela, so com os dias em que b existe"""
+    validos = ~np.isnan(b)
+    if validos.sum() < 2:
+        return np.full(len(r), np.nan)
+
+    x = np.where(validos, r - r[validos].mean(), 0.0)
+    y = np.where(validos, b - b[validos].mean(), 0.0)
+    n = _soma_movel(validos.astype('float64'), janela)
+
+    sx = _soma_movel(x, janela)
+    sy = _soma_movel(y, janela)
+    covariancia = _soma_movel(x * y, janela) - sx * sy / n
+    variancias = (_soma_movel(x * x, janela) - sx ** 2 / n) \
+        * (_soma_movel(y * y, janela) - sy ** 2 / n)
+
+    return np.where(n >= 2, covariancia / np.sqrt(variancias), np.nan)
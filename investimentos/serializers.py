@@ -1,3 +1,4 @@
+from decimal import Decimal
 from rest_framework import serializers
 from investimentos.models import ClienteInvestidor, Investimento
 
@@ -7,7 +8,8 @@ class InvestimentoSerializer(serializers.ModelSerializer):
         model = Investimento
         fields = '__all__'
         read_only_fields = ['id', 'cliente', 'data_aplicacao', 
-                            'valor_investido', 'ativo', 'preco_medio']
+                            'valor_investido', 'ativo', 'preco_medio',
+                            'data_resgate', 'valor_resgate']
 
 
 class ClienteInvestidorSerializer(serializers.ModelSerializer):
@@ -24,4 +26,55 @@ class ClienteInvestidorSerializer(serializers.ModelSerializer):
             'perfil_investidor', 'patrimonio_total', 
             'data_cadastro', 'investimentos'
         ]
-        read_only_fields = ['id', 'data_cadastro']
\ No newline at end of file
+        read_only_fields = ['id', 'data_cadastro']
+
+
+class OrdemLoteSerializer(serializers.Serializer):
+    OPERACAO_CHOICES = [
+        ("COMPRA", "Compra"),
+        ("RESGATE", "Resgate"),
+    ]
+    TIPOS_MERCADO = ('ACOES', 'FUNDOS', 'CRIPTO')
+
+    operacao = serializers.ChoiceField(choices=OPERACAO_CHOICES)
+
+    tipo_investimento = serializers.ChoiceField(
+        choices=Investimento.TIPO_INVESTIMENTO_CHOICES, required=False)
+    ticker = serializers.CharField(max_length=20, required=False)
+    quantidade = serializers.DecimalField(
+        max_digits=15, decimal_places=8, min_value=Decimal('0.00000001'),
+        required=False)
+    valor_investido = serializers.DecimalField(
+        max_digits=15, decimal_places=2, min_value=Decimal('0.01'),
+        required=False)
+
+    investimento = serializers.UUIDField(required=False)
+
+    def validate(self, attrs):
+        if attrs['operacao'] == 'RESGATE':
+            if not attrs.get('investimento'):
+                raise serializers.ValidationError(
+                    "Informe o investimento a resgatar.")
+            return attrs
+
+        tipo = attrs.get('tipo_investimento')
+        if not tipo:
+            raise serializers.ValidationError(
+                "Informe o tipo_investimento da compra.")
+
+        if tipo in self.TIPOS_MERCADO:
+            if not attrs.get('ticker') or not attrs.get('quantidade'):
+                raise serializers.ValidationError(
+                    "Compras de mercado exigem ticker e quantidade.")
+        elif not attrs.get('valor_investido'):
+            raise serializers.ValidationError(
+                "Informe o valor_investido.")
+
+        return attrs
+
+
+class LoteOrdensSerializer(serializers.Serializer):
+    MAX_ORDENS = 100
+
+    ordens = OrdemLoteSerializer(many=True, allow_empty=False,
+                                 max_length=MAX_ORDENS)
@@ -1,5 +1,17 @@
-import yfinance as yf
 import pandas as pd
+from investimentos.catalogo import catalogo
+from investimentos.matriz_precos import matriz_precos
+from investimentos.providers import get_provider
+from investimentos.price_store import PriceHistoryStore, inicio_do_periodo
+from investimentos.quote_cache import compartilhadas, cotacoes
+from investimentos.telemetry import logger, telemetria
+
+
+def registrar_consultas(acertos, faltas):
+    for ticker in acertos:
+        telemetria.registrar(ticker, 'cache_hit')
+    for ticker in faltas:
+        telemetria.registrar(ticker, 'cache_miss')
 
 
 class MarketDataService:
@@ -18,27 +30,28 @@ class MarketDataService:
     ]
 
     @staticmethod
-    def search_assets(query):
-        query = query.upper()
-        return [
-            asset for asset in MarketDataService.POPULAR_ASSETS 
-            if query in asset['ticker'] or query in asset['nome'].upper()
-        ]
+    def search_assets(query, limite=10, tipo=None):
+        """
+        autocomplete sobre o catalogo de ativos (carregar_ativos), do mais
+        relevante para o menos relevante
+        """
+        return catalogo.buscar(query, limite=limite, tipo=tipo)
 
     @staticmethod
     def get_latest_price(ticker):
-        try:
-            ticker_obj = yf.Ticker(ticker)
-            preco = ticker_obj.fast_info.last_price
-            
-            if not preco:
-                hist = ticker_obj.history(period="1d")
-                if not hist.empty:
-                    preco = hist['Close'].iloc[-1]
-            
-            return round(preco, 2) if preco else None
-        except Exception:
-            return None
+        def buscar():
+            info = compartilhadas.get(('info', ticker))
+            if info is not None:
+                return round(info['price'], 2)
+            return MarketDataService._buscar_latest_price(ticker)
+
+        return MarketDataService._obter_em_cache(('preco', ticker), ticker,
+                                                 buscar)
+
+    @staticmethod
+    def _buscar_latest_price(ticker):
+        preco = get_provider().cotacao(ticker)
+        return round(preco, 2) if preco else None
 
     @staticmethod
     def validar_ticker(ticker):
@@ -54,123 +67,188 @@ class MarketDataService:
         """
         garante que tickers da B3 tenham .SA e remove duplicatas
         """
-        lista_limpa = []
-        for t in tickers:
-            t = t.upper().strip()
-            if '.' not in t and '-' not in t:
-                t += '.SA'
-            lista_limpa.append(t)
+        lista_limpa = [MarketDataService._normalizar_ticker(t)
+                       for t in tickers]
         return list(set(lista_limpa))
 
     @staticmethod
-    def get_historico_carteira(tickers, periodo="1y"):
+    def _normalizar_ticker(ticker):
+        ticker = ticker.upper().strip()
+        if '.' not in ticker and '-' not in ticker:
+            ticker += '.SA'
+        return ticker
+
+    @staticmethod
+    def get_historico_carteira(tickers, periodo="1y", inicio=None):
+        """
+        fechamentos diarios (datas x tickers) lidos do historico local;
+        apenas os dias faltantes sao baixados do provedor de mercado.
+        `inicio` (date), quando informado, tem precedencia sobre o periodo.
+        """
         if not tickers:
             return pd.DataFrame()
 
         tickers_formatados = MarketDataService._normalizar_tickers(tickers)
-        print(f"--- Baixando dados para: {tickers_formatados} ---")
-        
-        try:
-            dados = yf.download(
-                tickers_formatados, 
-                period=periodo, 
-                auto_adjust=False, 
-                progress=False,
-                threads=True
-            )
-
-            if dados.empty:  # type: ignore
-                print("--- YFinance retornou vazio ---")
-                return pd.DataFrame()
+        logger.debug('carregando historico de %d tickers',
+                     len(tickers_formatados))
 
-            df_fechamento = pd.DataFrame()
-
-            if isinstance(dados.columns, pd.MultiIndex):  # type: ignore
-                try:
-                    
-                    if 'Adj Close' \
-                         in dados.columns.get_level_values(0):  # type: ignore
-                        df_fechamento = dados['Adj Close']  # type: ignore
-                    elif 'Close' \
-                            in \
-                            dados.columns.get_level_values(0):  # type: ignore
-                        df_fechamento = dados['Close']  # type: ignore
-                except Exception as e:
-                    print(f"Erro extraindo MultiIndex: {e}")
+        inicio = inicio or inicio_do_periodo(periodo)
 
-            else:
-                coluna = 'Adj Close' if 'Adj Close' \
-                    in dados.columns else 'Close'  # type: ignore
-                if coluna in dados.columns:  # type: ignore
-                    ticker_nome = tickers_formatados[0]
-                    df_fechamento = pd.DataFrame(
-                        {ticker_nome: dados[coluna]})  # type: ignore
+        # a matriz compartilhada entre os workers devolve views float32;
+        # sem ela (ou se nao cobre o pedido) o historico vem do banco
+        df_fechamento = matriz_precos.fechamentos(tickers_formatados, inicio)
+        if df_fechamento is not None:
+            return df_fechamento
+
+        try:
+            df_fechamento = PriceHistoryStore.fechamentos(
+                tickers_formatados, inicio)
+
+            if df_fechamento.empty:
+                logger.info('historico local vazio',
+                            extra={'evento': 'vazio'})
+                return pd.DataFrame()
 
             df_fechamento = df_fechamento.ffill().bfill().fillna(0)
 
             return df_fechamento
 
-        except Exception as e:
-            print(f"Erro crítico no yfinance: {e}")
+        except Exception:
+            logger.exception('erro ao carregar historico',
+                             extra={'evento': 'erro'})
             return pd.DataFrame()
         
     @staticmethod
-    def get_historico_benchmark(benchmark="^BVSP", periodo="1y"):
+    def get_historico_benchmark(benchmark="^BVSP", periodo="1y",
+                                inicio=None):
         """
         baixa o historico do indice de referência (Ibovespa, S&P500).
+        `inicio` (date), quando informado, tem precedencia sobre o periodo.
         """
         try:
-            ativo = yf.Ticker(benchmark)
-            hist = ativo.history(period=periodo)
+            df = PriceHistoryStore.fechamentos(
+                [benchmark], inicio or inicio_do_periodo(periodo))
             
-            if hist.empty:
+            if df.empty or benchmark not in df.columns:
                 return pd.Series(dtype='float64')
             
-            serie = hist['Close']
-            serie.index = serie.index.tz_localize(None)  # type: ignore
+            serie = df[benchmark].dropna()
+            serie.name = 'Close'
             
             return serie
             
-        except Exception as e:
-            print(f"Erro ao baixar benchmark {benchmark}: {e}")
+        except Exception:
+            logger.exception('erro ao carregar benchmark',
+                             extra={'ticker': benchmark, 'evento': 'erro'})
             return pd.Series(dtype='float64')
     
     @staticmethod
     def get_dolar_rate():
         """retorna a cotacao atual do dolar em reais (USDBRL=X)"""
-        try:
-            usd = yf.Ticker("USDBRL=X")
-            return float(usd.fast_info.last_price)  # type: ignore
-        except Exception:
-            return 1.0
+        rate = MarketDataService._obter_em_cache(
+            ('dolar', 'USDBRL=X'), 'USDBRL=X',
+            lambda: compartilhadas.get(('dolar', 'USDBRL=X'))
+            or MarketDataService._buscar_dolar_rate())
+        return rate or 1.0
+
+    @staticmethod
+    def _buscar_dolar_rate():
+        return get_provider().cambio()
         
     @staticmethod
     def get_ticker_info(ticker):
         """
         retorna dicionario completo: { 'price': 100.0, 'currency': 'BRL' }
         """
-        try:
-            ticker_obj = yf.Ticker(ticker)
-            price = ticker_obj.fast_info.last_price
-            
-            if not price:
-                hist = ticker_obj.history(period="1d")
-                if not hist.empty:
-                    price = hist['Close'].iloc[-1]
-                else:
-                    return None
-
-            currency = 'BRL'
-            ticker_upper = ticker.upper()
-            
-            if not ticker_upper.endswith('.SA') and ('-USD' in ticker_upper or 
-                                                     len(ticker_upper) <= 5):
-                currency = 'USD'
-
-            return {
-                'price': float(price),
-                'currency': currency
-            }
-        except Exception as e:
-            print(f"Erro ao buscar info do ticker {ticker}: {e}")
-            return None
\ No newline at end of file
+        return MarketDataService._obter_em_cache(
+            ('info', ticker), ticker,
+            lambda: compartilhadas.get(('info', ticker))
+            or MarketDataService._buscar_ticker_info(ticker))
+
+    @staticmethod
+    def _obter_em_cache(chave, ticker, buscar):
+        """
+        cotacoes.obter contando acerto ou falta do cache local por ticker
+        """
+        buscou = False
+
+        def buscar_contando():
+            nonlocal buscou
+            buscou = True
+            return buscar()
+
+        valor = cotacoes.obter(chave, ticker, buscar_contando)
+        telemetria.registrar(ticker, 'cache_miss' if buscou else 'cache_hit')
+        return valor
+
+    @staticmethod
+    def _buscar_ticker_info(ticker):
+        price = get_provider().cotacao(ticker)
+        if not price:
+            return None
+
+        return {
+            'price': float(price),
+            'currency': MarketDataService._inferir_moeda(ticker)
+        }
+
+    @staticmethod
+    def _inferir_moeda(ticker):
+        ticker_upper = ticker.upper()
+        
+        if not ticker_upper.endswith('.SA') and ('-USD' in ticker_upper or 
+                                                 len(ticker_upper) <= 5):
+            return 'USD'
+        return 'BRL'
+
+    @staticmethod
+    def get_bulk_ticker_info(tickers):
+        """
+        cotacao de varios tickers de uma vez: o que ja esta em cache (local
+        ou publicado pelo worker) e reaproveitado e o restante sai de um
+        unico pedido em lote ao provedor.
+        retorna { ticker: {'price': ..., 'currency': ...} ou None }
+        """
+        resultado = {}
+        faltantes = []
+
+        for ticker in dict.fromkeys(tickers):
+            info = cotacoes.get(('info', ticker))
+            if info is not None:
+                resultado[ticker] = info
+            else:
+                faltantes.append(ticker)
+
+        if faltantes:
+            publicadas = compartilhadas.get_many(
+                [('info', ticker) for ticker in faltantes])
+            for (_, ticker), info in publicadas.items():
+                cotacoes.set(('info', ticker), ticker, info)
+                resultado[ticker] = info
+            faltantes = [t for t in faltantes if t not in resultado]
+
+        registrar_consultas(resultado, faltantes)
+        if not faltantes:
+            return resultado
+
+        for ticker, info in MarketDataService._baixar_cotacoes(
+                faltantes).items():
+            if info is not None:
+                cotacoes.set(('info', ticker), ticker, info)
+            resultado[ticker] = info
+
+        return resultado
+
+    @staticmethod
+    def _baixar_cotacoes(tickers):
+        """
+        ultimo preco de cada ticker em uma unica chamada ao provedor, sem
+        passar pelos caches
+        """
+        return {
+            ticker: {
+                'price': preco,
+                'currency': MarketDataService._inferir_moeda(ticker)
+            } if preco else None
+            for ticker, preco in get_provider().cotacoes(tickers).items()
+        }
@@ -0,0 +1,164 @@
+"""
+telemetria dos dados de mercado: contadores por ticker (chamadas ao
+provedor e seu tempo, acertos e faltas de cache, respostas vazias e
+erros) e log estruturado com limite de taxa.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from project.instrumentation import medir
+
+EVENTOS = ('upstream', 'upstream_ms', 'cache_hit', 'cache_miss', 'vazio',
+           'erro')
+CAMPOS_LOG = ('ticker', 'evento', 'duracao_ms', 'suprimidas')
+
+
+class LimiteDeTaxa(logging.Filter):
+    """
+    deixa passar no maximo uma mensagem por `intervalo` segundos (padrao
+    MARKET_DATA_LOG_INTERVALO) para cada (nivel, mensagem, ticker). a
+    proxima que passar informa quantas foram suprimidas no campo
+    `suprimidas`.
+    """
+    MAX_CHAVES = 10_000
+
+    def __init__(self, intervalo=None, relogio=time.monotonic):
+        super().__init__()
+        self._intervalo = intervalo
+        self.relogio = relogio
+        self._janelas = {}
+        self._lock = threading.Lock()
+
+    @property
+    def intervalo(self):
+        if self._intervalo is not None:
+            return self._intervalo
+        return getattr(settings, 'MARKET_DATA_LOG_INTERVALO', 60.0)
+
+    def filter(self, record):
+        chave = (record.levelno, record.msg, getattr(record, 'ticker', None))
+        agora = self.relogio()
+        intervalo = self.intervalo
+
+        with self._lock:
+            janela = self._janelas.get(chave)
+            if janela is not None and agora - janela[0] < intervalo:
+                janela[1] += 1
+                return False
+
+            if len(self._janelas) >= self.MAX_CHAVES:
+                self._janelas.clear()
+            self._janelas[chave] = [agora, 0]
+
+        if janela is not None and janela[1]:
+            record.suprimidas = janela[1]
+        return True
+
+
+class FormatoEstruturado(logging.Formatter):
+    """acrescenta os campos estruturados do registro como chave=valor"""
+
+    def format(self, record):
+        texto = super().format(record)
+        campos = ' '.join(
+            f'{campo}={getattr(record, campo)}' for campo in CAMPOS_LOG
+            if getattr(record, campo, None) is not None
+        )
+        return f'{texto} {campos}' if campos else texto
+
+
+logger = logging.getLogger('investimentos.market_data')
+logger.addFilter(LimiteDeTaxa())
+
+
+class TelemetriaMercado:
+    """
+    contadores por ticker, agregados no processo (cada worker tem os seus).
+    os tickers vem de entrada do usuario, entao so os `max_tickers` (padrao
+    MARKET_DATA_TELEMETRIA_MAX_TICKERS) usados mais recentemente sao
+    mantidos; os demais saem do resumo.
+    """
+
+    def __init__(self, max_tickers=None):
+        self._max_tickers = max_tickers
+        self._contadores = OrderedDict()
+        self._ultimos_erros = {}
+        self._lock = threading.Lock()
+
+    @property
+    def max_tickers(self):
+        if self._max_tickers is not None:
+            return self._max_tickers
+        return getattr(settings, 'MARKET_DATA_TELEMETRIA_MAX_TICKERS', 1000)
+
+    def registrar(self, ticker, evento, quantidade=1):
+        with self._lock:
+            contadores = self._contadores.get(ticker)
+            if contadores is None:
+                contadores = self._contadores[ticker] = dict.fromkeys(
+                    EVENTOS, 0)
+                while len(self._contadores) > self.max_tickers:
+                    antigo, _ = self._contadores.popitem(last=False)
+                    self._ultimos_erros.pop(antigo, None)
+            else:
+                self._contadores.move_to_end(ticker)
+            contadores[evento] += quantidade
+
+    def registrar_erro(self, ticker, erro):
+        self.registrar(ticker, 'erro')
+        with self._lock:
+            if ticker in self._contadores:
+                self._ultimos_erros[ticker] = str(erro)[:200]
+
+    def resumo(self, ordenar_por='upstream_ms', limite=None, tickers=None):
+        """
+        [{ 'ticker': ..., 'upstream': n, 'upstream_ms': ms, ... }] do
+        ticker mais custoso para o menos custoso
+        """
+        if ordenar_por not in EVENTOS:
+            raise ValueError(f'ordenar_por deve ser um de {EVENTOS}')
+
+        with self._lock:
+            linhas = [
+                {'ticker': ticker, **contadores,
+                 'upstream_ms': round(contadores['upstream_ms'], 1),
+                 'ultimo_erro': self._ultimos_erros.get(ticker)}
+                for ticker, contadores in self._contadores.items()
+                if tickers is None or ticker in tickers
+            ]
+
+        linhas.sort(key=lambda linha: linha[ordenar_por], reverse=True)
+        return linhas[:limite] if limite else linhas
+
+    def limpar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._ultimos_erros.clear()
+
+
+telemetria = TelemetriaMercado()
+
+
+@contextmanager
+def chamada_upstream(tickers):
+    """
+    mede uma chamada ao provedor de mercado: entra no Server-Timing da
+    requisicao e o tempo e rateado entre os tickers consultados
+    """
+    tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+    inicio = time.perf_counter()
+
+    with medir('mercado'):
+        try:
+            yield
+        finally:
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+            parcela = duracao_ms / max(len(tickers), 1)
+            for ticker in tickers:
+                telemetria.registrar(ticker, 'upstream')
+                telemetria.registrar(ticker, 'upstream_ms', parcela)
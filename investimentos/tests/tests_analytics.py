@@ -0,0 +1,196 @@
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_banco.models import Pessoa
+from investimentos.analytics import (BatchPortfolioAnalytics,
+                                     PortfolioAnalytics)
+from investimentos.models import ClienteInvestidor, Investimento
+from investimentos.posicoes import retorno_ponderado_pelo_dinheiro
+from investimentos.price_store import inicio_do_periodo
+from investimentos.services import MarketDataService
+
+User = get_user_model()
+
+
+def _precos_fake(tickers=None, periodo=None, inicio=None):
+    datas = pd.bdate_range('2026-01-05', periods=30)
+    df = pd.DataFrame({
+        'PETR4.SA': [30 + i * 0.5 for i in range(30)],
+        'VALE3.SA': [60 - i * 0.2 + (i % 3) for i in range(30)],
+        'BTC-USD': [100 + (i % 5) * 2 for i in range(30)],
+    }, index=datas)
+    if tickers is None:
+        return df
+    colunas = MarketDataService._normalizar_tickers(tickers)
+    return df[[c for c in df.columns if c in colunas]]
+
+
+class BatchPortfolioAnalyticsTest(TestCase):
+    def setUp(self):
+        self.perfis = []
+        carteiras = [
+            {'PETR4': 10, 'VALE3': 5},
+            {'VALE3': 3, 'BTC-USD': 1},
+            {'PETR4': 1},
+        ]
+        for i, carteira in enumerate(carteiras):
+            user = User.objects.create_user(  # type: ignore
+                email=f'lote{i}@teste.com', password='123')
+            pessoa = Pessoa.objects.create(
+                user=user, nome=f'Cliente {i}', cpf_cnpj=f'1112223334{i}',
+                tipo_pessoa='F'
+            )
+            perfil = ClienteInvestidor.objects.create(pessoa=pessoa)
+            for ticker, qtd in carteira.items():
+                Investimento.objects.create(
+                    cliente=perfil, tipo_investimento='ACOES',
+                    ticker=ticker, quantidade=Decimal(qtd),
+                    preco_medio=Decimal('1.00')
+                )
+            self.perfis.append(perfil)
+
+        Investimento.objects.create(
+            cliente=self.perfis[2], tipo_investimento='ACOES',
+            ticker='VALE3', quantidade=Decimal(100),
+            preco_medio=Decimal('1.00'), ativo=False
+        )
+        # a carteira ja existia antes do historico de precos
+        Investimento.objects.update(
+            data_aplicacao=timezone.make_aware(datetime(2025, 12, 1)))
+
+    def test_linha_do_tempo_de_todos_os_clientes(self):
+        analytics = BatchPortfolioAnalytics.from_queryset(
+            Investimento.objects.all())
+
+        self.assertEqual(analytics.tickers,
+                         ['BTC-USD', 'PETR4.SA', 'VALE3.SA'])
+        self.assertEqual(analytics.clientes,
+                         sorted(p.id for p in self.perfis))
+
+        quantidades, _ = analytics.linha_do_tempo.quantidades(
+            [timezone.localdate()])
+        self.assertEqual(quantidades.shape, (1, 5))
+        self.assertEqual(quantidades.sum(), 20)
+
+    @patch('investimentos.services.MarketDataService.get_historico_carteira')
+    def test_um_download_para_todos_os_clientes(self, mock_hist):
+        mock_hist.return_value = _precos_fake()
+
+        analytics = BatchPortfolioAnalytics.from_queryset(
+            Investimento.objects.all())
+        resultado = analytics.calcular_performance('3mo')
+
+        self.assertEqual(mock_hist.call_count, 1)
+        self.assertEqual(set(resultado), {p.id for p in self.perfis})
+
+    @patch('investimentos.services.MarketDataService.get_historico_carteira')
+    @patch('investimentos.services.MarketDataService.get_historico_benchmark')
+    def test_resultado_igual_ao_calculo_individual(self, mock_bench,
+                                                   mock_hist):
+        mock_hist.side_effect = _precos_fake
+        mock_bench.return_value = pd.Series(dtype='float64')
+
+        # aporte e resgate no meio do historico
+        Investimento.objects.create(
+            cliente=self.perfis[0], tipo_investimento='ACOES',
+            ticker='BTC-USD', quantidade=Decimal(2),
+            preco_medio=Decimal('1.00')
+        )
+        Investimento.objects.filter(ticker='BTC-USD').update(
+            data_aplicacao=timezone.make_aware(datetime(2026, 1, 20)))
+        Investimento.objects.filter(ativo=False).update(
+            data_resgate=timezone.make_aware(datetime(2026, 1, 28)))
+
+        lote = BatchPortfolioAnalytics.from_queryset(
+            Investimento.objects.all()).calcular_performance('3mo')
+
+        for perfil in self.perfis:
+            individual = PortfolioAnalytics(perfil.investimentos.all())\
+                .calcular_performance('3mo')
+            self.assertEqual(lote[perfil.id], individual['metricas'])
+            self.assertIsNotNone(
+                lote[perfil.id]['retorno_ponderado_dinheiro_anual_pct'])
+
+    def test_tir_vetorizada_igual_a_escalar(self):
+        datas = pd.date_range('2026-01-01', periods=60, freq='B')
+        rng = np.random.default_rng(7)
+        valores = np.cumprod(1 + rng.normal(0, 0.02, (60, 6)), axis=0) * 100
+        fluxos = np.zeros((60, 6))
+        fluxos[20, 1:] = [50, -30, 80, 0, 10]
+        fluxos[40, 2] = 25
+        valores[:, 4] = 0  # sem posicao: indefinida
+        valores[30:, 5] = 0  # resgate total no meio
+
+        mwr = BatchPortfolioAnalytics._retornos_ponderados_pelo_dinheiro(
+            datas, valores, fluxos)
+
+        for j in range(6):
+            taxa = retorno_ponderado_pelo_dinheiro(datas, valores[:, j],
+                                                   fluxos[:, j])
+            if taxa is None:
+                self.assertTrue(np.isnan(mwr[j]))
+            else:
+                self.assertAlmostEqual(mwr[j], taxa, places=8)
+
+
+class PortfolioRollingViewTest(APITestCase):
+    def setUp(self):
+        user = User.objects.create_user(  # type: ignore
+            email='rolling@teste.com', password='123')
+        pessoa = Pessoa.objects.create(user=user, nome='Rolling',
+                                       cpf_cnpj='99988877766',
+                                       tipo_pessoa='F')
+        self.perfil = ClienteInvestidor.objects.create(pessoa=pessoa)
+        Investimento.objects.create(
+            cliente=self.perfil, tipo_investimento='ACOES', ticker='PETR4',
+            quantidade=Decimal(10), preco_medio=Decimal('1.00')
+        )
+        self.client.force_authenticate(user=user)
+
+        datas = pd.bdate_range(end=timezone.localdate(), periods=400)
+        Investimento.objects.update(
+            data_aplicacao=timezone.make_aware(datas[0].to_pydatetime()))
+        gerador = np.random.default_rng(1)
+        self.precos = pd.DataFrame({'PETR4.SA': 30 * np.exp(np.cumsum(
+            gerador.normal(0, 0.01, len(datas))))}, index=datas)
+
+    def _historico(self, tickers, periodo='1y', inicio=None):
+        return self.precos.loc[pd.Timestamp(inicio):]
+
+    @patch('investimentos.services.MarketDataService.get_historico_benchmark')
+    def test_series_moveis_do_periodo(self, mock_bench):
+        mock_bench.return_value = pd.Series(dtype='float64')
+
+        with patch('investimentos.services.MarketDataService'
+                   '.get_historico_carteira', side_effect=self._historico):
+            response = self.client.get(
+                reverse('portfolio_rolling', args=[self.perfil.id]),
+                {'periodo': '3mo', 'janelas': '21,252'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        inicio = inicio_do_periodo('3mo').isoformat()
+        self.assertGreaterEqual(response.data['datas'][0], inicio)
+        self.assertEqual(set(response.data['janelas']), {'21', '252'})
+
+        # a folga de historico fecha a maior janela ja no primeiro dia
+        anual = response.data['janelas']['252']
+        self.assertEqual(len(anual['volatilidade_pct']),
+                         len(response.data['datas']))
+        self.assertIsNotNone(anual['volatilidade_pct'][0])
+        self.assertIsNone(anual['correlacao_benchmark'][0])
+
+    def test_janelas_invalidas(self):
+        response = self.client.get(
+            reverse('portfolio_rolling', args=[self.perfil.id]),
+            {'janelas': '1,21'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,87 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_banco.models import ContaCorrente, Pessoa
+from investimentos.models import ClienteInvestidor, Investimento
+
+User = get_user_model()
+
+
+@override_settings(ANALYTICS_CACHE_ALIAS='default')
+@patch('investimentos.async_services.AsyncMarketDataService'
+       '.get_bulk_ticker_info', return_value={})
+@patch('investimentos.analytics.PortfolioAnalytics'
+       '.calcular_performance_snapshots', return_value=None)
+@patch('investimentos.analytics.PortfolioAnalytics.calcular_performance')
+class CacheAnalyticsViewTest(APITestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+        user = User.objects.create_user(  # type: ignore
+            email='cache@teste.com', password='123')
+        pessoa = Pessoa.objects.create(user=user, nome='Cache',
+                                       cpf_cnpj='55566677788',
+                                       tipo_pessoa='F')
+        ContaCorrente.objects.create(pessoa=pessoa, agencia='0001',
+                                     numero='20000',
+                                     saldo=Decimal('1000.00'), ativa=True)
+        self.perfil = ClienteInvestidor.objects.create(pessoa=pessoa)
+        self.investimento = Investimento.objects.create(
+            cliente=self.perfil, tipo_investimento='ACOES', ticker='PETR4',
+            quantidade=Decimal(10), valor_investido=Decimal('300.00')
+        )
+        Investimento.objects.create(
+            cliente=self.perfil, tipo_investimento='ACOES', ticker='VALE3',
+            quantidade=Decimal(5), valor_investido=Decimal('300.00')
+        )
+        self.client.force_authenticate(user=user)
+        self.url = reverse('portfolio_analytics', args=[self.perfil.id])
+
+    def test_segunda_requisicao_sai_do_cache_e_etag_da_304(self, mock_calculo,
+                                                           *_):
+        mock_calculo.return_value = {'historico': {}, 'metricas': {'a': 1}}
+
+        primeira = self.client.get(self.url)
+        segunda = self.client.get(self.url)
+        self.assertEqual(segunda.data, primeira.data)
+        self.assertEqual(segunda['ETag'], primeira['ETag'])
+
+        response = self.client.get(self.url,
+                                   HTTP_IF_NONE_MATCH=primeira['ETag'])
+        self.assertEqual(response.status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+        mock_calculo.assert_called_once()
+
+        outro_periodo = self.client.get(self.url, {'periodo': '3mo'},
+                                        HTTP_IF_NONE_MATCH=primeira['ETag'])
+        self.assertEqual(outro_periodo.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_calculo.call_count, 2)
+
+    def test_resgate_invalida_o_cache(self, mock_calculo, *_):
+        mock_calculo.return_value = {'historico': {}, 'metricas': {'a': 1}}
+        etag = self.client.get(self.url)['ETag']
+
+        self.client.delete(reverse('investimento-detail',
+                                   args=[self.investimento.id]))
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(mock_calculo.call_count, 2)
+
+    def test_resultado_insuficiente_nao_vai_para_o_cache(self, mock_calculo,
+                                                         *_):
+        mock_calculo.return_value = None
+
+        self.client.get(self.url)
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(mock_calculo.call_count, 2)
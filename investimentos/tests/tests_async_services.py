@@ -0,0 +1,113 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from investimentos.async_services import AsyncMarketDataService
+from investimentos.providers import get_provider
+from investimentos.providers.yahoo import AsyncMarketDataClient
+from investimentos.quote_cache import cotacoes
+
+
+class ProvedorFake:
+    """transporte httpx que responde o chart do Yahoo e mede concorrencia"""
+
+    def __init__(self, precos, atraso=0.01):
+        self.precos = precos
+        self.atraso = atraso
+        self.em_voo = 0
+        self.pico = 0
+        self.chamadas = []
+
+    async def __call__(self, request):
+        ticker = request.url.path.rsplit('/', 1)[-1]
+        self.chamadas.append(ticker)
+
+        self.em_voo += 1
+        self.pico = max(self.pico, self.em_voo)
+        await asyncio.sleep(self.atraso)
+        self.em_voo -= 1
+
+        if ticker not in self.precos:
+            return httpx.Response(404, json={'chart': {'result': None}})
+
+        return httpx.Response(200, json={'chart': {'result': [{
+            'meta': {'regularMarketPrice': self.precos[ticker]},
+            'indicators': {'quote': [{'close': []}]},
+        }]}})
+
+
+class AsyncMarketDataTest(SimpleTestCase):
+    def setUp(self):
+        cotacoes.clear()
+        self.addCleanup(cotacoes.clear)
+
+    def _cliente(self, provedor, **kwargs):
+        return AsyncMarketDataClient(
+            transport=httpx.MockTransport(provedor), **kwargs)
+
+    def test_concorrencia_limitada(self):
+        tickers = [f'T{i}.SA' for i in range(300)]
+        provedor = ProvedorFake({t: 10.0 for t in tickers})
+        cliente = self._cliente(provedor, max_concorrencia=20)
+
+        with patch.object(get_provider(), 'cliente_async', cliente):
+            infos = asyncio.run(
+                AsyncMarketDataService.get_bulk_ticker_info(tickers))
+
+        self.assertEqual(len(infos), 300)
+        self.assertTrue(all(i['price'] == 10.0 for i in infos.values()))
+        self.assertEqual(provedor.pico, 20)
+
+    def test_mesmo_ticker_uma_requisicao(self):
+        provedor = ProvedorFake({'PETR4.SA': 35.5})
+        cliente = self._cliente(provedor)
+
+        async def varias():
+            return await asyncio.gather(*(
+                cliente.ultimo_preco('PETR4.SA') for _ in range(10)))
+
+        self.assertEqual(asyncio.run(varias()), [35.5] * 10)
+        self.assertEqual(provedor.chamadas, ['PETR4.SA'])
+
+    def test_cliente_fechado_ao_fim_de_cada_loop(self):
+        # sob WSGI cada requisicao async roda num loop novo do async_to_sync
+        provedor = ProvedorFake({'PETR4.SA': 35.5})
+        cliente = self._cliente(provedor)
+        fechados = []
+        aclose = httpx.AsyncClient.aclose
+
+        async def registrar(http):
+            fechados.append(http)
+            await aclose(http)
+
+        with patch.object(httpx.AsyncClient, 'aclose', registrar):
+            for _ in range(3):
+                self.assertEqual(
+                    async_to_sync(cliente.ultimo_preco)('PETR4.SA'), 35.5)
+
+        self.assertEqual(len(fechados), 3)
+        self.assertTrue(all(http.is_closed for http in fechados))
+
+    def test_falha_do_provedor_vira_none_e_nao_entra_no_cache(self):
+        provedor = ProvedorFake({'BTC-USD': 60000.0})
+        cliente = self._cliente(provedor)
+
+        with patch.object(get_provider(), 'cliente_async', cliente):
+            infos = asyncio.run(AsyncMarketDataService.get_bulk_ticker_info(
+                ['BTC-USD', 'XYZ99']))
+
+        self.assertEqual(infos['BTC-USD'],
+                         {'price': 60000.0, 'currency': 'USD'})
+        self.assertIsNone(infos['XYZ99'])
+        self.assertIsNotNone(cotacoes.get(('info', 'BTC-USD')))
+        self.assertIsNone(cotacoes.get(('info', 'XYZ99')))
+
+    def test_timeout_vira_none(self):
+        async def lento(request):
+            raise httpx.ReadTimeout('timeout', request=request)
+
+        cliente = self._cliente(lento)
+        self.assertIsNone(asyncio.run(cliente.ultimo_preco('VALE3.SA')))
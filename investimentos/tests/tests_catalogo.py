@@ -0,0 +1,105 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from investimentos.catalogo import IndiceAtivos, catalogo
+from investimentos.models import Ativo
+
+User = get_user_model()
+
+
+class IndiceAtivosTest(SimpleTestCase):
+    def setUp(self):
+        self.indice = IndiceAtivos([
+            ('PETR4.SA', 'Petrobras PN', 'ACOES', 100),
+            ('PETR3.SA', 'Petrobras ON', 'ACOES', 80),
+            ('PRIO3.SA', 'PRIO ON', 'ACOES', 65),
+            ('HGLG11.SA', 'CSHG Logística FII', 'FUNDOS', 80),
+            ('BTC-USD', 'Bitcoin USD', 'CRIPTO', 100),
+        ])
+
+    def _tickers(self, consulta, **kwargs):
+        return [a['ticker'] for a in self.indice.buscar(consulta, **kwargs)]
+
+    def test_ticker_exato_antes_do_prefixo(self):
+        self.assertEqual(self._tickers('petr3')[0], 'PETR3.SA')
+        self.assertEqual(self._tickers('PETR'), ['PETR4.SA', 'PETR3.SA'])
+
+    def test_nome_sem_acento_e_varios_termos(self):
+        self.assertEqual(self._tickers('logistica'), ['HGLG11.SA'])
+        self.assertEqual(self._tickers('petrobras on')[0], 'PETR3.SA')
+
+    def test_tolera_erro_de_digitacao(self):
+        self.assertEqual(self._tickers('bitcon'), ['BTC-USD'])
+
+    def test_filtro_por_tipo_e_limite(self):
+        self.assertEqual(self._tickers('p', tipo='ACOES', limite=2),
+                         ['PETR4.SA', 'PETR3.SA'])
+        self.assertEqual(self._tickers('p', tipo='CRIPTO'), [])
+
+    def test_atualizacao_incremental(self):
+        self.indice.adicionar('PETR3.SA', 'Petrobras ON', 'ACOES', 200)
+        self.indice.remover('PETR4.SA')
+
+        self.assertEqual(self._tickers('PETR'), ['PETR3.SA'])
+        self.assertEqual(len(self.indice), 4)
+
+
+class CatalogoAtivosTest(APITestCase):
+    def setUp(self):
+        catalogo.limpar()
+        self.addCleanup(catalogo.limpar)
+
+        user = User.objects.create_user(  # type: ignore
+            email='busca@teste.com', password='123')
+        self.client.force_authenticate(user=user)
+
+    def test_carregar_ativos_e_buscar(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            arquivo = Path(pasta) / 'listagem.csv'
+            arquivo.write_text('ticker;nome;tipo;relevancia\n'
+                               'VALE3;Vale ON;ACOES;100\n'
+                               'MXRF11;Maxi Renda FII;FUNDOS;90\n'
+                               'XXX;Invalido;OPCAO;0\n', encoding='utf-8')
+            Ativo.objects.create(ticker='OIBR3.SA', nome='Oi ON',
+                                 tipo='ACOES')
+
+            call_command('carregar_ativos', str(arquivo),
+                         '--desativar-ausentes', stdout=StringIO(),
+                         stderr=StringIO())
+
+        self.assertEqual(
+            set(Ativo.objects.filter(ativo=True)
+                .values_list('ticker', flat=True)),
+            {'VALE3.SA', 'MXRF11.SA'}
+        )
+
+        response = self.client.get(reverse('ativos_busca'), {'q': 'maxi'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [
+            {'ticker': 'MXRF11.SA', 'nome': 'Maxi Renda FII',
+             'tipo': 'FUNDOS'}
+        ])
+
+    def test_gravacao_entra_no_indice(self):
+        url = reverse('ativos_busca')
+        self.assertEqual(self.client.get(url, {'q': 'wege'}).data, [])
+
+        ativo = Ativo.objects.create(ticker='WEGE3.SA', nome='WEG ON',
+                                     tipo='ACOES')
+        self.assertEqual(self.client.get(url, {'q': 'wege'}).data[0]
+                         ['ticker'], 'WEGE3.SA')
+
+        ativo.ativo = False
+        ativo.save()
+        self.assertEqual(self.client.get(url, {'q': 'wege'}).data, [])
+
+        response = self.client.get(url, {'q': 'wege', 'tipo': 'OPCAO'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,113 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_banco.models import ContaCorrente, Pessoa
+from investimentos.models import ClienteInvestidor
+from investimentos.quote_cache import cotacoes
+from project.instrumentation import medicao, medir, registro
+
+User = get_user_model()
+
+
+class MedirTest(SimpleTestCase):
+    def test_sem_medicao_nao_registra(self):
+        with medicao() as atual:
+            pass
+        with medir('analytics'):
+            pass
+        self.assertEqual(atual.categorias, {})
+
+    def test_acumula_por_categoria(self):
+        with medicao() as atual:
+            for _ in range(3):
+                with medir('mercado'):
+                    pass
+
+        chamadas, duracao = atual.categorias['mercado']
+        self.assertEqual(chamadas, 3)
+        self.assertGreaterEqual(duracao, 0.0)
+
+
+class InstrumentacaoMiddlewareTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(  # type: ignore
+            email='metricas@teste.com', password='123')
+        pessoa = Pessoa.objects.create(user=self.user, nome='Metricas',
+                                       cpf_cnpj='12312312312',
+                                       tipo_pessoa='F')
+        ContaCorrente.objects.create(pessoa=pessoa, agencia='0001',
+                                     numero='40000',
+                                     saldo=Decimal('1000.00'))
+        ClienteInvestidor.objects.create(pessoa=pessoa)
+        self.client.force_authenticate(user=self.user)
+
+        registro.limpar()
+        cotacoes.clear()
+        self.addCleanup(cotacoes.clear)
+
+    def test_sem_amostragem_nao_mede(self):
+        response = self.client.get(reverse('api_users_me'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(INSTRUMENTACAO_AMOSTRAGEM=1.0,
+                       INSTRUMENTACAO_METRICAS_TOKEN='segredo')
+    @patch('investimentos.providers.yahoo.yf.Ticker')
+    def test_server_timing_e_metricas(self, mock_ticker):
+        mock_ticker.return_value.fast_info.last_price = 20.0
+
+        response = self.client.post(reverse('investimento-list'), {
+            'tipo_investimento': 'ACOES',
+            'ticker': 'PETR4.SA',
+            'quantidade': 1
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn('mercado;dur=', timing)
+        self.assertIn('desc="1 chamadas"', timing)
+        self.assertIn('total;dur=', timing)
+
+        metricas = self.client.get(
+            reverse('metricas'),
+            HTTP_AUTHORIZATION='Bearer segredo').content.decode()
+        self.assertIn('# TYPE app_request_duration_ms histogram', metricas)
+        self.assertIn('app_mercado_duration_ms_count'
+                      '{view="investimento-list"} 1', metricas)
+        self.assertIn('# TYPE app_mercado_calls_total counter', metricas)
+        self.assertIn('app_mercado_calls_total'
+                      '{view="investimento-list"} 1', metricas)
+        self.assertNotIn('app_db_calls_bucket', metricas)
+
+    @override_settings(INSTRUMENTACAO_METRICAS_TOKEN=None,
+                       INSTRUMENTACAO_METRICAS_IPS=[])
+    def test_metricas_fechado_sem_configuracao(self):
+        # loopback nao basta: atras de proxy todo acesso chega assim
+        response = self.client.get(reverse('metricas'))
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(INSTRUMENTACAO_METRICAS_TOKEN=None,
+                       INSTRUMENTACAO_METRICAS_IPS=['10.0.0.5'])
+    def test_metricas_sem_token_so_para_ips_listados(self):
+        url = reverse('metricas')
+        response = self.client.get(url, REMOTE_ADDR='10.0.0.5')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    @override_settings(INSTRUMENTACAO_METRICAS_TOKEN='segredo')
+    def test_metricas_com_token(self):
+        url = reverse('metricas')
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer segredo')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer outro')
+        self.assertEqual(response.status_code, 403)
@@ -1,11 +1,16 @@
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
+from datetime import timedelta
 from decimal import Decimal
 from unittest.mock import patch
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from api_banco.models import Pessoa, ContaCorrente, Movimentacao
-from investimentos.models import ClienteInvestidor, Investimento
+from investimentos.models import (ClienteInvestidor, Investimento,
+                                  RequisicaoIdempotente)
+from investimentos.serializers import ClienteInvestidorSerializer
+from investimentos.views import ClienteInvestidorViewSet
 
 User = get_user_model()
 
@@ -108,6 +113,28 @@ class InvestimentosAPITest(APITestCase):
         mov = Movimentacao.objects.last()
         self.assertEqual(mov.tipo_operacao, 'C')  # type: ignore
 
+        # o resgate fica registrado para a linha do tempo das posicoes
+        inv.refresh_from_db()
+        self.assertFalse(inv.ativo)
+        self.assertIsNotNone(inv.data_resgate)
+        self.assertEqual(inv.valor_resgate, Decimal('500.00'))
+
+        # o resgatado sai das listagens, mas o detalhe continua acessivel
+        response = self.client.get(reverse('investimento-list'))
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get(reverse('investimento-list'),
+                                   {'ativo': 'false'})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        response = self.client.get(
+            reverse('cliente-investidor-detail', args=[self.perfil.id]))
+        self.assertEqual(response.data['investimentos'], [])
+
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('1000.00'))
+
     def test_tentar_excluir_perfil_com_investimento(self):
         """bloqueia exclusão do perfil se houver investimento ativo"""
         Investimento.objects.create(
@@ -135,4 +162,328 @@ class InvestimentosAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
         self.perfil.refresh_from_db()
-        self.assertEqual(self.perfil.perfil_investidor, 'ARROJADO')
\ No newline at end of file
+        self.assertEqual(self.perfil.perfil_investidor, 'ARROJADO')
+
+    def test_listar_perfis_numero_fixo_de_queries(self):
+        """pessoa, user e investimentos não podem gerar uma query por linha"""
+        for i in range(10):
+            Investimento.objects.create(
+                cliente=self.perfil,
+                tipo_investimento='ACOES',
+                ticker=f'TST{i}',
+                quantidade=Decimal('1'),
+                preco_medio=Decimal('10.00')
+            )
+
+        url = reverse('cliente-investidor-list')
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['email'], 'investidor@teste.com')
+        self.assertEqual(len(response.data[0]['investimentos']), 10)
+
+    def test_carga_de_varios_perfis_sem_n_mais_1(self):
+        """
+        cada usuario tem um unico perfil (OneToOne), entao a listagem da
+        API nunca traz mais de um; a carga do viewset e conferida sobre
+        varios clientes
+        """
+        for i in range(5):
+            user = User.objects.create_user(  # type: ignore
+                email=f'perfil{i}@teste.com', password='123')
+            pessoa = Pessoa.objects.create(
+                user=user, nome=f'Perfil {i}', cpf_cnpj=f'2223334445{i}',
+                tipo_pessoa='F'
+            )
+            perfil = ClienteInvestidor.objects.create(pessoa=pessoa)
+            for j in range(3):
+                Investimento.objects.create(
+                    cliente=perfil, tipo_investimento='ACOES',
+                    ticker=f'TST{j}', quantidade=Decimal('1'),
+                    preco_medio=Decimal('10.00')
+                )
+
+        queryset = ClienteInvestidorViewSet.com_relacionados(
+            ClienteInvestidor.objects.all())
+
+        with self.assertNumQueries(2):
+            dados = ClienteInvestidorSerializer(queryset, many=True).data
+
+        self.assertEqual(len(dados), 6)
+        self.assertEqual(sum(len(d['investimentos']) for d in dados), 15)
+
+    def test_por_cliente_paginado_por_cursor(self):
+        for i in range(5):
+            Investimento.objects.create(
+                cliente=self.perfil,
+                tipo_investimento='ACOES' if i % 2 else 'CRIPTO',
+                ticker=f'TST{i}',
+                quantidade=Decimal('1'),
+                preco_medio=Decimal('10.00'),
+                ativo=i != 4
+            )
+
+        url = reverse('investimento-por-cliente', args=[self.perfil.id])
+        response = self.client.get(url, {'page_size': 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+        vistos = [inv['id'] for inv in response.data['results']]
+        proxima = response.data['next']
+        while proxima:
+            response = self.client.get(proxima)
+            vistos += [inv['id'] for inv in response.data['results']]
+            proxima = response.data['next']
+
+        # o resgatado so aparece com ?ativo=false
+        self.assertEqual(len(vistos), 4)
+        self.assertEqual(len(set(vistos)), 4)
+
+    def test_por_cliente_filtros(self):
+        for i in range(5):
+            Investimento.objects.create(
+                cliente=self.perfil,
+                tipo_investimento='ACOES' if i % 2 else 'CRIPTO',
+                ticker=f'TST{i}',
+                quantidade=Decimal('1'),
+                preco_medio=Decimal('10.00'),
+                ativo=i != 3
+            )
+
+        url = reverse('investimento-por-cliente', args=[self.perfil.id])
+
+        response = self.client.get(url, {'tipo_investimento': 'acoes',
+                                         'ativo': 'true'})
+        self.assertEqual([inv['ticker'] for inv in response.data['results']],
+                         ['TST1'])
+
+        response = self.client.get(url, {'ticker': 'tst3'})
+        self.assertEqual(response.data['results'], [])
+
+        response = self.client.get(url, {'ticker': 'tst3', 'ativo': 'false'})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertFalse(response.data['results'][0]['ativo'])
+
+        response = self.client.get(url, {'ativo': 'talvez'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('investimentos.services.MarketDataService.get_ticker_info')
+    def test_idempotency_key_nao_debita_duas_vezes(self, mock_info):
+        mock_info.return_value = {'price': 20.00, 'currency': 'BRL'}
+
+        url = reverse('investimento-list')
+        data = {
+            'tipo_investimento': 'ACOES',
+            'ticker': 'TESTE3',
+            'quantidade': 10
+        }
+
+        primeira = self.client.post(url, data, HTTP_IDEMPOTENCY_KEY='abc-1')
+        repetida = self.client.post(url, data, HTTP_IDEMPOTENCY_KEY='abc-1')
+
+        self.assertEqual(primeira.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(repetida.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(repetida['Idempotent-Replayed'], 'true')
+        self.assertEqual(repetida.data['id'], str(primeira.data['id']))
+
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('800.00'))
+        self.assertEqual(Investimento.objects.count(), 1)
+
+        outra = self.client.post(url, data, HTTP_IDEMPOTENCY_KEY='abc-2')
+        self.assertEqual(outra.status_code, status.HTTP_201_CREATED)
+
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('600.00'))
+
+    @patch('investimentos.services.MarketDataService.get_ticker_info')
+    def test_idempotency_key_cotacao_fora_de_transacao(self, mock_info):
+        from django.db import connection
+
+        blocos = []
+
+        def cotar(ticker):
+            blocos.append(len(connection.atomic_blocks))
+            return {'price': 20.00, 'currency': 'BRL'}
+
+        mock_info.side_effect = cotar
+        nivel = len(connection.atomic_blocks)
+
+        response = self.client.post(
+            reverse('investimento-list'),
+            {'tipo_investimento': 'ACOES', 'ticker': 'TESTE3',
+             'quantidade': 10},
+            HTTP_IDEMPOTENCY_KEY='tx-1')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(blocos, [nivel])
+
+    @patch('investimentos.services.MarketDataService.get_ticker_info')
+    def test_idempotency_key_reusada_com_outro_corpo(self, mock_info):
+        mock_info.return_value = {'price': 20.00, 'currency': 'BRL'}
+        url = reverse('investimento-list')
+        data = {'tipo_investimento': 'ACOES', 'ticker': 'TESTE3',
+                'quantidade': 10}
+
+        self.client.post(url, data, HTTP_IDEMPOTENCY_KEY='r-1')
+        response = self.client.post(url, {**data, 'quantidade': 20},
+                                    HTTP_IDEMPOTENCY_KEY='r-1')
+
+        self.assertEqual(response.status_code,
+                         status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('800.00'))
+
+    @patch('investimentos.services.MarketDataService.get_ticker_info')
+    def test_idempotency_key_em_processamento(self, mock_info):
+        mock_info.return_value = {'price': 20.00, 'currency': 'BRL'}
+        url = reverse('investimento-list')
+        data = {'tipo_investimento': 'ACOES', 'ticker': 'TESTE3',
+                'quantidade': 10}
+
+        # outra requisicao reservou a chave e ainda nao debitou
+        self.client.post(url, data, HTTP_IDEMPOTENCY_KEY='p-0')
+        assinatura = RequisicaoIdempotente.objects.get(chave='p-0').assinatura
+        RequisicaoIdempotente.objects.create(usuario=self.user, chave='p-1',
+                                             assinatura=assinatura)
+
+        response = self.client.post(url, data, HTTP_IDEMPOTENCY_KEY='p-1')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        # reserva abandonada ha mais que EXPIRACAO_RESERVA e assumida
+        RequisicaoIdempotente.objects.filter(chave='p-1').update(
+            criada_em=timezone.now() - timedelta(hours=1))
+        response = self.client.post(url, data, HTTP_IDEMPOTENCY_KEY='p-1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('600.00'))
+
+    @patch('investimentos.services.MarketDataService.get_ticker_info')
+    def test_idempotency_key_compra_feita_nunca_e_refeita(self, mock_info):
+        mock_info.return_value = {'price': 20.00, 'currency': 'BRL'}
+        url = reverse('investimento-list')
+        data = {'tipo_investimento': 'ACOES', 'ticker': 'TESTE3',
+                'quantidade': 10}
+
+        # falha depois do debito, ao montar a resposta
+        with patch('investimentos.views.InvestimentoViewSet'
+                   '.get_success_headers', side_effect=RuntimeError):
+            primeira = self.client.post(url, data,
+                                        HTTP_IDEMPOTENCY_KEY='c-1')
+        self.assertEqual(primeira.status_code, status.HTTP_201_CREATED)
+
+        repetida = self.client.post(url, data, HTTP_IDEMPOTENCY_KEY='c-1')
+        self.assertEqual(repetida['Idempotent-Replayed'], 'true')
+        self.assertEqual(repetida.data['id'], primeira.data['id'])
+
+        # o processo morreu entre o debito e a gravacao da resposta
+        RequisicaoIdempotente.objects.filter(chave='c-1').update(
+            status_code=None, resposta=None,
+            criada_em=timezone.now() - timedelta(hours=1))
+
+        repetida = self.client.post(url, data, HTTP_IDEMPOTENCY_KEY='c-1')
+        self.assertEqual(repetida.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(repetida.data['id'], primeira.data['id'])
+
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('800.00'))
+        self.assertEqual(Investimento.objects.count(), 1)
+
+    @patch('investimentos.services.MarketDataService.get_ticker_info')
+    def test_idempotency_key_falha_permite_nova_tentativa(self, mock_info):
+        mock_info.return_value = {'price': 200.00, 'currency': 'BRL'}
+
+        url = reverse('investimento-list')
+        data = {
+            'tipo_investimento': 'ACOES',
+            'ticker': 'TESTE3',
+            'quantidade': 10
+        }
+
+        response = self.client.post(url, data, HTTP_IDEMPOTENCY_KEY='k-1')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        mock_info.return_value = {'price': 20.00, 'currency': 'BRL'}
+        response = self.client.post(url, data, HTTP_IDEMPOTENCY_KEY='k-1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('800.00'))
+
+    @patch('investimentos.services.MarketDataService.get_dolar_rate')
+    @patch('investimentos.services.MarketDataService.get_bulk_ticker_info')
+    def test_ordens_em_lote(self, mock_bulk, mock_dolar):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        mock_bulk.return_value = {
+            'PETR4.SA': {'price': 10.00, 'currency': 'BRL'},
+            'VALE3.SA': {'price': 20.00, 'currency': 'BRL'},
+            'BTC-USD': {'price': 10.00, 'currency': 'USD'},
+        }
+        mock_dolar.return_value = 5.0
+
+        resgate = Investimento.objects.create(
+            cliente=self.perfil, tipo_investimento='ACOES', ticker='ITUB4',
+            quantidade=Decimal('10'), preco_medio=Decimal('10.00')
+        )
+
+        url = reverse('investimento-lote')
+        data = {'ordens': [
+            {'operacao': 'COMPRA', 'tipo_investimento': 'ACOES',
+             'ticker': 'PETR4.SA', 'quantidade': 10},
+            {'operacao': 'COMPRA', 'tipo_investimento': 'ACOES',
+             'ticker': 'VALE3.SA', 'quantidade': 5},
+            {'operacao': 'COMPRA', 'tipo_investimento': 'CRIPTO',
+             'ticker': 'BTC-USD', 'quantidade': 2},
+            {'operacao': 'COMPRA', 'tipo_investimento': 'RENDA_FIXA',
+             'valor_investido': '300.00'},
+            {'operacao': 'RESGATE', 'investimento': str(resgate.id)},
+        ]}
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertLessEqual(len(queries), 12)
+        mock_bulk.assert_called_once()
+        mock_dolar.assert_called_once()
+
+        # 1000 - (100 + 100 + 100 + 300) + 100
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('500.00'))
+        self.assertEqual(Movimentacao.objects.count(), 5)
+        resgate.refresh_from_db()
+        self.assertFalse(resgate.ativo)
+        self.assertIsNotNone(resgate.data_resgate)
+        self.assertEqual(len(response.data['investimentos']), 4)
+
+    @patch('investimentos.services.MarketDataService.get_bulk_ticker_info')
+    def test_ordens_em_lote_sem_saldo_nao_grava_nada(self, mock_bulk):
+        mock_bulk.return_value = {
+            'PETR4.SA': {'price': 100.00, 'currency': 'BRL'},
+            'VALE3.SA': {'price': 100.00, 'currency': 'BRL'},
+        }
+
+        url = reverse('investimento-lote')
+        data = {'ordens': [
+            {'operacao': 'COMPRA', 'tipo_investimento': 'ACOES',
+             'ticker': 'PETR4.SA', 'quantidade': 6},
+            {'operacao': 'COMPRA', 'tipo_investimento': 'ACOES',
+             'ticker': 'VALE3.SA', 'quantidade': 6},
+        ]}
+
+        response = self.client.post(url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Saldo insuficiente', str(response.data))
+
+        self.conta.refresh_from_db()
+        self.assertEqual(self.conta.saldo, Decimal('1000.00'))
+        self.assertEqual(Investimento.objects.count(), 0)
+        self.assertEqual(Movimentacao.objects.count(), 0)
@@ -77,7 +77,8 @@ class MarketInvestmentTest(APITestCase):
         self.conta.refresh_from_db()
         self.assertEqual(self.conta.saldo, Decimal('1000.00'))
 
-    @patch('investimentos.services.MarketDataService.get_ticker_info')
+    @patch('investimentos.async_services.AsyncMarketDataService'
+           '.get_ticker_info')
     def test_market_proxy_quote(self, mock_info):
         mock_info.return_value = {'price': 35.50, 'currency': 'BRL'}
         
@@ -86,3 +87,76 @@ class MarketInvestmentTest(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['price'], 35.50)
+
+    @patch('investimentos.async_services.AsyncMarketDataService'
+           '.get_dolar_rate')
+    @patch('investimentos.async_services.AsyncMarketDataService'
+           '.get_bulk_ticker_info')
+    def test_market_proxy_quotes_lote(self, mock_bulk, mock_dolar):
+        mock_bulk.return_value = {
+            'PETR4.SA': {'price': 35.50, 'currency': 'BRL'},
+            'BTC-USD': {'price': 60000.0, 'currency': 'USD'},
+            'ETH-USD': {'price': 3000.0, 'currency': 'USD'},
+            'XYZ99': None,
+        }
+        mock_dolar.return_value = 5.0
+
+        url = reverse('market_proxy')
+        response = self.client.get(url, {
+            'action': 'quotes',
+            'tickers': 'PETR4.SA,BTC-USD,ETH-USD,XYZ99'
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_bulk.assert_called_once_with(
+            ['PETR4.SA', 'BTC-USD', 'ETH-USD', 'XYZ99'])
+        mock_dolar.assert_called_once()
+
+        self.assertEqual(len(response.data['quotes']), 3)
+        self.assertEqual(response.data['exchange_rate'], 5.0)
+        self.assertEqual(response.data['not_found'], ['XYZ99'])
+
+    @patch('investimentos.async_services.AsyncMarketDataService'
+           '.get_dolar_rate')
+    @patch('investimentos.async_services.AsyncMarketDataService'
+           '.get_bulk_ticker_info')
+    def test_market_proxy_quotes_post(self, mock_bulk, mock_dolar):
+        mock_bulk.return_value = {
+            'VALE3.SA': {'price': 60.0, 'currency': 'BRL'},
+        }
+
+        url = reverse('market_proxy')
+        response = self.client.post(url, {'tickers': ['vale3.sa']},
+                                    format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['quotes'][0]['price'], 60.0)
+        self.assertIsNone(response.data['exchange_rate'])
+        mock_dolar.assert_not_called()
+
+    @patch('investimentos.providers.yahoo.yf.download')
+    def test_bulk_ticker_info_uma_chamada(self, mock_download):
+        import pandas as pd
+        from investimentos.quote_cache import cotacoes
+        from investimentos.services import MarketDataService
+
+        cotacoes.clear()
+        self.addCleanup(cotacoes.clear)
+        cotacoes.set(('info', 'PETR4.SA'), 'PETR4.SA',
+                     {'price': 35.0, 'currency': 'BRL'})
+
+        colunas = pd.MultiIndex.from_product(
+            [['Close'], ['VALE3.SA', 'BTC-USD']])
+        mock_download.return_value = pd.DataFrame(
+            [[59.0, 61000.0], [60.0, None]], columns=colunas)
+
+        infos = MarketDataService.get_bulk_ticker_info(
+            ['PETR4.SA', 'VALE3.SA', 'BTC-USD'])
+
+        mock_download.assert_called_once()
+        self.assertEqual(mock_download.call_args[0][0],
+                         ['VALE3.SA', 'BTC-USD'])
+        self.assertEqual(infos['PETR4.SA']['price'], 35.0)
+        self.assertEqual(infos['VALE3.SA']['price'], 60.0)
+        self.assertEqual(infos['BTC-USD'],
+                         {'price': 61000.0, 'currency': 'USD'})
@@ -0,0 +1,134 @@
+import tempfile
+from datetime import date, datetime
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from investimentos.matriz_precos import (MatrizPrecos, matriz_precos,
+                                         ultimo_pregao)
+from investimentos.services import MarketDataService
+
+HOJE = date(2026, 3, 10)
+
+
+def _fechamentos():
+    # BTC negocia no fim de semana; PETR4 so entra na segunda semana
+    datas = pd.date_range('2026-03-02', '2026-03-10')
+    df = pd.DataFrame({
+        'BTC-USD': np.arange(len(datas), dtype='float64') + 100,
+        'PETR4.SA': [np.nan] * 7 + [30.0, 31.0],
+        'VALE3.SA': np.linspace(60, 64, len(datas)),
+    }, index=datas)
+    df.loc[df.index.dayofweek >= 5, 'VALE3.SA'] = np.nan
+    return df
+
+
+class MatrizPrecosTest(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = pasta.name
+
+        MatrizPrecos.montar(_fechamentos(), date(2026, 3, 1),
+                            gerada_em=HOJE).gravar(self.pasta)
+        self.matriz = MatrizPrecos.abrir(self.pasta)
+
+    def test_mapeada_em_float32_por_coluna(self):
+        self.assertIsInstance(self.matriz.valores, np.memmap)
+        self.assertEqual(self.matriz.valores.dtype, np.float32)
+        self.assertTrue(self.matriz.valores.flags.f_contiguous)
+        self.assertEqual(self.matriz.gerada_em, HOJE)
+
+    def test_recorte_sem_lacunas_e_view(self):
+        df = self.matriz.fechamentos(['BTC-USD'], date(2026, 3, 5))
+
+        self.assertEqual(df.index[0], pd.Timestamp('2026-03-05'))
+        self.assertTrue(np.shares_memory(df['BTC-USD'].to_numpy(),
+                                         self.matriz.valores))
+
+    def test_lacunas_tratadas_como_no_banco(self):
+        df = self.matriz.fechamentos(['VALE3.SA', 'PETR4.SA'],
+                                     date(2026, 3, 2))
+
+        # sem linhas de fim de semana e PETR4 preenchido para tras
+        self.assertEqual(len(df), 7)
+        self.assertEqual(df['PETR4.SA'].iloc[0], 30.0)
+
+        df = self.matriz.fechamentos(['PETR4.SA', 'VALE3.SA'],
+                                     date(2026, 3, 2))
+        self.assertEqual(list(df.columns), ['PETR4.SA', 'VALE3.SA'])
+
+    def test_cobertura(self):
+        self.assertTrue(self.matriz.cobre(['BTC-USD'], date(2026, 3, 1)))
+        self.assertFalse(self.matriz.cobre(['BTC-USD'], date(2026, 2, 1)))
+        self.assertFalse(self.matriz.cobre(['WEGE3.SA'], date(2026, 3, 5)))
+        self.assertEqual(self.matriz.ultima_data, HOJE)
+
+    def test_ultimo_pregao(self):
+        def em(*args):
+            return ultimo_pregao(timezone.make_aware(datetime(*args)))
+
+        self.assertEqual(em(2026, 3, 10, 19, 0), date(2026, 3, 10))
+        self.assertEqual(em(2026, 3, 10, 11, 0), date(2026, 3, 9))
+        self.assertEqual(em(2026, 3, 15, 12, 0), date(2026, 3, 13))
+        self.assertEqual(em(2026, 3, 16, 9, 0), date(2026, 3, 13))
+
+
+@patch('investimentos.matriz_precos.ultimo_pregao', return_value=HOJE)
+class HistoricoPelaMatrizTest(SimpleTestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.pasta = pasta.name
+
+        MatrizPrecos.montar(_fechamentos(), date(2026, 3, 1),
+                            gerada_em=HOJE).gravar(self.pasta)
+
+        configuracao = override_settings(MARKET_DATA_MATRIZ_DIR=self.pasta,
+                                         MARKET_DATA_MATRIZ_VERIFICACAO=0)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+        matriz_precos.limpar()
+        self.addCleanup(matriz_precos.limpar)
+
+    @patch('investimentos.services.PriceHistoryStore.fechamentos')
+    def test_historico_sem_consultar_o_banco(self, mock_banco, _):
+        df = MarketDataService.get_historico_carteira(
+            ['PETR4', 'BTC-USD'], inicio=date(2026, 3, 2))
+
+        mock_banco.assert_not_called()
+        self.assertEqual(df.shape, (9, 2))
+
+    @patch('investimentos.services.PriceHistoryStore.fechamentos')
+    def test_fora_da_matriz_vai_ao_banco(self, mock_banco, _):
+        mock_banco.return_value = pd.DataFrame()
+
+        MarketDataService.get_historico_carteira(
+            ['WEGE3'], inicio=date(2026, 3, 2))
+        MarketDataService.get_historico_carteira(
+            ['PETR4'], inicio=date(2025, 3, 2))
+
+        self.assertEqual(mock_banco.call_count, 2)
+
+    def test_nova_versao_e_remapeada(self, mock_pregao):
+        self.assertNotIn('WEGE3.SA', matriz_precos.matriz().colunas)
+
+        df = _fechamentos()
+        df['WEGE3.SA'] = 40.0
+        MatrizPrecos.montar(df, date(2026, 3, 1),
+                            gerada_em=HOJE).gravar(self.pasta)
+
+        self.assertIn('WEGE3.SA', matriz_precos.matriz().colunas)
+
+        # cobre o ultimo pregao encerrado: vale, qualquer que seja o dia
+        self.assertIsNotNone(matriz_precos.fechamentos(['WEGE3.SA'],
+                                                       date(2026, 3, 2)))
+
+        # houve pregao depois da ultima data da matriz
+        mock_pregao.return_value = date(2026, 3, 11)
+        self.assertIsNone(matriz_precos.fechamentos(['WEGE3.SA'],
+                                                    date(2026, 3, 2)))
@@ -0,0 +1,81 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from investimentos.posicoes import (LinhaDoTempoPosicoes,
+                                    retorno_ponderado_pelo_dinheiro,
+                                    retornos_ponderados_no_tempo)
+
+
+class LinhaDoTempoPosicoesTest(SimpleTestCase):
+    def setUp(self):
+        self.datas = pd.bdate_range('2026-03-02', periods=5)
+        self.precos = pd.DataFrame({
+            'PETR4.SA': [10.0, 11.0, 12.0, 12.0, 15.0],
+            'VALE3.SA': [50.0, 50.0, 55.0, 60.0, 60.0],
+        }, index=self.datas)
+
+        # compra antes da janela, aporte no meio e resgate no fim de semana
+        self.linha = LinhaDoTempoPosicoes([
+            (date(2026, 2, 20), 'PETR4.SA', 10.0),
+            (date(2026, 3, 4), 'VALE3.SA', 2.0),
+            (date(2026, 3, 7), 'PETR4.SA', -10.0),
+        ])
+
+    def test_quantidades_e_variacoes(self):
+        quantidades, variacoes = self.linha.quantidades(self.datas)
+
+        np.testing.assert_array_equal(quantidades[:, 0], [10, 10, 10, 10, 10])
+        np.testing.assert_array_equal(quantidades[:, 1], [0, 0, 2, 2, 2])
+        # a posicao inicial nao e aporte; o resgate cai depois da janela
+        np.testing.assert_array_equal(variacoes.sum(axis=0), [0, 2])
+
+    def test_evento_em_dia_sem_pregao_vai_para_o_proximo(self):
+        datas = pd.bdate_range('2026-03-02', periods=10)
+        quantidades, _ = self.linha.quantidades(datas)
+
+        # sabado 07/03 -> segunda 09/03
+        self.assertEqual(quantidades[4, 0], 10)
+        self.assertEqual(quantidades[5, 0], 0)
+
+    def test_retorno_ponderado_no_tempo_ignora_aportes(self):
+        valores, fluxos = self.linha.avaliar(self.precos)
+        np.testing.assert_allclose(valores, [100, 110, 230, 240, 270])
+        np.testing.assert_allclose(fluxos, [0, 0, 110, 0, 0])
+
+        retornos = retornos_ponderados_no_tempo(valores, fluxos)
+        np.testing.assert_allclose(retornos,
+                                   [0.1, 120 / 110 - 1, 240 / 230 - 1,
+                                    270 / 240 - 1])
+
+    def test_dias_sem_posicao_rendem_zero(self):
+        retornos = retornos_ponderados_no_tempo(
+            np.array([0.0, 0.0, 100.0, 110.0]),
+            np.array([0.0, 0.0, 100.0, 0.0]))
+        np.testing.assert_allclose(retornos, [0.0, 0.0, 0.1])
+
+
+class RetornoPonderadoPeloDinheiroTest(SimpleTestCase):
+    def test_sem_aportes_e_o_retorno_composto(self):
+        datas = pd.to_datetime(['2026-01-01', '2027-01-01'])
+        taxa = retorno_ponderado_pelo_dinheiro(
+            datas, np.array([100.0, 121.0]), np.zeros(2))
+        self.assertAlmostEqual(taxa, 0.21)
+
+    def test_aporte_no_meio_do_periodo(self):
+        # 100 no inicio, +100 em seis meses, 220 no fim
+        datas = pd.to_datetime(['2026-01-01', '2026-07-02', '2027-01-01'])
+        taxa = retorno_ponderado_pelo_dinheiro(
+            datas, np.array([100.0, 200.0, 220.0]),
+            np.array([0.0, 100.0, 0.0]))
+
+        anos = np.array([0.0, 182 / 365, 1.0])
+        caixa = np.array([-100.0, -100.0, 220.0])
+        self.assertAlmostEqual((caixa * (1 + taxa) ** -anos).sum(), 0.0)
+
+    def test_indefinido_sem_fluxo_de_entrada_e_saida(self):
+        datas = pd.to_datetime(['2026-01-01', '2026-02-01'])
+        self.assertIsNone(retorno_ponderado_pelo_dinheiro(
+            datas, np.zeros(2), np.zeros(2)))
@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import pandas as pd
+from django.test import TestCase
+from django.utils import timezone
+
+from investimentos.models import PrecoHistorico, SincronizacaoPreco
+from investimentos.price_store import PriceHistoryStore, inicio_do_periodo
+from investimentos.services import MarketDataService
+
+
+def _download_fake(tickers, datas, preco=10.0):
+    """monta um DataFrame no formato MultiIndex do yf.download"""
+    colunas = pd.MultiIndex.from_product(
+        [['Adj Close', 'Close', 'High', 'Low', 'Open', 'Volume'], tickers],
+        names=['Price', 'Ticker']
+    )
+    indice = pd.DatetimeIndex(datas)
+    return pd.DataFrame(preco, index=indice, columns=colunas)
+
+
+class PriceHistoryStoreTest(TestCase):
+    def setUp(self):
+        self.hoje = timezone.localdate()
+        self.inicio = self.hoje - timedelta(days=10)
+        self.datas = pd.bdate_range(self.inicio, self.hoje - timedelta(days=1))
+
+    @patch('investimentos.providers.yahoo.yf.download')
+    def test_primeira_leitura_baixa_e_persiste(self, mock_download):
+        mock_download.return_value = _download_fake(
+            ['PETR4.SA', 'VALE3.SA'], self.datas)
+
+        df = PriceHistoryStore.fechamentos(['PETR4.SA', 'VALE3.SA'],
+                                           self.inicio)
+
+        self.assertEqual(mock_download.call_count, 1)
+        self.assertEqual(sorted(df.columns), ['PETR4.SA', 'VALE3.SA'])
+        self.assertEqual(len(df), len(self.datas))
+        self.assertEqual(PrecoHistorico.objects.count(), 2 * len(self.datas))
+        self.assertEqual(SincronizacaoPreco.objects.count(), 2)
+
+    @patch('investimentos.providers.yahoo.yf.download')
+    def test_mesmo_dia_nao_consulta_provedor(self, mock_download):
+        mock_download.return_value = _download_fake(['PETR4.SA'],
+                                                    self.datas)
+
+        PriceHistoryStore.fechamentos(['PETR4.SA'], self.inicio)
+        df = PriceHistoryStore.fechamentos(['PETR4.SA'], self.inicio)
+
+        self.assertEqual(mock_download.call_count, 1)
+        self.assertEqual(len(df), len(self.datas))
+
+    @patch('investimentos.providers.yahoo.yf.download')
+    def test_dia_seguinte_baixa_somente_delta(self, mock_download):
+        ultima = self.hoje - timedelta(days=3)
+        SincronizacaoPreco.objects.create(
+            ticker='PETR4.SA', inicio=self.inicio, ultima_data=ultima,
+            sincronizado_em=self.hoje - timedelta(days=1)
+        )
+        mock_download.return_value = _download_fake(['PETR4.SA'],
+                                                    [ultima, self.hoje])
+
+        PriceHistoryStore.fechamentos(['PETR4.SA'], self.inicio)
+
+        _, kwargs = mock_download.call_args
+        self.assertEqual(kwargs['start'], ultima.isoformat())
+
+        controle = SincronizacaoPreco.objects.get(ticker='PETR4.SA')
+        self.assertEqual(controle.ultima_data, self.hoje)
+        self.assertEqual(controle.inicio, self.inicio)
+
+    @patch('investimentos.providers.yahoo.yf.download')
+    def test_historico_carteira_usa_store(self, mock_download):
+        mock_download.return_value = _download_fake(['PETR4.SA'],
+                                                    self.datas, 25.0)
+
+        df = MarketDataService.get_historico_carteira(['PETR4'], '1mo')
+
+        self.assertEqual(list(df.columns), ['PETR4.SA'])
+        self.assertEqual(df['PETR4.SA'].iloc[-1], 25.0)
+
+    def test_inicio_do_periodo(self):
+        hoje = date(2026, 3, 15)
+        self.assertEqual(inicio_do_periodo('1y', hoje), date(2025, 3, 15))
+        self.assertEqual(inicio_do_periodo('ytd', hoje), date(2026, 1, 1))
+        self.assertEqual(inicio_do_periodo('3mo', hoje), date(2025, 12, 15))
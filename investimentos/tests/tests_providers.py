@@ -0,0 +1,122 @@
+import tempfile
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_banco.models import ContaCorrente, Pessoa
+from investimentos.matriz_precos import ultimo_pregao
+from investimentos.models import (ClienteInvestidor, PrecoHistorico,
+                                  SincronizacaoPreco)
+from investimentos.price_store import PriceHistoryStore, inicio_do_periodo
+from investimentos.providers import ReplayProvider, get_provider
+from investimentos.quote_cache import cotacoes
+from investimentos.services import MarketDataService
+
+User = get_user_model()
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'cotacoes': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'replay-teste',
+    },
+})
+class ReplayProviderTest(APITestCase):
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        self.diretorio = Path(pasta.name)
+
+        datas = pd.bdate_range('2026-01-05', '2026-01-16')
+        for ticker, base in (('PETR4.SA', 30.0), ('BTC-USD', 90000.0),
+                             ('USDBRL=X', 5.0)):
+            pd.DataFrame({
+                'Date': datas,
+                'Open': base,
+                'High': base,
+                'Low': base,
+                'Close': [base + i for i in range(len(datas))],
+                'Adj Close': [base + i for i in range(len(datas))],
+                'Volume': 1000,
+            }).to_csv(self.diretorio / f'{ticker}.csv', index=False)
+
+        configuracao = self.settings(
+            MARKET_DATA_PROVIDER='investimentos.providers.ReplayProvider',
+            MARKET_DATA_REPLAY_DIR=self.diretorio,
+            MARKET_DATA_REPLAY_DATA='2026-01-09'
+        )
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+        cotacoes.clear()
+        self.addCleanup(cotacoes.clear)
+
+    def test_provider_vem_do_settings(self):
+        self.assertIsInstance(get_provider(), ReplayProvider)
+
+    def test_cotacoes_ate_a_data_de_referencia(self):
+        # 5 pregoes ate 09/01: fechamento base + 4
+        self.assertEqual(MarketDataService.get_ticker_info('PETR4.SA'),
+                         {'price': 34.0, 'currency': 'BRL'})
+        self.assertEqual(MarketDataService.get_dolar_rate(), 9.0)
+
+        infos = MarketDataService.get_bulk_ticker_info(['BTC-USD', 'XYZ9'])
+        self.assertEqual(infos['BTC-USD']['price'], 90004.0)
+        self.assertIsNone(infos['XYZ9'])
+
+    def test_data_de_referencia_e_o_hoje_do_replay(self):
+        # as janelas, a matriz e a sincronizacao nao dependem do relogio
+        self.assertEqual(get_provider().agora().date(), date(2026, 1, 9))
+        self.assertEqual(inicio_do_periodo('5d'), date(2026, 1, 4))
+        self.assertEqual(inicio_do_periodo('ytd'), date(2026, 1, 1))
+        self.assertEqual(ultimo_pregao(), date(2026, 1, 9))
+
+        PriceHistoryStore.sincronizar(['PETR4.SA'], date(2026, 1, 1))
+        controle = SincronizacaoPreco.objects.get(ticker='PETR4.SA')
+        self.assertEqual(controle.sincronizado_em, date(2026, 1, 9))
+        self.assertEqual(controle.ultima_data, date(2026, 1, 9))
+
+    def test_historico_e_exportacao(self):
+        df = PriceHistoryStore.fechamentos(['PETR4.SA'], date(2026, 1, 1))
+        self.assertEqual(df['PETR4.SA'].tolist(),
+                         [30.0, 31.0, 32.0, 33.0, 34.0])
+
+        destino = self.diretorio / 'exportado'
+        call_command('exportar_replay', '--diretorio', str(destino),
+                     stdout=StringIO())
+
+        exportado = ReplayProvider(diretorio=destino)
+        self.assertEqual(exportado.cotacao('PETR4.SA'), 34.0)
+        self.assertEqual(PrecoHistorico.objects.count(), 5)
+
+    def test_compra_offline(self):
+        user = User.objects.create_user(  # type: ignore
+            email='replay@teste.com', password='123')
+        pessoa = Pessoa.objects.create(user=user, nome='Replay',
+                                       cpf_cnpj='55566677788',
+                                       tipo_pessoa='F')
+        ContaCorrente.objects.create(pessoa=pessoa, agencia='0001',
+                                     numero='30000',
+                                     saldo=Decimal('10000.00'))
+        ClienteInvestidor.objects.create(pessoa=pessoa)
+        self.client.force_authenticate(user=user)
+
+        response = self.client.post(reverse('investimento-list'), {
+            'tipo_investimento': 'ACOES',
+            'ticker': 'PETR4.SA',
+            'quantidade': 10
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Decimal(response.data['valor_investido']),
+                         Decimal('340.00'))
@@ -0,0 +1,196 @@
+import threading
+import time
+from datetime import datetime
+from io import StringIO
+from unittest.mock import patch, MagicMock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api_banco.models import Pessoa
+from investimentos.management.commands.aquecer_cotacoes import (
+    Command as AquecerCotacoes)
+from investimentos.models import ClienteInvestidor, Investimento
+from investimentos.quote_cache import (QuoteCache, classe_do_ticker,
+                                       compartilhadas, cotacoes)
+from investimentos.services import MarketDataService
+
+
+class RelogioFake:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+class QuoteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.relogio = RelogioFake()
+        self.cache = QuoteCache(max_itens=2,
+                                ttls={'CRIPTO': 5, 'ACOES': 60},
+                                relogio=self.relogio)
+
+    def test_classe_do_ticker(self):
+        self.assertEqual(classe_do_ticker('BTC-USD'), 'CRIPTO')
+        self.assertEqual(classe_do_ticker('USDBRL=X'), 'MOEDA')
+        self.assertEqual(classe_do_ticker('PETR4.SA'), 'ACOES')
+
+    def test_ttl_por_classe(self):
+        self.cache.set('BTC-USD', 'BTC-USD', 1)
+        self.cache.set('PETR4', 'PETR4', 2)
+
+        self.relogio.agora = 10
+        self.assertIsNone(self.cache.get('BTC-USD'))
+        self.assertEqual(self.cache.get('PETR4'), 2)
+
+    def test_lru_descarta_menos_usado(self):
+        self.cache.set('A', 'A', 1)
+        self.cache.set('B', 'B', 2)
+        self.cache.get('A')
+        self.cache.set('C', 'C', 3)
+
+        self.assertEqual(self.cache.get('A'), 1)
+        self.assertIsNone(self.cache.get('B'))
+        self.assertEqual(self.cache.get('C'), 3)
+
+    def test_nao_guarda_resultado_vazio(self):
+        buscar = MagicMock(return_value=None)
+
+        self.cache.obter('X', 'X', buscar)
+        self.cache.obter('X', 'X', buscar)
+
+        self.assertEqual(buscar.call_count, 2)
+
+    def test_single_flight(self):
+        cache = QuoteCache(max_itens=10)
+        chamadas = []
+        liberar = threading.Event()
+
+        def buscar():
+            chamadas.append(1)
+            liberar.wait(timeout=5)
+            return {'price': 10.0}
+
+        resultados = []
+        threads = [
+            threading.Thread(
+                target=lambda: resultados.append(
+                    cache.obter('PETR4', 'PETR4', buscar)))
+            for _ in range(20)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        liberar.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(chamadas), 1)
+        self.assertEqual(len(resultados), 20)
+        self.assertTrue(all(r == {'price': 10.0} for r in resultados))
+
+
+class MarketDataServiceCacheTest(SimpleTestCase):
+    def setUp(self):
+        cotacoes.clear()
+        self.addCleanup(cotacoes.clear)
+
+    @patch('investimentos.providers.yahoo.yf.Ticker')
+    def test_get_ticker_info_consulta_provedor_uma_vez(self, mock_ticker):
+        mock_ticker.return_value.fast_info.last_price = 30.0
+
+        MarketDataService.get_ticker_info('PETR4.SA')
+        info = MarketDataService.get_ticker_info('PETR4.SA')
+
+        self.assertEqual(mock_ticker.call_count, 1)
+        self.assertEqual(info, {'price': 30.0, 'currency': 'BRL'})
+
+    @patch('investimentos.providers.yahoo.yf.Ticker')
+    def test_get_dolar_rate_falha_nao_fica_em_cache(self, mock_ticker):
+        mock_ticker.side_effect = Exception('timeout')
+
+        self.assertEqual(MarketDataService.get_dolar_rate(), 1.0)
+
+        mock_ticker.side_effect = None
+        mock_ticker.return_value.fast_info.last_price = 5.0
+        self.assertEqual(MarketDataService.get_dolar_rate(), 5.0)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'cotacoes': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'cotacoes-teste',
+    },
+})
+class AquecerCotacoesTest(TestCase):
+    def setUp(self):
+        cotacoes.clear()
+        caches['cotacoes'].clear()
+        self.addCleanup(cotacoes.clear)
+
+    def _baixar(self, tickers):
+        return {t: ({'price': 5.0, 'currency': 'BRL'}
+                    if t != 'XYZ99.SA' else None) for t in tickers}
+
+    def test_intervalo_por_classe_e_pregao(self):
+        comando = AquecerCotacoes()
+        pregao = datetime(2026, 10, 14, 11, 0)      # quarta, 11h
+        noite = datetime(2026, 10, 14, 22, 0)
+        sabado = datetime(2026, 10, 17, 11, 0)
+
+        self.assertEqual(comando._intervalo('ACOES', pregao), 60)
+        self.assertEqual(comando._intervalo('ACOES', noite), 1800)
+        self.assertEqual(comando._intervalo('MOEDA', noite), 60)
+        self.assertEqual(comando._intervalo('MOEDA', sabado), 1800)
+        self.assertEqual(comando._intervalo('CRIPTO', sabado), 15)
+
+    def test_universo_usa_tickers_normalizados(self):
+        user = get_user_model().objects.create_user(  # type: ignore
+            email='worker@javer.com', password='123')
+        pessoa = Pessoa.objects.create(user=user, nome='Worker',
+                                       cpf_cnpj='10120230344',
+                                       tipo_pessoa='F')
+        perfil = ClienteInvestidor.objects.create(pessoa=pessoa)
+        for ticker in ('itsa4', ' ITSA4 ', 'PETR4'):
+            Investimento.objects.create(
+                cliente=perfil, tipo_investimento='ACOES', ticker=ticker,
+                quantidade=1, preco_medio=1
+            )
+
+        acoes = AquecerCotacoes()._universo()['ACOES']
+        self.assertEqual(acoes.count('ITSA4.SA'), 1)
+        self.assertEqual(acoes.count('PETR4.SA'), 1)
+        self.assertNotIn('PETR4', acoes)
+
+    @patch('investimentos.services.MarketDataService._buscar_ticker_info')
+    @patch('investimentos.services.MarketDataService._baixar_cotacoes')
+    def test_worker_publica_e_views_leem_cache(self, mock_baixar,
+                                               mock_buscar):
+        mock_baixar.side_effect = self._baixar
+
+        call_command('aquecer_cotacoes', '--uma-vez', '--lote', '3',
+                     stdout=StringIO())
+
+        baixados = [t for chamada in mock_baixar.call_args_list
+                    for t in chamada.args[0]]
+        self.assertIn('USDBRL=X', baixados)
+        self.assertIn('BTC-USD', baixados)
+        self.assertLessEqual(
+            max(len(c.args[0]) for c in mock_baixar.call_args_list), 3)
+
+        self.assertEqual(compartilhadas.get(('dolar', 'USDBRL=X')), 5.0)
+        self.assertEqual(MarketDataService.get_ticker_info('PETR4.SA'),
+                         {'price': 5.0, 'currency': 'BRL'})
+        self.assertEqual(MarketDataService.get_dolar_rate(), 5.0)
+        mock_buscar.assert_not_called()
+
+        cotacoes.clear()
+        mock_baixar.reset_mock()
+        infos = MarketDataService.get_bulk_ticker_info(['VALE3.SA',
+                                                        'XYZ99.SA'])
+        self.assertEqual(infos['VALE3.SA']['price'], 5.0)
+        mock_baixar.assert_called_once_with(['XYZ99.SA'])
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, override_settings
+
+from investimentos import risco
+
+
+def taxa_fixa(datas):
+    return pd.Series(0.001, index=datas)
+
+
+class MetricasDeRiscoTest(SimpleTestCase):
+    def setUp(self):
+        gerador = np.random.default_rng(7)
+        self.bench = gerador.normal(0.0005, 0.01, 250)
+        self.retornos = 2 * self.bench + gerador.normal(0, 0.002, 250)
+        self.rf = np.full(250, 0.0004)
+
+    def test_sharpe_e_sortino(self):
+        m = risco.metricas_de_risco(self.retornos, self.rf)
+        excesso = self.retornos - self.rf
+        negativos = np.minimum(excesso, 0)
+
+        self.assertAlmostEqual(
+            m['sharpe'], excesso.mean() / excesso.std(ddof=1) * np.sqrt(252))
+        self.assertAlmostEqual(
+            m['sortino'],
+            excesso.mean() / np.sqrt((negativos ** 2).mean()) * np.sqrt(252))
+
+    def test_drawdown_e_duracao(self):
+        # 100 -> 200 -> 50 -> 100 -> 200 -> 150
+        retornos = np.array([1.0, -0.75, 1.0, 1.0, -0.25])
+        m = risco.metricas_de_risco(retornos, np.zeros(5))
+
+        self.assertAlmostEqual(m['drawdown_maximo'], -0.75)
+        self.assertEqual(m['duracao_drawdown'], 2)
+
+    def test_beta_alfa_e_tracking_error(self):
+        m = risco.metricas_de_risco(self.retornos, self.rf, self.bench)
+
+        self.assertAlmostEqual(float(m['beta']), 2.0, places=1)
+        ativo = self.retornos - self.bench
+        self.assertAlmostEqual(m['tracking_error'],
+                               ativo.std(ddof=1) * np.sqrt(252))
+
+        sem_bench = risco.metricas_de_risco(self.retornos, self.rf)
+        self.assertTrue(np.isnan(sem_bench['beta']))
+
+    def test_var_e_cvar(self):
+        m = risco.metricas_de_risco(self.retornos, self.rf, confianca=0.95)
+        corte = np.quantile(self.retornos, 0.05)
+
+        self.assertAlmostEqual(m['var_historico'], -corte)
+        self.assertAlmostEqual(
+            m['cvar_historico'],
+            -self.retornos[self.retornos <= corte].mean())
+        self.assertGreater(m['cvar_parametrico'], m['var_parametrico'])
+
+    def test_lote_igual_a_carteiras_individuais(self):
+        retornos = np.column_stack([self.retornos, self.bench])
+        lote = risco.metricas_de_risco(retornos, self.rf, self.bench)
+
+        for j in range(2):
+            individual = risco.metricas_de_risco(retornos[:, j], self.rf,
+                                                 self.bench)
+            self.assertEqual(risco.formatar(lote, j),
+                             risco.formatar(individual))
+
+    @override_settings(
+        ANALYTICS_CDI_SERIE='investimentos.tests.tests_risco.taxa_fixa')
+    def test_serie_de_cdi_configuravel(self):
+        datas = pd.bdate_range('2026-01-05', periods=3)
+        self.assertEqual(risco.taxa_livre_de_risco(datas).tolist(),
+                         [0.001] * 3)
+
+
+class MetricasMoveisTest(SimpleTestCase):
+    def test_igual_ao_rolling_do_pandas(self):
+        gerador = np.random.default_rng(3)
+        bench = pd.Series(gerador.normal(0, 0.01, 400))
+        retornos = 0.5 * bench + gerador.normal(0.0005, 0.01, 400)
+        bench.iloc[0] = np.nan
+        rf = np.full(400, 0.0004)
+
+        moveis = risco.metricas_moveis(retornos.to_numpy(), rf, 63,
+                                       bench.to_numpy())
+        janela = retornos.rolling(63)
+        excesso = (retornos - rf).rolling(63)
+
+        np.testing.assert_allclose(
+            moveis['volatilidade'], janela.std() * np.sqrt(252),
+            equal_nan=True)
+        np.testing.assert_allclose(
+            moveis['retorno'], (1 + retornos).rolling(63).apply(np.prod) - 1,
+            equal_nan=True)
+        np.testing.assert_allclose(
+            moveis['sharpe'], excesso.mean() / excesso.std() * np.sqrt(252),
+            equal_nan=True)
+        np.testing.assert_allclose(
+            moveis['correlacao'][63:], janela.corr(bench)[63:])
+        self.assertTrue(np.isnan(moveis['volatilidade'][61]))
+
+    def test_serie_menor_que_a_janela(self):
+        moveis = risco.metricas_moveis(np.zeros(10), np.zeros(10), 21)
+        self.assertTrue(np.isnan(moveis['retorno']).all())
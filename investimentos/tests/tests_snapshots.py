@@ -0,0 +1,164 @@
+from datetime import timedelta
+from io import StringIO
+from decimal import Decimal
+from unittest.mock import patch
+
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api_banco.models import Pessoa
+from investimentos.analytics import PortfolioAnalytics
+from investimentos.models import (ClienteInvestidor, Investimento,
+                                  PortfolioSnapshot)
+from investimentos.price_store import inicio_do_periodo
+
+User = get_user_model()
+
+
+class PortfolioSnapshotTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(  # type: ignore
+            email='snap@teste.com', password='123')
+        self.pessoa = Pessoa.objects.create(
+            user=self.user, nome='Snap', cpf_cnpj='11122233344',
+            tipo_pessoa='F'
+        )
+        self.perfil = ClienteInvestidor.objects.create(pessoa=self.pessoa)
+        Investimento.objects.create(
+            cliente=self.perfil, tipo_investimento='ACOES', ticker='PETR4',
+            quantidade=Decimal('10'), preco_medio=Decimal('10.00')
+        )
+
+        self.hoje = timezone.localdate()
+        datas = pd.date_range(self.hoje - timedelta(days=40), self.hoje)
+        Investimento.objects.update(
+            data_aplicacao=timezone.make_aware(datas[0].to_pydatetime()))
+        self.precos = pd.DataFrame(
+            {'PETR4.SA': [10.0 + i for i in range(len(datas))]},
+            index=datas
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+    def _historico(self, tickers, periodo='1y', inicio=None):
+        return self.precos.loc[pd.Timestamp(inicio):]
+
+    def test_comando_grava_somente_dias_novos(self):
+        with patch('investimentos.services.MarketDataService'
+                   '.get_historico_carteira', side_effect=self._historico):
+            call_command('atualizar_snapshots', '--periodo', '1mo',
+                         stdout=StringIO())
+
+            total = PortfolioSnapshot.objects.count()
+            ultimo = PortfolioSnapshot.objects.latest('data')
+            self.assertEqual(ultimo.data, self.hoje - timedelta(days=1))
+            self.assertFalse(
+                PortfolioSnapshot.objects.filter(data=self.hoje).exists())
+
+            ultimo.delete()
+            call_command('atualizar_snapshots',
+                         stdout=StringIO())
+
+        self.assertEqual(PortfolioSnapshot.objects.count(), total)
+
+        snaps = list(PortfolioSnapshot.objects.order_by('data'))
+        self.assertEqual(snaps[0].retorno_diario, 0.0)
+
+        esperado = snaps[-1].valor_total / snaps[0].valor_total - 1
+        self.assertAlmostEqual(snaps[-1].retorno_acumulado, esperado)
+
+    @patch('investimentos.async_services.AsyncMarketDataService'
+           '.get_bulk_ticker_info')
+    @patch('investimentos.services.MarketDataService.get_historico_benchmark')
+    @patch('investimentos.analytics.PortfolioAnalytics.calcular_performance')
+    def test_view_responde_a_partir_dos_snapshots(self, mock_calculo,
+                                                  mock_bench, mock_bulk):
+        with patch('investimentos.services.MarketDataService'
+                   '.get_historico_carteira', side_effect=self._historico):
+            call_command('atualizar_snapshots', '--periodo', '1mo',
+                         stdout=StringIO())
+
+            mock_bench.return_value = pd.Series(dtype='float64')
+            ontem = float(self.precos['PETR4.SA'].iloc[-2])
+            mock_bulk.return_value = {
+                'PETR4.SA': {'price': ontem * 1.1, 'currency': 'BRL'}
+            }
+
+            url = reverse('portfolio_analytics', args=[self.perfil.id])
+            response = self.client.get(url, {'periodo': '1mo'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_calculo.assert_not_called()
+
+        historico = response.data['historico']
+        self.assertEqual(historico['datas'][-1],
+                         self.hoje.strftime('%Y-%m-%d'))
+
+        base = self.precos.loc[
+            pd.Timestamp(PortfolioSnapshot.objects.earliest('data').data),
+            'PETR4.SA'
+        ]
+        esperado = (ontem * 1.1 / base - 1) * 100
+        self.assertAlmostEqual(historico['carteira_pct'][-1], esperado,
+                               places=1)
+
+    @patch('investimentos.services.MarketDataService'
+           '.get_bulk_ticker_info')
+    @patch('investimentos.services.MarketDataService.get_historico_benchmark')
+    def test_snapshots_e_calculo_ao_vivo_com_as_mesmas_metricas(self,
+                                                                mock_bench,
+                                                                mock_bulk):
+        # aporte no meio do periodo: muda o valor, mas nao e retorno
+        aporte = Investimento.objects.create(
+            cliente=self.perfil, tipo_investimento='ACOES', ticker='PETR4',
+            quantidade=Decimal('30'), preco_medio=Decimal('30.00')
+        )
+        Investimento.objects.filter(pk=aporte.pk).update(
+            data_aplicacao=timezone.make_aware(
+                pd.Timestamp(self.hoje - timedelta(days=10))
+                .to_pydatetime()))
+
+        mock_bench.return_value = pd.Series(dtype='float64')
+        mock_bulk.return_value = {'PETR4.SA': {
+            'price': float(self.precos['PETR4.SA'].iloc[-1]),
+            'currency': 'BRL'}}
+
+        def historico(tickers, periodo='1y', inicio=None):
+            inicio = inicio or inicio_do_periodo(periodo)
+            return self.precos.loc[pd.Timestamp(inicio):]
+
+        with patch('investimentos.services.MarketDataService'
+                   '.get_historico_carteira', side_effect=historico):
+            call_command('atualizar_snapshots', '--periodo', '1mo',
+                         stdout=StringIO())
+
+            analytics = PortfolioAnalytics(self.perfil.investimentos.all())
+            ao_vivo = analytics.calcular_performance('1mo')
+            snapshots = analytics.calcular_performance_snapshots(
+                self.perfil.id, '1mo')
+
+        self.assertEqual(snapshots['historico'], ao_vivo['historico'])
+        self.assertEqual(snapshots['metricas'], ao_vivo['metricas'])
+        self.assertIsNotNone(
+            snapshots['metricas']['retorno_ponderado_dinheiro_anual_pct'])
+        self.assertGreater(
+            PortfolioSnapshot.objects.filter(fluxo__gt=0).count(), 0)
+
+    @patch('investimentos.async_services.AsyncMarketDataService'
+           '.get_bulk_ticker_info')
+    @patch('investimentos.analytics.PortfolioAnalytics.calcular_performance')
+    def test_view_sem_snapshots_calcula_ao_vivo(self, mock_calculo,
+                                                mock_bulk):
+        mock_bulk.return_value = {}
+        mock_calculo.return_value = {'historico': {}, 'metricas': {}}
+
+        url = reverse('portfolio_analytics', args=[self.perfil.id])
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_calculo.assert_called_once()
@@ -0,0 +1,111 @@
+import logging
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from investimentos.quote_cache import cotacoes
+from investimentos.services import MarketDataService
+from investimentos.telemetry import (LimiteDeTaxa, TelemetriaMercado,
+                                     telemetria)
+
+User = get_user_model()
+
+
+class LimiteDeTaxaTest(SimpleTestCase):
+    def _registro(self, ticker='PETR4.SA'):
+        registro = logging.LogRecord('teste', logging.WARNING, __file__, 1,
+                                     'falha %s', ('x',), None)
+        registro.ticker = ticker
+        return registro
+
+    def test_suprime_repeticoes_dentro_do_intervalo(self):
+        agora = [0.0]
+        limite = LimiteDeTaxa(intervalo=60, relogio=lambda: agora[0])
+
+        self.assertTrue(limite.filter(self._registro()))
+        self.assertFalse(limite.filter(self._registro()))
+        self.assertFalse(limite.filter(self._registro()))
+        self.assertTrue(limite.filter(self._registro('VALE3.SA')))
+
+        agora[0] = 61.0
+        registro = self._registro()
+        self.assertTrue(limite.filter(registro))
+        self.assertEqual(registro.suprimidas, 2)
+
+
+class TelemetriaLimitadaTest(SimpleTestCase):
+    def test_descarta_tickers_menos_recentes(self):
+        contadores = TelemetriaMercado(max_tickers=2)
+        contadores.registrar('PETR4.SA', 'upstream')
+        contadores.registrar_erro('LIXO1.SA', 'nao encontrado')
+        contadores.registrar('PETR4.SA', 'cache_hit')
+        contadores.registrar('VALE3.SA', 'upstream')
+
+        self.assertEqual(
+            {linha['ticker']: linha['upstream']
+             for linha in contadores.resumo()},
+            {'PETR4.SA': 1, 'VALE3.SA': 1})
+        self.assertEqual(contadores._ultimos_erros, {})
+
+
+class TelemetriaMercadoTest(APITestCase):
+    def setUp(self):
+        telemetria.limpar()
+        self.addCleanup(telemetria.limpar)
+        cotacoes.clear()
+        self.addCleanup(cotacoes.clear)
+
+    @patch('investimentos.providers.yahoo.yf.Ticker')
+    def test_conta_chamadas_acertos_e_vazios(self, mock_ticker):
+        mock_ticker.return_value.fast_info.last_price = 20.0
+        MarketDataService.get_ticker_info('PETR4.SA')
+        MarketDataService.get_ticker_info('PETR4.SA')
+
+        mock_ticker.return_value.fast_info.last_price = None
+        mock_ticker.return_value.history.return_value.empty = True
+        MarketDataService.get_ticker_info('XYZ9.SA')
+
+        linhas = {linha['ticker']: linha for linha in telemetria.resumo()}
+        self.assertEqual(linhas['PETR4.SA']['upstream'], 1)
+        self.assertEqual(linhas['PETR4.SA']['cache_miss'], 1)
+        self.assertEqual(linhas['PETR4.SA']['cache_hit'], 1)
+        self.assertEqual(linhas['XYZ9.SA']['vazio'], 1)
+
+    @patch('investimentos.providers.yahoo.yf.download',
+           side_effect=RuntimeError('limite excedido'))
+    def test_erro_em_lote_conta_por_ticker_e_loga_uma_vez(self, _):
+        with self.assertLogs('investimentos.market_data', 'WARNING') as logs:
+            MarketDataService.get_bulk_ticker_info(['PETR4.SA', 'VALE3.SA'])
+
+        self.assertEqual(len(logs.records), 1)
+        for linha in telemetria.resumo():
+            self.assertEqual(linha['erro'], 1)
+            self.assertEqual(linha['ultimo_erro'], 'limite excedido')
+
+    def test_endpoint_ordena_e_exige_admin(self):
+        telemetria.registrar('PETR4.SA', 'upstream_ms', 10.0)
+        telemetria.registrar('BTC-USD', 'upstream_ms', 300.0)
+        url = reverse('market_telemetria')
+
+        usuario = User.objects.create_user(  # type: ignore
+            email='comum@teste.com', password='123')
+        self.client.force_authenticate(user=usuario)
+        self.assertEqual(self.client.get(url).status_code,
+                         status.HTTP_403_FORBIDDEN)
+
+        usuario.is_staff = True
+        usuario.save()
+        response = self.client.get(url, {'limite': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([linha['ticker'] for linha in response.data],
+                         ['BTC-USD'])
+
+        response = self.client.get(url, {'ordenar': 'latencia'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.delete(url)
+        self.assertEqual(self.client.get(url).data, [])
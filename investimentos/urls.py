@@ -1,9 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from investimentos.views import (ClienteInvestidorViewSet, 
+from investimentos.views import (AtivoBuscaView,
+                                 ClienteInvestidorViewSet, 
                                  InvestimentoViewSet,
                                  MarketProxyView,
-                                 PortfolioAnalyticsView)
+                                 PortfolioAnalyticsView,
+                                 PortfolioRollingView,
+                                 TelemetriaMercadoView)
 
 router = DefaultRouter()
 router.register(r'internal/clientes', ClienteInvestidorViewSet, 
@@ -14,6 +17,12 @@ router.register(r'internal/investimentos', InvestimentoViewSet,
 urlpatterns = [
     path('', include(router.urls)),
     path('internal/market/', MarketProxyView.as_view(), name='market_proxy'),
+    path('internal/market/telemetria/', TelemetriaMercadoView.as_view(),
+         name='market_telemetria'),
+    path('internal/ativos/busca/', AtivoBuscaView.as_view(),
+         name='ativos_busca'),
     path('internal/analytics/cliente/<uuid:cliente_id>/', 
          PortfolioAnalyticsView.as_view(), name='portfolio_analytics'),
+    path('internal/analytics/cliente/<uuid:cliente_id>/rolling/',
+         PortfolioRollingView.as_view(), name='portfolio_rolling'),
 ]
\ No newline at end of file
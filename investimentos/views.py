@@ -1,17 +1,34 @@
-from rest_framework import viewsets
+from rest_framework import status, viewsets
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
-from investimentos.models import ClienteInvestidor, Investimento
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.views import APIView
+from investimentos.models import (Ativo, ClienteInvestidor, Investimento,
+                                  RequisicaoIdempotente)
 from investimentos.serializers import (ClienteInvestidorSerializer, 
-                                       InvestimentoSerializer)
+                                       InvestimentoSerializer,
+                                       LoteOrdensSerializer,
+                                       OrdemLoteSerializer)
 from rest_framework.exceptions import ValidationError
-from django.db import transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch
+from django.utils import timezone
+from django.utils.http import parse_etags
 from investimentos.services import MarketDataService
-from api_banco.models import Movimentacao 
+from investimentos.async_services import AsyncMarketDataService
+from investimentos.async_views import AsyncAPIView
+from asgiref.sync import sync_to_async
+from api_banco.models import SaldoInsuficiente
+from datetime import timedelta
 from decimal import Decimal
-from rest_framework.views import APIView
+import hashlib
+import json
 from investimentos.analytics import PortfolioAnalytics
+from investimentos.analytics_cache import cache_analytics
+from investimentos.filters import InvestimentoFilter
+from investimentos.pagination import InvestimentoCursorPagination
+from investimentos.telemetry import EVENTOS, telemetria
 
 
 class ClienteInvestidorViewSet(viewsets.ModelViewSet):
@@ -20,7 +37,16 @@ class ClienteInvestidorViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        return ClienteInvestidor.objects.filter(pessoa__user=user)
+        return self.com_relacionados(
+            ClienteInvestidor.objects.filter(pessoa__user=user))
+
+    @staticmethod
+    def com_relacionados(queryset):
+        """pessoa, user e investimentos ativos em numero fixo de queries"""
+        return queryset.select_related('pessoa__user')\
+            .prefetch_related(Prefetch(
+                'investimentos',
+                queryset=Investimento.objects.filter(ativo=True)))
 
     def perform_create(self, serializer):
         serializer.save(pessoa=self.request.user.pessoa)  # type: ignore
@@ -41,17 +67,265 @@ class InvestimentoViewSet(viewsets.ModelViewSet):
     queryset = Investimento.objects.all()
     serializer_class = InvestimentoSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = InvestimentoCursorPagination
+    filter_backends = [InvestimentoFilter]
+
+    # reserva de chave sem resposta ha mais que isso e de uma requisicao
+    # que morreu no meio; outra tentativa pode assumir a chave
+    EXPIRACAO_RESERVA = timedelta(minutes=5)
+
+    def create(self, request, *args, **kwargs):
+        """
+        aceita o header Idempotency-Key: repetir a mesma chave devolve a
+        resposta da primeira execucao sem debitar a conta de novo. a chave
+        e reservada numa transacao curta propria; a cotacao e o debito
+        correm fora dela, e o investimento criado e gravado na reserva na
+        mesma transacao do debito. reusar a chave com outra requisicao da
+        422.
+        """
+        chave = request.headers.get('Idempotency-Key')
+        if not chave:
+            return super().create(request, *args, **kwargs)
+
+        assinatura = self._assinatura(request)
+        registro, anterior = self._reservar_chave(request.user, chave,
+                                                  assinatura)
+        if anterior is not None:
+            if anterior.assinatura != assinatura:
+                return Response(
+                    {'detail': 'Idempotency-Key já usada em outra '
+                               'requisição.'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            return self._repetir_resposta(anterior)
+
+        try:
+            response = self._criar(request, registro)
+        except Exception:
+            registro.refresh_from_db(fields=['investimento_criado'])
+            if registro.investimento_criado is None:
+                # falhou sem efeito: libera a chave para uma nova tentativa
+                registro.delete()
+                raise
+            # o debito ja foi feito: responde a partir do que foi gravado
+            response = self._resposta_da_compra(registro)
+
+        self._gravar_resposta(registro, response)
+        return response
+
+    def _criar(self, request, registro):
+        """CreateModelMixin.create, com a reserva ate o perform_create"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer, registro)
+        return Response(serializer.data, status=status.HTTP_201_CREATED,
+                        headers=self.get_success_headers(serializer.data))
+
+    def _resposta_da_compra(self, registro):
+        investimento = Investimento.objects.get(
+            pk=registro.investimento_criado)
+        return Response(self.get_serializer(investimento).data,
+                        status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def _gravar_resposta(registro, response):
+        registro.status_code = response.status_code
+        registro.resposta = response.data
+        registro.save(update_fields=['status_code', 'resposta'])
+
+    def _assinatura(self, request):
+        """hash de metodo, caminho e corpo da requisicao"""
+        dados = request.data
+        if hasattr(dados, 'lists'):
+            dados = dict(dados.lists())
+        corpo = json.dumps(dados, sort_keys=True, cls=DjangoJSONEncoder)
+        return hashlib.sha256(
+            f'{request.method}\n{request.path}\n{corpo}'.encode()
+        ).hexdigest()
+
+    def _reservar_chave(self, usuario, chave, assinatura):
+        """
+        (registro novo, None) se a chave foi reservada agora, ou
+        (None, registro existente)
+        """
+        for _ in range(2):
+            try:
+                with transaction.atomic():
+                    return RequisicaoIdempotente.objects.create(
+                        usuario=usuario, chave=chave,
+                        assinatura=assinatura), None
+            except IntegrityError:
+                pass
+
+            anterior = RequisicaoIdempotente.objects.filter(
+                usuario=usuario, chave=chave).first()
+            if anterior is None:
+                continue
+
+            # so e assumida a reserva que nunca chegou a debitar a conta
+            abandonada = RequisicaoIdempotente.objects.filter(
+                pk=anterior.pk, status_code__isnull=True,
+                investimento_criado__isnull=True,
+                criada_em__lt=timezone.now() - self.EXPIRACAO_RESERVA
+            ).delete()[0]
+            if not abandonada:
+                return None, anterior
+
+        return None, RequisicaoIdempotente.objects.get(usuario=usuario,
+                                                       chave=chave)
+
+    def _repetir_resposta(self, registro):
+        if registro.status_code is None:
+            if registro.investimento_criado is None:
+                return Response(
+                    {'detail': 'Requisição com esta chave em '
+                               'processamento.'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            # a compra foi feita, mas a resposta nao chegou a ser gravada
+            self._gravar_resposta(registro,
+                                  self._resposta_da_compra(registro))
+
+        response = Response(registro.resposta, status=registro.status_code)
+        response['Idempotent-Replayed'] = 'true'
+        return response
 
     @action(detail=False, methods=['get'], 
             url_path='cliente/(?P<cliente_id>[^/.]+)')
     def por_cliente(self, request, cliente_id=None):
         if cliente_id:
             cliente_id = cliente_id.strip()
-        investimentos = self.queryset.filter(cliente__id=cliente_id)
-        serializer = self.get_serializer(investimentos, many=True)
-        return Response(serializer.data)
+        investimentos = self.filter_queryset(
+            self.get_queryset().filter(cliente__id=cliente_id))
 
-    def perform_create(self, serializer):
+        page = self.paginate_queryset(investimentos)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'], url_path='lote')
+    def lote(self, request):
+        """
+        compras e resgates em uma unica requisicao: uma cotacao em lote,
+        uma checagem de saldo e bulk_create de tudo numa transacao.
+        body { "ordens": [ {"operacao": "COMPRA", "tipo_investimento":
+        "ACOES", "ticker": "PETR4.SA", "quantidade": 10},
+        {"operacao": "RESGATE", "investimento": "<uuid>"} ] }
+        """
+        entrada = LoteOrdensSerializer(data=request.data)
+        entrada.is_valid(raise_exception=True)
+        ordens = entrada.validated_data['ordens']  # type: ignore
+
+        try:
+            conta = request.user.pessoa.conta_corrente
+            perfil = request.user.pessoa.perfil_investidor
+        except Exception:
+            raise ValidationError("Conta corrente ou perfil de investidor "
+                                  "não encontrado.")
+
+        compras = [o for o in ordens if o['operacao'] == 'COMPRA']
+        ids_resgate = [o['investimento'] for o in ordens
+                       if o['operacao'] == 'RESGATE']
+
+        precos_brl = self._precificar_lote(compras)
+
+        resgates = list(Investimento.objects.filter(
+            id__in=ids_resgate, cliente=perfil, ativo=True))
+        if len(resgates) != len(set(ids_resgate)):
+            raise ValidationError("Investimento para resgate não "
+                                  "encontrado ou repetido.")
+
+        novos = []
+        operacoes = []
+        for ordem in compras:
+            if ordem['tipo_investimento'] in OrdemLoteSerializer\
+                    .TIPOS_MERCADO:
+                preco = precos_brl[ordem['ticker']]
+                quantidade = ordem['quantidade']
+                ticker = ordem['ticker']
+            else:
+                preco = Decimal("1.00")
+                quantidade = ordem['valor_investido']
+                ticker = None
+
+            valor = (quantidade * preco).quantize(Decimal('0.01'))
+            novos.append(Investimento(
+                cliente=perfil,
+                tipo_investimento=ordem['tipo_investimento'],
+                ticker=ticker,
+                quantidade=quantidade,
+                preco_medio=preco.quantize(Decimal('0.01')),
+                valor_investido=valor
+            ))
+            operacoes.append(('D', valor))
+
+        for investimento in resgates:
+            operacoes.append(('C', investimento.valor_investido))
+
+        with transaction.atomic():
+            try:
+                conta.movimentar_lote(operacoes)
+            except SaldoInsuficiente:
+                custo = sum((v for t, v in operacoes if t == 'D'),
+                            Decimal(0))
+                raise ValidationError(
+                    f"Saldo insuficiente. Custo: R$ {custo:.2f}")
+
+            Investimento.objects.bulk_create(novos)
+            resgatados = Investimento.objects.filter(
+                id__in=[inv.id for inv in resgates], ativo=True
+            ).update(ativo=False, data_resgate=timezone.now(),
+                     valor_resgate=F('valor_investido'))
+            if resgatados != len(resgates):
+                raise ValidationError("Investimento para resgate já "
+                                      "resgatado.")
+
+        cache_analytics.invalidar(perfil.id)
+
+        return Response({
+            'investimentos': self.get_serializer(novos, many=True).data,
+            'resgatados': [inv.id for inv in resgates],
+            'saldo': conta.saldo
+        }, status=status.HTTP_201_CREATED)
+
+    def _precificar_lote(self, compras):
+        """
+        preco em BRL de cada ticker comprado, com uma unica cotacao em
+        lote e no maximo uma consulta de cambio
+        """
+        tickers = [o['ticker'] for o in compras
+                   if o['tipo_investimento'] in
+                   OrdemLoteSerializer.TIPOS_MERCADO]
+        if not tickers:
+            return {}
+
+        infos = MarketDataService.get_bulk_ticker_info(tickers)
+
+        nao_encontrados = [t for t in tickers if not infos.get(t)]
+        if nao_encontrados:
+            raise ValidationError(
+                f"Tickers não encontrados: {', '.join(nao_encontrados)}")
+
+        taxa_dolar = None
+        precos_brl = {}
+        for ticker in tickers:
+            info = infos[ticker]
+            preco = Decimal(str(info['price']))
+
+            if info['currency'] == 'USD':
+                if taxa_dolar is None:
+                    taxa_dolar = Decimal(
+                        str(MarketDataService.get_dolar_rate()))
+                preco = preco * taxa_dolar
+
+            precos_brl[ticker] = preco
+
+        return precos_brl
+
+    def perform_create(self, serializer, registro=None):
+        """
+        `registro`: reserva do Idempotency-Key, marcada com o investimento
+        criado na mesma transacao do debito
+        """
         user = self.request.user
         dados = serializer.validated_data
         tipo = dados.get('tipo_investimento')
@@ -102,27 +376,22 @@ class InvestimentoViewSet(viewsets.ModelViewSet):
         except Exception:
             raise ValidationError("Conta corrente não encontrada.")
 
-        if conta.saldo < valor_total_transacao_brl:
-            raise ValidationError(
-                f"Saldo insuficiente. Custo: R$ \
-                      {valor_total_transacao_brl:.2f}")
+        try:
+            perfil = user.pessoa.perfil_investidor  # type: ignore
+        except Exception:
+            raise ValidationError("Perfil de investidor não encontrado.")
 
+        # a cotacao ja foi obtida acima, fora da transacao; aqui so o
+        # debito condicional e os inserts
         with transaction.atomic():
-            conta.saldo -= valor_total_transacao_brl
-            conta.save()
-
-            Movimentacao.objects.create(
-                conta=conta,
-                tipo_operacao='D',
-                valor=valor_total_transacao_brl
-            )
-
             try:
-                perfil = user.pessoa.perfil_investidor  # type: ignore
-            except Exception:
-                raise ValidationError("Perfil de investidor não encontrado.")
+                conta.debitar(valor_total_transacao_brl)
+            except SaldoInsuficiente:
+                raise ValidationError(
+                    f"Saldo insuficiente. Custo: R$ "
+                    f"{valor_total_transacao_brl:.2f}")
 
-            serializer.save(
+            investimento = serializer.save(
                 cliente=perfil,
                 ticker=ticker_final,
                 quantidade=quantidade_final,
@@ -130,7 +399,16 @@ class InvestimentoViewSet(viewsets.ModelViewSet):
                 valor_investido=valor_total_transacao_brl
             )
 
+            if registro is not None:
+                registro.investimento_criado = investimento.id
+                registro.save(update_fields=['investimento_criado'])
+
+        cache_analytics.invalidar(perfil.id)
+
     def perform_destroy(self, instance):
+        if not instance.ativo:
+            raise ValidationError("Investimento já resgatado.")
+
         user = self.request.user
         valor_resgate = instance.valor_investido
 
@@ -141,28 +419,26 @@ class InvestimentoViewSet(viewsets.ModelViewSet):
                                   "devolver o dinheiro.")
 
         with transaction.atomic():
-            conta.saldo += valor_resgate
-            conta.save()
+            if not instance.resgatar(valor_resgate):
+                raise ValidationError("Investimento já resgatado.")
+            conta.creditar(valor_resgate)
 
-            Movimentacao.objects.create(
-                conta=conta,
-                tipo_operacao='C',
-                valor=valor_resgate
-            )
-    
-            instance.delete()
+        cache_analytics.invalidar(instance.cliente_id)
 
 
-class MarketProxyView(APIView):
+class MarketProxyView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
+    MAX_TICKERS_LOTE = 200
 
-    def get(self, request):
+    async def get(self, request):
         action = request.query_params.get('action')
         
         if action == 'quote':
-            ticker = request.query_params.get('ticker')
+            ticker = request.query_params.get('ticker', '').strip()
 
-            info = MarketDataService.get_ticker_info(ticker)
+            info = None
+            if ticker:
+                info = await AsyncMarketDataService.get_ticker_info(ticker)
             
             if info:
                 response_data = {
@@ -172,50 +448,271 @@ class MarketProxyView(APIView):
                 }
                 
                 if info['currency'] == 'USD':
-                    response_data['exchange_rate'] = MarketDataService\
-                        .get_dolar_rate()
+                    response_data['exchange_rate'] = \
+                        await AsyncMarketDataService.get_dolar_rate()
                 
                 return Response(response_data)
+
+        if action == 'quotes':
+            tickers = request.query_params.get('tickers', '').split(',')
+            return await self._cotacoes_em_lote(tickers)
                 
         return Response({'error': 'Não encontrado'}, status=404)
+
+    async def post(self, request):
+        """
+        variante do action=quotes para listas longas:
+        body { "tickers": ["PETR4.SA", "BTC-USD", ...] }
+        """
+        tickers = request.data.get('tickers')
+
+        if not isinstance(tickers, list):
+            return Response({'error': 'Informe a lista "tickers".'},
+                            status=400)
+
+        return await self._cotacoes_em_lote(tickers)
+
+    async def _cotacoes_em_lote(self, tickers):
+        tickers = list(dict.fromkeys(
+            str(t).strip().upper() for t in tickers if str(t).strip()
+        ))
+
+        if not tickers:
+            return Response({'error': 'Nenhum ticker informado.'},
+                            status=400)
+
+        if len(tickers) > self.MAX_TICKERS_LOTE:
+            return Response(
+                {'error': f'Máximo de {self.MAX_TICKERS_LOTE} tickers por '
+                          'requisição.'},
+                status=400
+            )
+
+        infos = await AsyncMarketDataService.get_bulk_ticker_info(tickers)
+
+        taxa_dolar = None
+        if any(info and info['currency'] == 'USD'
+               for info in infos.values()):
+            taxa_dolar = await AsyncMarketDataService.get_dolar_rate()
+
+        cotacoes = []
+        nao_encontrados = []
+        for ticker in tickers:
+            info = infos.get(ticker)
+
+            if not info:
+                nao_encontrados.append(ticker)
+                continue
+
+            item = {
+                'ticker': ticker,
+                'price': info['price'],
+                'currency': info['currency']
+            }
+            if info['currency'] == 'USD':
+                item['exchange_rate'] = taxa_dolar
+            cotacoes.append(item)
+
+        return Response({
+            'quotes': cotacoes,
+            'exchange_rate': taxa_dolar,
+            'not_found': nao_encontrados
+        })
         
 
-class PortfolioAnalyticsView(APIView):
-    permission_classes = [IsAuthenticated]
+class CarteiraClienteMixin:
+    """carga da carteira e do periodo comum as views de analytics"""
+    PERIODOS_VALIDOS = ['1mo', '3mo', '6mo', '1y', '2y', '5y', 'ytd']
 
-    def get(self, request, cliente_id=None):
+    async def _carteira(self, request, cliente_id):
         """
-        calcula a performance historica da carteira do cliente.
-        URL: /api/internal/analytics/cliente/{id}/?periodo=1y
+        (cliente_id, investimentos) ou (None, Response de erro)
         """
         if not cliente_id and hasattr(request.user, 'pessoa'):
             try:
-                cliente_id = request.user.pessoa.perfil_investidor.id
+                cliente_id = await sync_to_async(
+                    lambda: request.user.pessoa.perfil_investidor.id)()
             except Exception:
-                return Response({'error': 'Perfil não encontrado'}, status=404)
+                return None, Response({'error': 'Perfil não encontrado'},
+                                      status=404)
 
-        investimentos = Investimento.objects.filter(
-            cliente__id=cliente_id, 
-            ativo=True
+        # os resgatados entram para a linha do tempo das posicoes
+        investimentos = await sync_to_async(list)(
+            Investimento.objects.filter(cliente__id=cliente_id)
         )
 
-        if not investimentos.exists():
-            return Response({'error': 'Sem investimentos ativos'}, status=404)
+        if not any(inv.ativo for inv in investimentos):
+            return None, Response({'error': 'Sem investimentos ativos'},
+                                  status=404)
 
+        return cliente_id, investimentos
+
+    def _periodo(self, request):
         periodo = request.query_params.get('periodo', '1y')
-        valid_periods = ['1mo', '3mo', '6mo', '1y', '2y', '5y', 'ytd']
-        if periodo not in valid_periods:
-            periodo = '1y'
+        return periodo if periodo in self.PERIODOS_VALIDOS else '1y'
+
+
+class PortfolioAnalyticsView(CarteiraClienteMixin, AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+    BENCHMARK = '^BVSP'
+
+    async def get(self, request, cliente_id=None):
+        """
+        calcula a performance historica da carteira do cliente.
+        URL: /api/internal/analytics/cliente/{id}/?periodo=1y
+        o resultado fica em cache; com If-None-Match igual ao ETag da
+        ultima resposta devolve 304.
+        """
+        cliente_id, investimentos = await self._carteira(request, cliente_id)
+        if cliente_id is None:
+            return investimentos
+
+        periodo = self._periodo(request)
+
+        chave = await sync_to_async(cache_analytics.chave)(
+            cliente_id, investimentos, periodo, self.BENCHMARK)
+        etag = f'"{chave}"'
+
+        dados = await sync_to_async(cache_analytics.get)(chave)
+        if dados is not None:
+            if etag in parse_etags(
+                    request.headers.get('If-None-Match', '')):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = Response(dados)
+            response['ETag'] = etag
+            return response
 
         try:
             analytics = PortfolioAnalytics(investimentos)
-            dados = analytics.calcular_performance(periodo=periodo)
+
+            # as cotacoes do dia saem em paralelo pelo cliente assincrono;
+            # o resto e calculo local sobre o historico ja gravado
+            cotacoes = await AsyncMarketDataService.get_bulk_ticker_info(
+                analytics.tickers_normalizados())
+
+            dados = await sync_to_async(self._calcular)(
+                analytics, cliente_id, periodo, cotacoes)
             
             if not dados:
                 return Response({'error': 'Dados insuficientes para cálculo'}, 
                                 status=400)
-                
-            return Response(dados)
+
+            await sync_to_async(cache_analytics.set)(chave, dados)
+            response = Response(dados)
+            response['ETag'] = etag
+            return response
             
         except Exception as e:
-            return Response({'error': str(e)}, status=500)
\ No newline at end of file
+            return Response({'error': str(e)}, status=500)
+
+    def _calcular(self, analytics, cliente_id, periodo, cotacoes):
+        dados = analytics.calcular_performance_snapshots(
+            cliente_id, periodo=periodo, benchmark_ticker=self.BENCHMARK,
+            cotacoes=cotacoes)
+        if dados is None:
+            dados = analytics.calcular_performance(
+                periodo=periodo, benchmark_ticker=self.BENCHMARK)
+        return dados
+
+
+class PortfolioRollingView(CarteiraClienteMixin, AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+    JANELAS_PADRAO = (21, 63, 252)
+    MAX_JANELA = 1260
+
+    async def get(self, request, cliente_id=None):
+        """
+        metricas em janelas moveis da carteira do cliente.
+        URL: /api/internal/analytics/cliente/{id}/rolling/?periodo=1y
+             &janelas=21,63,252
+        """
+        try:
+            janelas = tuple(sorted({
+                int(j) for j in request.query_params.get(
+                    'janelas', '').split(',') if j.strip()
+            })) or self.JANELAS_PADRAO
+        except ValueError:
+            return Response({'error': 'janelas deve ser uma lista de '
+                                      'inteiros'}, status=400)
+
+        if janelas[0] < 2 or janelas[-1] > self.MAX_JANELA:
+            return Response({'error': f'janelas devem estar entre 2 e '
+                                      f'{self.MAX_JANELA} dias'}, status=400)
+
+        cliente_id, investimentos = await self._carteira(request, cliente_id)
+        if cliente_id is None:
+            return investimentos
+
+        analytics = PortfolioAnalytics(investimentos)
+        dados = await sync_to_async(analytics.calcular_metricas_moveis)(
+            periodo=self._periodo(request), janelas=janelas)
+
+        if not dados:
+            return Response({'error': 'Dados insuficientes para cálculo'},
+                            status=400)
+
+        return Response(dados)
+
+
+class TelemetriaMercadoView(APIView):
+    """
+    contadores do provedor de mercado por ticker neste processo: com
+    varios workers, cada resposta mostra apenas o worker que a atendeu.
+    ?ordenar=upstream_ms|upstream|cache_hit|cache_miss|vazio|erro,
+    ?limite=N e ?tickers=A,B. DELETE zera os contadores.
+    """
+    permission_classes = [IsAdminUser]
+    LIMITE_PADRAO = 50
+
+    def get(self, request):
+        ordenar = request.query_params.get('ordenar', 'upstream_ms')
+        if ordenar not in EVENTOS:
+            return Response(
+                {'error': f"ordenar deve ser um de: {', '.join(EVENTOS)}"},
+                status=400)
+
+        try:
+            limite = int(request.query_params.get('limite',
+                                                  self.LIMITE_PADRAO))
+        except ValueError:
+            return Response({'error': 'limite deve ser um inteiro'},
+                            status=400)
+
+        tickers = request.query_params.get('tickers')
+        if tickers:
+            tickers = {MarketDataService._normalizar_ticker(t)
+                       for t in tickers.split(',') if t.strip()}
+
+        return Response(telemetria.resumo(ordenar_por=ordenar,
+                                          limite=max(limite, 0),
+                                          tickers=tickers or None))
+
+    def delete(self, request):
+        telemetria.limpar()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AtivoBuscaView(APIView):
+    """
+    autocomplete de ativos: ?q=petr&tipo=ACOES&limite=10
+    """
+    permission_classes = [IsAuthenticated]
+    LIMITE_MAXIMO = 50
+
+    def get(self, request):
+        tipo = request.query_params.get('tipo') or None
+        if tipo is not None and tipo not in dict(Ativo.TIPO_CHOICES):
+            return Response({'error': 'tipo inválido'}, status=400)
+
+        try:
+            limite = int(request.query_params.get('limite', 10))
+        except ValueError:
+            return Response({'error': 'limite deve ser um inteiro'},
+                            status=400)
+
+        return Response(MarketDataService.search_assets(
+            request.query_params.get('q', ''),
+            limite=min(max(limite, 0), self.LIMITE_MAXIMO),
+            tipo=tipo
+        ))
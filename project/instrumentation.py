@@ -0,0 +1,277 @@
+"""
+instrumentacao de desempenho por requisicao.
+
+o middleware sorteia as requisicoes medidas (INSTRUMENTACAO_AMOSTRAGEM,
+de 0 a 1). numa requisicao medida, o tempo gasto no banco, nas chamadas
+ao provedor de mercado e no calculo de analytics e devolvido no header
+Server-Timing e acumulado em histogramas (tempos) e contadores (chamadas)
+expostos em /metrics/ no formato texto do Prometheus. fora da amostra,
+`medir()` custa apenas a leitura de uma ContextVar.
+"""
+import hmac
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_medicao_atual = ContextVar('medicao_atual', default=None)
+
+
+class Medicao:
+    """tempos acumulados de uma requisicao: { categoria: [chamadas, ms] }"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.categorias = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, categoria, duracao_ms):
+        with self._lock:
+            total = self.categorias.setdefault(categoria, [0, 0.0])
+            total[0] += 1
+            total[1] += duracao_ms
+
+    def total_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+
+class _SemMedicao:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULO = _SemMedicao()
+
+
+@contextmanager
+def _medindo(medicao, categoria):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicao.registrar(categoria, (time.perf_counter() - inicio) * 1000)
+
+
+def medir(categoria):
+    """
+    context manager que soma o tempo do bloco na categoria da requisicao
+    corrente. sem requisicao medida, nao faz nada.
+    """
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        return _NULO
+    return _medindo(medicao, categoria)
+
+
+@contextmanager
+def medicao():
+    """
+    abre uma medicao fora do middleware (comandos, testes) e a entrega
+    """
+    atual = Medicao()
+    _garantir_wrapper_db()
+    token = _medicao_atual.set(atual)
+    try:
+        yield atual
+    finally:
+        _medicao_atual.reset(token)
+
+
+def _wrapper_db(execute, sql, params, many, context):
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        return execute(sql, params, many, context)
+
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicao.registrar('db', (time.perf_counter() - inicio) * 1000)
+
+
+def _garantir_wrapper_db():
+    for conexao in connections.all(initialized_only=True):
+        if _wrapper_db not in conexao.execute_wrappers:
+            conexao.execute_wrappers.append(_wrapper_db)
+
+
+@receiver(connection_created)
+def _instalar_wrapper_db(sender, connection, **kwargs):
+    if _wrapper_db not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_wrapper_db)
+
+
+class Histograma:
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = buckets
+        self.contagens = [0] * (len(buckets) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect_left(self.buckets, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+
+class RegistroMetricas:
+    """histogramas e contadores por (metrica, view), agregados no processo"""
+
+    def __init__(self):
+        self._histogramas = {}
+        self._contadores = {}
+        self._lock = threading.Lock()
+
+    def observar(self, metrica, view, valor):
+        with self._lock:
+            chave = (metrica, view)
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = Histograma()
+            histograma.observar(valor)
+
+    def somar(self, metrica, view, valor):
+        with self._lock:
+            chave = (metrica, view)
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def limpar(self):
+        with self._lock:
+            self._histogramas.clear()
+            self._contadores.clear()
+
+    def exportar(self):
+        """texto no formato de exposicao do Prometheus"""
+        with self._lock:
+            linhas = []
+            vistos = set()
+
+            for (metrica, view), histograma in sorted(
+                    self._histogramas.items()):
+                if metrica not in vistos:
+                    vistos.add(metrica)
+                    linhas.append(f'# TYPE {metrica} histogram')
+
+                rotulo = _rotulo(view)
+                acumulado = 0
+                for limite, contagem in zip(
+                        list(histograma.buckets) + ['+Inf'],
+                        histograma.contagens):
+                    acumulado += contagem
+                    linhas.append(f'{metrica}_bucket{{view="{rotulo}",'
+                                  f'le="{limite}"}} {acumulado}')
+                linhas.append(f'{metrica}_sum{{view="{rotulo}"}} '
+                              f'{histograma.soma:.3f}')
+                linhas.append(f'{metrica}_count{{view="{rotulo}"}} '
+                              f'{histograma.total}')
+
+            for (metrica, view), total in sorted(self._contadores.items()):
+                if metrica not in vistos:
+                    vistos.add(metrica)
+                    linhas.append(f'# TYPE {metrica} counter')
+                linhas.append(f'{metrica}{{view="{_rotulo(view)}"}} {total}')
+
+            return '\n'.join(linhas) + '\n'
+
+
+def _rotulo(view):
+    return view.replace('\\', '\\\\').replace('"', '\\"')
+
+
+registro = RegistroMetricas()
+
+
+class InstrumentacaoMiddleware:
+    """
+    mede as requisicoes sorteadas e publica Server-Timing e histogramas.
+    deve ficar no topo de MIDDLEWARE para cobrir toda a requisicao.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _sortear(self):
+        taxa = getattr(settings, 'INSTRUMENTACAO_AMOSTRAGEM', 0.0)
+        return taxa > 0 and (taxa >= 1 or random.random() < taxa)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if not self._sortear():
+            return self.get_response(request)
+
+        with medicao() as atual:
+            response = self.get_response(request)
+        return self._publicar(request, response, atual)
+
+    async def __acall__(self, request):
+        if not self._sortear():
+            return await self.get_response(request)
+
+        with medicao() as atual:
+            response = await self.get_response(request)
+        return self._publicar(request, response, atual)
+
+    def _publicar(self, request, response, atual):
+        total_ms = atual.total_ms()
+        partes = []
+        for categoria, (chamadas, duracao) in sorted(
+                atual.categorias.items()):
+            partes.append(f'{categoria};dur={duracao:.1f};'
+                          f'desc="{chamadas} chamadas"')
+        partes.append(f'total;dur={total_ms:.1f}')
+        response['Server-Timing'] = ', '.join(partes)
+
+        correspondencia = getattr(request, 'resolver_match', None)
+        view = correspondencia.view_name if correspondencia else 'desconhecida'
+
+        registro.observar('app_request_duration_ms', view, total_ms)
+        for categoria, (chamadas, duracao) in atual.categorias.items():
+            registro.observar(f'app_{categoria}_duration_ms', view, duracao)
+            registro.somar(f'app_{categoria}_calls_total', view, chamadas)
+
+        return response
+
+
+def metricas(request):
+    """
+    endpoint /metrics/ lido pelo Prometheus. com token configurado exige
+    "Authorization: Bearer <token>"; sem token, so responde aos enderecos
+    listados em INSTRUMENTACAO_METRICAS_IPS. sem nenhum dos dois, nega tudo:
+    atras de um proxy na mesma maquina todo acesso chega como loopback
+    """
+    token = getattr(settings, 'INSTRUMENTACAO_METRICAS_TOKEN', None)
+    if token:
+        permitido = hmac.compare_digest(
+            request.headers.get('Authorization', '').encode(),
+            f'Bearer {token}'.encode())
+    else:
+        permitido = request.META.get('REMOTE_ADDR') in getattr(
+            settings, 'INSTRUMENTACAO_METRICAS_IPS', ())
+
+    if not permitido:
+        return HttpResponseForbidden()
+
+    return HttpResponse(registro.exportar(),
+                        content_type='text/plain; version=0.0.4')
@@ -63,6 +63,7 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    'project.instrumentation.InstrumentacaoMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -173,3 +174,122 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/home/'
 LOGOUT_REDIRECT_URL = '/login/'
+
+# Market data
+# TTL (segundos) das cotacoes em memoria, por classe de ativo
+MARKET_DATA_QUOTE_TTL = {
+    'CRIPTO': 15,
+    'MOEDA': 60,
+    'ACOES': 60,
+}
+MARKET_DATA_QUOTE_CACHE_SIZE = 2048
+
+# cliente HTTP assincrono de cotacoes (views servidas pelo ASGI)
+MARKET_DATA_HTTP_TIMEOUT = 5.0
+MARKET_DATA_HTTP_MAX_CONNECTIONS = 100
+MARKET_DATA_MAX_CONCURRENCY = 50
+
+# cache compartilhado entre os processos web e o worker de cotacoes
+# (python manage.py aquecer_cotacoes). com REDIS_URL usa Redis; sem ele,
+# arquivos locais, o que so serve a processos na mesma maquina.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'cotacoes': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    } if os.getenv('REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'cotacoes',
+    },
+}
+MARKET_DATA_CACHE_ALIAS = 'cotacoes'
+
+# resultados de PortfolioAnalyticsView, no mesmo cache compartilhado; o
+# TTL limita quanto tempo o ponto intradiario (cotacao de hoje) fica parado
+ANALYTICS_CACHE_ALIAS = 'cotacoes'
+ANALYTICS_CACHE_TTL = 60
+
+# intervalo (segundos) de atualizacao do worker por classe de ativo.
+# fora do pregao da B3 as acoes usam MARKET_DATA_REFRESH_FORA_PREGAO.
+MARKET_DATA_REFRESH_INTERVAL = {
+    'CRIPTO': 15,
+    'MOEDA': 60,
+    'ACOES': 60,
+}
+MARKET_DATA_REFRESH_FORA_PREGAO = 1800
+
+# provedor de dados de mercado (quote, lote, historico, cambio). para rodar
+# offline, use 'investimentos.providers.ReplayProvider', que le os
+# historicos gravados em MARKET_DATA_REPLAY_DIR (python manage.py
+# exportar_replay); MARKET_DATA_REPLAY_DATA fixa a data "atual" do replay:
+# cotacoes, janelas de periodo, frescor da matriz e sincronizacao.
+MARKET_DATA_PROVIDER = os.getenv('MARKET_DATA_PROVIDER',
+                                 'investimentos.providers.YahooProvider')
+MARKET_DATA_REPLAY_DIR = BASE_DIR / 'replay'
+MARKET_DATA_REPLAY_DATA = os.getenv('MARKET_DATA_REPLAY_DATA')
+
+# matriz float32 de fechamentos gravada por compactar_precos e mapeada em
+# memoria por todos os workers; cada processo confere a cada
+# MARKET_DATA_MATRIZ_VERIFICACAO segundos se ha versao nova
+MARKET_DATA_MATRIZ_DIR = os.getenv('MARKET_DATA_MATRIZ_DIR',
+                                   BASE_DIR / 'matriz_precos')
+MARKET_DATA_MATRIZ_VERIFICACAO = 60
+
+# listagem lida por carregar_ativos para o catalogo da busca de ativos; o
+# indice em memoria confere a cada ATIVOS_INDICE_VERIFICACAO segundos se o
+# catalogo mudou no banco
+ATIVOS_CATALOGO_ARQUIVO = BASE_DIR / 'investimentos' / 'dados' / 'ativos.csv'
+ATIVOS_INDICE_VERIFICACAO = 300
+
+# fracao (0 a 1) das requisicoes medidas pelo InstrumentacaoMiddleware;
+# com token, /metrics/ exige "Authorization: Bearer <token>"; sem token,
+# so atende os IPs listados explicitamente; sem nenhum dos dois, /metrics/
+# fica fechado (atras de proxy todo acesso parece loopback: use o token)
+INSTRUMENTACAO_AMOSTRAGEM = float(os.getenv('INSTRUMENTACAO_AMOSTRAGEM',
+                                            '0'))
+INSTRUMENTACAO_METRICAS_TOKEN = os.getenv('INSTRUMENTACAO_METRICAS_TOKEN')
+INSTRUMENTACAO_METRICAS_IPS = [
+    ip for ip in os.getenv('INSTRUMENTACAO_METRICAS_IPS', '').split(',')
+    if ip]
+
+# logs do provedor de mercado em formato chave=valor; mensagens repetidas
+# (mesmo nivel, texto e ticker) saem no maximo uma vez a cada
+# MARKET_DATA_LOG_INTERVALO segundos
+MARKET_DATA_LOG_INTERVALO = 60.0
+
+# telemetria por ticker (internal/market/telemetria/), mantida em
+# memoria em cada processo; guarda so os tickers usados mais recentemente
+MARKET_DATA_TELEMETRIA_MAX_TICKERS = 1000
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'estruturado': {
+            '()': 'investimentos.telemetry.FormatoEstruturado',
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'estruturado',
+        },
+    },
+    'loggers': {
+        'investimentos': {
+            'handlers': ['console'],
+            'level': os.getenv('INVESTIMENTOS_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+# taxa livre de risco das metricas de risco (Sharpe, Sortino, alfa): CDI
+# anual capitalizado por dia util ou, com ANALYTICS_CDI_SERIE, o caminho de
+# uma funcao (datas) -> Series de taxas diarias. ANALYTICS_CONFIANCA_VAR e
+# o nivel de confianca do VaR/CVaR de um dia.
+ANALYTICS_CDI_ANUAL = float(os.getenv('ANALYTICS_CDI_ANUAL', '0.14'))
+ANALYTICS_CDI_SERIE = os.getenv('ANALYTICS_CDI_SERIE')
+ANALYTICS_CONFIANCA_VAR = 0.95
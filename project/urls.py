@@ -17,6 +17,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from project.instrumentation import metricas
+
 admin.autodiscover()
 
 urlpatterns = [
@@ -24,4 +26,5 @@ urlpatterns = [
     path('api/', include('api_banco.urls')),
     path('api/', include('authemail.urls')),
     path('api/', include('investimentos.urls')),
+    path('metrics/', metricas, name='metricas'),
 ]